@@ -0,0 +1,122 @@
+# Benchmarks report_df construction for the -2 import: the original per-cell .loc loop against the columnar _Build_Report_DF
+# Usage: python benchmarks/bench_report_df.py [findings] [legacy findings] [--full]
+# The legacy loop grows faster than linearly, so by default it's timed at four sizes up to the legacy findings (10k), its growth rate between the two largest sizes is fitted on a log-log scale and its time at the full size extrapolated from that; the loop's growth keeps rising with size, so the extrapolation is a lower bound
+# With --full the legacy loop runs on the full report instead, which takes a long time at 100k findings
+import time
+from os import path
+import sys
+from sys import argv
+import numpy as np
+import pandas as pd
+
+# The analysis code is the nessus_vuln_analysis package at the top of the repo
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+from nessus_vuln_analysis.analysis import _Build_Report_DF
+
+COLUMNS = ['Vulnerability Name', 'Plugin ID', 'Target', 'Device Name', 'MAC(s)', 'OS', 'Port', 'Service', 'Synopsis', 'Output',
+           'Last Scanned', 'Analysis Date', 'Analyst', 'Severity', 'Risk', 'Tier', 'Solution', 'Notes', 'Ticket #', 'Status',
+           'Vulnerability Details', 'Scanner Config?', 'Robot Note']
+
+# Builds a synthetic report_dict shaped like _Parse_Nessus output with the given number of high/critical findings, 20 per host
+def _Synthetic_Report (findings, per_host=20):
+    report_dict = dict()
+    for h in range(-(-findings // per_host)):
+        props = {'HOST_START': 'Tue Jan 26 08:56:53 2021', 'host-ip': '10.%d.%d.%d' % (h >> 16 & 255, h >> 8 & 255, h & 255)}
+        if h % 3:
+            props['host-rdns'] = 'host%d.example.com' % h
+        if h % 5:
+            props['netbios-name'] = 'HOST%d' % h
+        if h % 7:
+            props['mac-address'] = '00:50:56:%02x:%02x:%02x' % (h >> 16 & 255, h >> 8 & 255, h & 255)
+        if h % 2:
+            props['operating-system'] = 'Microsoft Windows Server 2016'
+        vulns = dict()
+        for v in range(min(per_host, findings - h * per_host)):
+            pid = str(100000 + v)
+            vulns[pid] = {'pluginName': 'Synthetic Plugin %s' % pid, 'pluginID': pid, 'port': '443', 'svc_name': 'www',
+                          'severity': '4' if v % 2 else '3', 'synopsis': 'Synopsis for %s' % pid, 'solution': 'Apply the vendor patch.'}
+            if v % 3:
+                vulns[pid]['plugin_output'] = 'Output for host %d plugin %s' % (h, pid)
+        props['vulns'] = vulns
+        props['auth'] = 's'
+        report_dict[props['host-ip']] = props
+    return report_dict
+
+# The report_df construction loop as it was before _Build_Report_DF, kept here as the reference implementation
+def _Legacy_Build_Report_DF (report_dict, vuln_analysis_df):
+    report_df = pd.DataFrame().reindex_like(vuln_analysis_df)
+    row = 0
+    for target in report_dict:
+        for v in report_dict[target]['vulns']:
+            vuln = report_dict[target]['vulns'][v]
+            if vuln['severity'] == '3' or vuln['severity'] == '4':
+                report_df.loc[row, 'Vulnerability Name'] = vuln['pluginName']
+                report_df.loc[row, 'Plugin ID'] = vuln['pluginID']
+                report_df.loc[row, 'Target'] = target
+                if 'host-rdns' in report_dict[target].keys():
+                    report_df.loc[row, 'Device Name'] = report_dict[target]['host-rdns']
+                elif 'netbios-name' in report_dict[target].keys():
+                    report_df.loc[row, 'Device Name'] = report_dict[target]['netbios-name']
+                else:
+                    report_df.loc[row, 'Device Name'] = report_dict[target]['host-ip']
+                if 'mac-address' in report_dict[target].keys():
+                    report_df.loc[row, 'MAC(s)'] = report_dict[target]['mac-address']
+                else:
+                    report_df.loc[row, 'MAC(s)'] = '???'
+                if 'operating-system' in report_dict[target].keys():
+                    report_df.loc[row, 'OS'] = report_dict[target]['operating-system']
+                else:
+                    report_df.loc[row, 'OS'] = '???'
+                report_df.loc[row, 'Port'] = vuln['port']
+                report_df.loc[row, 'Service'] = vuln['svc_name']
+                report_df.loc[row, 'Synopsis'] = vuln['synopsis']
+                if 'plugin_output' in vuln.keys():
+                    report_df.loc[row, 'Output'] = vuln['plugin_output']
+                else:
+                    report_df.loc[row, 'Output'] = 'N/A'
+                report_df.loc[row, 'Last Scanned'] = report_dict[target]['HOST_START']
+                report_df.loc[row, 'Severity'] = vuln['severity']
+                report_df.loc[row, 'Solution'] = vuln['solution']
+                report_df.loc[row, 'Vulnerability Details'] = 'https://www.tenable.com/plugins/nessus/' + vuln['pluginID']
+                row+=1
+        report_df = report_df.astype({"Vulnerability Name": str, "MAC(s)": str})
+    return report_df
+
+# Times a function of a synthetic report of the given size; returns the result and the seconds it took
+def _Time (fn, report_dict):
+    start = time.perf_counter()
+    result = fn(report_dict)
+    return result, time.perf_counter() - start
+
+def main (argv):
+    full = '--full' in argv
+    argv = [a for a in argv if a != '--full']
+    findings = int(argv[0]) if len(argv) > 0 else 100000
+    legacy_findings = min(findings, int(argv[1]) if len(argv) > 1 else 10000)
+    vuln_analysis_df = pd.DataFrame(columns=COLUMNS)
+    columnar_fn = lambda d: _Build_Report_DF(d, vuln_analysis_df.columns)
+    legacy_fn = lambda d: _Legacy_Build_Report_DF(d, vuln_analysis_df)
+
+    report_df, columnar = _Time(columnar_fn, _Synthetic_Report(findings))
+    print("_Build_Report_DF:          %8d findings in %8.3fs" % (len(report_df), columnar))
+
+    sizes = [findings] if full else [legacy_findings // 8, legacy_findings // 4, legacy_findings // 2, legacy_findings]
+    timings = []
+    for size in sizes:
+        small_dict = _Synthetic_Report(size)
+        legacy_df, legacy = _Time(legacy_fn, small_dict)
+        small_df, small = _Time(columnar_fn, small_dict)
+        pd.testing.assert_frame_equal(small_df.astype(object), legacy_df.astype(object), check_index_type=False) # the read-only columns come back as categoricals; the values are what must match
+        print("legacy per-cell .loc loop: %8d findings in %8.3fs (%.0fx the columnar build at that size; frames match)" % (len(legacy_df), legacy, legacy / small))
+        timings.append(legacy)
+
+    if full:
+        print("speedup at %d findings: %.0fx (measured)" % (findings, timings[-1] / columnar))
+        return
+    slope, intercept = np.polyfit(np.log(sizes[-2:]), np.log(timings[-2:]), 1) # legacy time ~ size ** slope at the largest sizes measured
+    legacy_full = np.exp(intercept) * findings ** slope
+    print("legacy loop scales as findings^%.2f at %d findings; extrapolated to %d findings: at least %.0fs" % (slope, sizes[-1], findings, legacy_full))
+    print("speedup at %d findings: at least %.0fx (extrapolated; run with --full to measure it)" % (findings, legacy_full / columnar))
+
+if __name__ == "__main__":
+    main(argv[1:])
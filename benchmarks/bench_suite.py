@@ -0,0 +1,171 @@
+# Times and memory-profiles each stage of the -2 import, plus options -4 and -5, at several scale points
+# Usage: python benchmarks/bench_suite.py [--scales=small,medium] [--label=name] [--compare=results/old.json] [--threshold=1.25] [--no-memory] [--workdir=dir]
+# Results are written to benchmarks/results/<label>.json; --compare prints each stage against an earlier results file and flags the ones that got slower than the threshold
+# Peak memory is measured with tracemalloc in a second, untimed run of each stage, so it covers Python allocations (lxml's own C buffers aren't counted)
+import contextlib
+import datetime
+import getopt
+import io
+import json
+import platform
+import shutil
+import time
+import tracemalloc
+import warnings
+from os import path, makedirs, remove
+from sys import argv, exit
+from openpyxl import load_workbook
+import pandas as pd
+
+from gen_nessus import _Gen_Nessus
+from gen_workbook import _Gen_Workbook, COLUMNS
+from nessus_vuln_analysis.nessus import _Parse_Nessus
+from nessus_vuln_analysis.analysis import _Build_Report_DF, _Mod_Analysis_Spreadsheet, _Add_New_Vulns
+from nessus_vuln_analysis.workbook import _Sheet_DF, _Finagle_WB, _Stream_WB
+from nessus_vuln_analysis.commands import _4_Generate_Remed_Report, _Migrate
+
+BENCH_DIR = path.dirname(path.abspath(__file__))
+SCALES = {'small': {'hosts': 250, 'per_host': 40, 'rows': 2000, 'sheets': 4},
+          'medium': {'hosts': 2500, 'per_host': 60, 'rows': 20000, 'sheets': 4},
+          'large': {'hosts': 10000, 'per_host': 80, 'rows': 100000, 'sheets': 4}}
+SHEETS = ['ACME', 'BETA', 'GAMMA', 'DELTA', 'EPSILON', 'ZETA']
+
+# Runs setup() untimed and then fn(*setup()), returning fn's result, its wall time and (unless memory is off) its peak traced allocation in MB from a second run
+def _Measure (setup, fn, memory):
+    args = setup()
+    with contextlib.redirect_stdout(io.StringIO()): # the script narrates every step; keep the benchmark output readable
+        start = time.perf_counter()
+        result = fn(*args)
+        seconds = time.perf_counter() - start
+        peak = None
+        if memory:
+            args = setup()
+            tracemalloc.start()
+            fn(*args)
+            peak = tracemalloc.get_traced_memory()[1] / (1 << 20)
+            tracemalloc.stop()
+    return result, seconds, peak
+
+# Generates (or reuses) the report and workbook for one scale point
+def _Scale_Inputs (workdir, scale, spec):
+    nessus = path.join(workdir, scale+'.nessus')
+    spreadsheet = path.join(workdir, scale+'.xlsx')
+    if not path.isfile(nessus):
+        print("Generating "+nessus+"...")
+        _Gen_Nessus(nessus, spec['hosts'], spec['per_host'], client=SHEETS[0], seed=1)
+    if not path.isfile(spreadsheet):
+        print("Generating "+spreadsheet+"...")
+        with contextlib.redirect_stdout(io.StringIO()):
+            _Gen_Workbook(spreadsheet, spec['rows'], SHEETS[:spec['sheets']], nessus=nessus, match=0.3, seed=1)
+    return nessus, spreadsheet
+
+def _Bench_Scale (workdir, scale, spec, memory):
+    nessus, spreadsheet = _Scale_Inputs(workdir, scale, spec)
+    work_copy = path.join(workdir, scale+'.work.xlsx')
+    results = dict()
+
+    def record (stage, measured, rows):
+        if callable(rows): # counted from the stage's own result
+            rows = rows(measured[0])
+        results[stage] = {'seconds': round(measured[1], 4), 'peak_mb': None if measured[2] is None else round(measured[2], 2), 'rows': rows}
+        print("  %-28s %10.3fs %12s %10d rows" % (stage, measured[1], '' if measured[2] is None else '%.1f MB' % measured[2], rows))
+        return measured[0]
+
+    parsed = record('_Parse_Nessus', _Measure(lambda: (nessus,), lambda p: _Parse_Nessus(p, min_severity=3), memory), lambda r: sum(len(h['vulns']) for scan in r for h in scan[0].values()))
+    report_dict, client, host_index = parsed[0]
+
+    report_df = record('_Build_Report_DF', _Measure(lambda: (report_dict,), lambda d: _Build_Report_DF(d, COLUMNS), memory), len)
+
+    def read_sheet (p, sheet):
+        wb = load_workbook(p, read_only=True)
+        df = _Sheet_DF(wb[sheet])
+        wb.close()
+        return df
+    sheet_df = record('read sheet', _Measure(lambda: (spreadsheet, client), read_sheet, memory), len)
+
+    def mod (df):
+        _Mod_Analysis_Spreadsheet(df, report_df, report_dict, host_index)
+        return df
+    modded_df = record('_Mod_Analysis_Spreadsheet', _Measure(lambda: (sheet_df.copy(),), mod, memory), len(sheet_df))
+
+    final_df = record('_Add_New_Vulns', _Measure(lambda: (modded_df.copy(), report_df), _Add_New_Vulns, memory), len)
+
+    def load_copy ():
+        shutil.copyfile(spreadsheet, work_copy)
+        return (work_copy,)
+    record('load workbook', _Measure(load_copy, load_workbook, memory), 0)
+    record('_Finagle_WB', _Measure(lambda: (work_copy, load_copy() and load_workbook(work_copy), {client: final_df.copy()}), _Finagle_WB, memory), len(final_df))
+    record('_Stream_WB', _Measure(lambda: (work_copy, {client: final_df.copy()}, load_copy()[0]), _Stream_WB, memory), len(final_df))
+
+    record('-4 all sheets, all months', _Measure(lambda: (spreadsheet, 'all', 'all'), _4_Generate_Remed_Report, memory), spec['rows'] * spec['sheets'])
+
+    migrated = path.join(workdir, scale+'.migrated.xlsx')
+    def migrate_setup ():
+        if path.isfile(migrated):
+            remove(migrated)
+        return (spreadsheet, migrated)
+    record('-5 migrate', _Measure(migrate_setup, _Migrate, memory), spec['rows'] * spec['sheets'])
+    return results
+
+# Prints each stage's time against an earlier results file; stages that slowed down by more than threshold are flagged
+def _Compare (results, baseline_path, threshold):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print("\nCompared with "+baseline_path+" ("+baseline.get('label', '?')+"):")
+    regressions = 0
+    for scale in results['scales']:
+        if scale not in baseline['scales']:
+            continue
+        for stage, now in results['scales'][scale].items():
+            before = baseline['scales'][scale].get(stage)
+            if before is None or before['seconds'] == 0:
+                continue
+            ratio = now['seconds'] / before['seconds']
+            flag = 'REGRESSION' if ratio > threshold else ''
+            regressions += flag != ''
+            print("  %-8s %-28s %9.3fs -> %9.3fs  x%5.2f %s" % (scale, stage, before['seconds'], now['seconds'], ratio, flag))
+    return regressions
+
+def main (argv):
+    warnings.simplefilter('ignore', FutureWarning) # pandas deprecation notices from the script would drown out the timings
+    try:
+        opts, args = getopt.gnu_getopt(argv, "", ["scales=", "label=", "compare=", "threshold=", "no-memory", "workdir="])
+    except getopt.GetoptError as e:
+        print(e)
+        exit(2)
+    scales = ['small', 'medium']
+    label = datetime.datetime.now().strftime('%Y_%m_%d_%H%M%S')
+    baseline = None
+    threshold = 1.25
+    memory = True
+    workdir = path.join(BENCH_DIR, 'work')
+    for opt, arg in opts:
+        if opt == "--scales":
+            scales = arg.split(',')
+        elif opt == "--label":
+            label = arg
+        elif opt == "--compare":
+            baseline = arg
+        elif opt == "--threshold":
+            threshold = float(arg)
+        elif opt == "--no-memory":
+            memory = False
+        elif opt == "--workdir":
+            workdir = arg
+    makedirs(workdir, exist_ok=True)
+
+    results = {'label': label, 'date': datetime.datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(), 'pandas': pd.__version__, 'scales': dict()}
+    for scale in scales:
+        print(scale+": "+json.dumps(SCALES[scale]))
+        results['scales'][scale] = _Bench_Scale(workdir, scale, SCALES[scale], memory)
+
+    makedirs(path.join(BENCH_DIR, 'results'), exist_ok=True)
+    out = path.join(BENCH_DIR, 'results', label+'.json')
+    with open(out, 'w') as f:
+        json.dump(results, f, indent=2)
+    print("\nResults saved to "+out)
+    if baseline is not None and _Compare(results, baseline, threshold) > 0:
+        exit(1)
+
+if __name__ == "__main__":
+    main(argv[1:])
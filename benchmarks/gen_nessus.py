@@ -0,0 +1,115 @@
+# Writes a synthetic .nessus (NessusClientData_v2) report shaped like a real Nessus export, for benchmarking and testing the import pipeline
+# Usage: python benchmarks/gen_nessus.py <output.nessus> [hosts] [findings per host]
+#        [--client=ACME] [--severity-mix=0.55,0.2,0.15,0.07,0.03] [--multi-nic=0.2] [--shared-nic=0.02] [--output-size=400] [--plugins=2000] [--seed=1]
+# The XML is written host by host, so reports far larger than memory can be generated
+import getopt
+import random
+from sys import argv, exit
+from xml.sax.saxutils import escape, quoteattr
+
+SEVERITY_MIX = [0.55, 0.2, 0.15, 0.07, 0.03] # share of plugins at severity 0 (info) through 4 (critical)
+RISK_FACTORS = ['None', 'Low', 'Medium', 'High', 'Critical']
+FAMILIES = ['Windows : Microsoft Bulletins', 'Web Servers', 'General', 'Misc.', 'Ubuntu Local Security Checks', 'Service detection']
+SERVICES = [('80', 'www', 'tcp'), ('443', 'www', 'tcp'), ('445', 'cifs', 'tcp'), ('22', 'ssh', 'tcp'), ('3389', 'msrdp', 'tcp'), ('0', 'general', 'tcp'), ('161', 'snmp', 'udp')]
+OPERATING_SYSTEMS = ['Microsoft Windows Server 2016 Standard', 'Microsoft Windows 10 Enterprise', 'Linux Kernel 4.15 on Ubuntu 18.04', 'Cisco IOS 15.2', None]
+CRED_FAIL_PLUGINS = ['21745', '110385']
+
+# Builds the pool of plugins hosts draw their findings from; each plugin keeps one severity, the way real plugins do
+def _Plugin_Pool (size, severity_mix, r):
+    pool = []
+    for i in range(size):
+        pid = str(10000 + i * 7)
+        severity = r.choices(range(5), weights=severity_mix)[0]
+        port, svc, proto = r.choice(SERVICES)
+        pool.append({'pluginID': pid,
+                     'pluginName': 'Synthetic %s Vulnerability %s' % (RISK_FACTORS[severity], pid),
+                     'pluginFamily': r.choice(FAMILIES),
+                     'severity': str(severity),
+                     'port': port,
+                     'svc_name': svc,
+                     'protocol': proto,
+                     'synopsis': 'The remote host is affected by synthetic issue %s.' % pid,
+                     'solution': 'Apply the vendor update referenced by plugin %s.' % pid,
+                     'description': 'Synthetic description for plugin %s. ' % pid * 3})
+    return pool
+
+def _MAC (n):
+    return '00:50:56:%02x:%02x:%02x' % (n >> 16 & 255, n >> 8 & 255, n & 255)
+
+# Writes the report; returns the number of ReportItems written
+def _Gen_Nessus (report_path, hosts=100, per_host=40, client='ACME', severity_mix=SEVERITY_MIX, multi_nic=0.2, shared_nic=0.02, output_size=400, plugins=2000, seed=1, cred_fail=0.05, start='Tue Jan 26 08:56:53 2021'):
+    r = random.Random(seed)
+    pool = _Plugin_Pool(plugins, severity_mix, r)
+    items = 0
+    with open(report_path, 'w') as f:
+        f.write('<?xml version="1.0" ?>\n<NessusClientData_v2>\n<Policy><policyName>Synthetic Policy</policyName></Policy>\n')
+        f.write('<Report name=%s xmlns:cm="http://www.nessus.org/cm">\n' % quoteattr(client+' Weekly Scan'))
+        for h in range(hosts):
+            ip = '10.%d.%d.%d' % (h >> 16 & 255, h >> 8 & 255, h & 255)
+            f.write('<ReportHost name="%s"><HostProperties>\n' % ip)
+            f.write('<tag name="HOST_END">%s</tag>\n<tag name="policy-used">Synthetic Policy</tag>\n<tag name="Credentialed_Scan">true</tag>\n' % start)
+            if r.random() < 0.9: # a few hosts never report a MAC
+                macs = [_MAC(h)]
+                if r.random() < multi_nic:
+                    macs += [_MAC((h << 2) + 0x800000 + n) for n in range(r.randint(1, 3))]
+                if h > 0 and r.random() < shared_nic: # the same device seen again under another IP
+                    macs.append(_MAC(r.randrange(h)))
+                f.write('<tag name="mac-address">%s</tag>\n' % '\n'.join(macs))
+            f.write('<tag name="netbios-name">HOST%d</tag>\n' % h)
+            if h % 3:
+                f.write('<tag name="host-rdns">host%d.%s.example.com</tag>\n' % (h, client.lower()))
+            os_name = r.choice(OPERATING_SYSTEMS)
+            if os_name is not None:
+                f.write('<tag name="operating-system">%s</tag>\n' % os_name)
+            f.write('<tag name="host-ip">%s</tag>\n<tag name="HOST_START">%s</tag>\n</HostProperties>\n' % (ip, start))
+            findings = r.sample(pool, min(per_host, len(pool)))
+            if r.random() < cred_fail:
+                findings.append({'pluginID': r.choice(CRED_FAIL_PLUGINS), 'pluginName': 'Authentication Failure', 'pluginFamily': 'Settings', 'severity': '0', 'port': '0', 'svc_name': 'general', 'protocol': 'tcp',
+                                 'synopsis': 'Nessus was unable to log into the remote host.', 'solution': 'n/a', 'description': 'Credentials were rejected.'})
+            for p in findings:
+                f.write('<ReportItem port="%s" svc_name="%s" protocol="%s" severity="%s" pluginID="%s" pluginName=%s pluginFamily=%s>\n'
+                        % (p['port'], p['svc_name'], p['protocol'], p['severity'], p['pluginID'], quoteattr(p['pluginName']), quoteattr(p['pluginFamily'])))
+                f.write('<description>%s</description>\n<fname>synthetic_%s.nasl</fname>\n<plugin_modification_date>2021/01/12</plugin_modification_date>\n' % (escape(p['description']), p['pluginID']))
+                f.write('<plugin_type>remote</plugin_type>\n<risk_factor>%s</risk_factor>\n<script_version>1.%d</script_version>\n' % (RISK_FACTORS[int(p['severity'])], int(p['pluginID']) % 40))
+                f.write('<solution>%s</solution>\n<synopsis>%s</synopsis>\n' % (escape(p['solution']), escape(p['synopsis'])))
+                if output_size > 0 and r.random() < 0.7:
+                    line = 'Path : C:\\Windows\\System32\\synthetic%s.dll  Installed version : 10.0.%d  Fixed version : 10.0.%d\n' % (p['pluginID'], h, h+1)
+                    f.write('<plugin_output>%s</plugin_output>\n' % escape((line * (output_size // len(line) + 1))[:output_size]))
+                f.write('</ReportItem>\n')
+                items+=1
+            f.write('</ReportHost>\n')
+        f.write('</Report>\n</NessusClientData_v2>\n')
+    return items
+
+def main (argv):
+    try:
+        opts, args = getopt.gnu_getopt(argv, "", ["client=", "severity-mix=", "multi-nic=", "shared-nic=", "output-size=", "plugins=", "seed="])
+    except getopt.GetoptError as e:
+        print(e)
+        exit(2)
+    if len(args) == 0:
+        print("Usage: python benchmarks/gen_nessus.py <output.nessus> [hosts] [findings per host] [options]")
+        exit(2)
+    kwargs = dict()
+    for opt, arg in opts:
+        if opt == "--client":
+            kwargs['client'] = arg
+        elif opt == "--severity-mix":
+            kwargs['severity_mix'] = [float(w) for w in arg.split(',')]
+        elif opt == "--multi-nic":
+            kwargs['multi_nic'] = float(arg)
+        elif opt == "--shared-nic":
+            kwargs['shared_nic'] = float(arg)
+        elif opt == "--output-size":
+            kwargs['output_size'] = int(arg)
+        elif opt == "--plugins":
+            kwargs['plugins'] = int(arg)
+        elif opt == "--seed":
+            kwargs['seed'] = int(arg)
+    hosts = int(args[1]) if len(args) > 1 else 100
+    per_host = int(args[2]) if len(args) > 2 else 40
+    items = _Gen_Nessus(args[0], hosts, per_host, **kwargs)
+    print("Wrote %d hosts and %d findings to %s" % (hosts, items, args[0]))
+
+if __name__ == "__main__":
+    main(argv[1:])
@@ -0,0 +1,98 @@
+# Writes a synthetic analysis workbook compatible with nessus-vuln-analysis-xl.py, for benchmarking -2, -4 and -5
+# Usage: python benchmarks/gen_workbook.py <output.xlsx> [rows per sheet] [--sheets=ACME,BETA] [--nessus=report.nessus] [--match=0.5] [--seed=1]
+# With --nessus, the sheet named after the report's client is seeded with a share (--match) of the report's own findings, so an import reconciles real overlaps
+import getopt
+import random
+from os import path, remove
+import sys
+from sys import argv, exit
+import pandas as pd
+
+# The analysis code is the nessus_vuln_analysis package at the top of the repo
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+from nessus_vuln_analysis.settings import MONTH_ABBRS
+from nessus_vuln_analysis.nessus import _Parse_Nessus
+from nessus_vuln_analysis.analysis import _Build_Report_DF
+from nessus_vuln_analysis.workbook import _Gen_Fresh_Workbook, _Stream_WB
+
+COLUMNS = ['Vulnerability Name', 'Plugin ID', 'Target', 'Device Name', 'MAC(s)', 'OS', 'Port', 'Service', 'Synopsis', 'Output',
+           'Last Scanned', 'Analysis Date', 'Analyst', 'Severity', 'Risk', 'Tier', 'Solution', 'Notes', 'Ticket #', 'Status',
+           'Vulnerability Details', 'Scanner Config?', 'Robot Note']
+STATUSES = ['Pending Analysis', 'Pending Ticket Creation', 'Pending Patch Cycle', 'Pending Remediation', 'Pending Reevaluation',
+            'Risk Ack. Needed', 'False Positive Doc. Needed', 'On Hold', 'Closed'] + ['Remediated - '+m for m in MONTH_ABBRS]
+
+# Rows for findings that no longer appear in any scan, the bulk of a long-lived sheet
+def _Stale_Rows (rows, sheet, r):
+    data = []
+    for i in range(rows):
+        pid = str(900000 + r.randrange(5000))
+        host = r.randrange(1 << 20)
+        data.append({'Vulnerability Name': 'Retired Synthetic Vulnerability '+pid, 'Plugin ID': pid,
+                     'Target': '172.%d.%d.%d' % (host >> 16 & 15, host >> 8 & 255, host & 255),
+                     'Device Name': '%s-host%d' % (sheet.lower(), host),
+                     'MAC(s)': '02:00:%02x:%02x:%02x:%02x' % (i >> 24 & 255, i >> 16 & 255, i >> 8 & 255, i & 255),
+                     'OS': '???', 'Port': '443', 'Service': 'www', 'Synopsis': 'Retired synopsis '+pid, 'Output': 'N/A',
+                     'Last Scanned': 'Mon Jan %02d 08:56:53 2021' % (r.randrange(1, 25)), 'Severity': r.choice(['3', '4']),
+                     'Solution': 'Retired solution '+pid, 'Vulnerability Details': 'https://www.tenable.com/plugins/nessus/'+pid})
+    df = pd.DataFrame(data, columns=COLUMNS)
+    return df
+
+# Fills in what analysts would have recorded by hand
+def _Analyst_Columns (df, r):
+    n = len(df)
+    df['Status'] = [r.choice(STATUSES) for i in range(n)]
+    df['Risk'] = [r.choice(['Low', 'Medium', 'High', 'Critical', None]) for i in range(n)]
+    df['Tier'] = [r.choice(['1', '2', '3', None]) for i in range(n)]
+    df['Analyst'] = [r.choice(['AB', 'CD', None]) for i in range(n)]
+    df['Notes'] = [r.choice(['Patch scheduled', 'Vendor contacted', None, None]) for i in range(n)]
+    df['Ticket #'] = [('INC%07d' % r.randrange(10**7)) if r.random() < 0.4 else None for i in range(n)]
+    return df
+
+def _Gen_Workbook (spreadsheet, rows=1000, sheets=('ACME',), nessus=None, match=0.5, seed=1):
+    r = random.Random(seed)
+    sheet_dfs = dict()
+    report_df = None
+    client = None
+    if nessus is not None:
+        report_dict, client, host_index = _Parse_Nessus(nessus, min_severity=3)[0]
+        report_df = _Build_Report_DF(report_dict, COLUMNS)
+        if client not in sheets:
+            sheets = [client] + list(sheets)
+    for sheet in sheets:
+        parts = []
+        if sheet == client and len(report_df) > 0:
+            matched = report_df.sample(n=min(len(report_df), int(rows * match)), random_state=seed)
+            parts.append(matched)
+        parts.append(_Stale_Rows(rows - sum(len(p) for p in parts), sheet, r))
+        sheet_dfs[sheet] = _Analyst_Columns(pd.concat(parts, ignore_index=True, sort=False), r)
+    if path.isfile(spreadsheet):
+        remove(spreadsheet)
+    _Gen_Fresh_Workbook(spreadsheet, list(sheet_dfs))
+    _Stream_WB(spreadsheet, sheet_dfs, spreadsheet)
+    return sheet_dfs
+
+def main (argv):
+    try:
+        opts, args = getopt.gnu_getopt(argv, "", ["sheets=", "nessus=", "match=", "seed="])
+    except getopt.GetoptError as e:
+        print(e)
+        exit(2)
+    if len(args) == 0:
+        print("Usage: python benchmarks/gen_workbook.py <output.xlsx> [rows per sheet] [options]")
+        exit(2)
+    kwargs = dict()
+    for opt, arg in opts:
+        if opt == "--sheets":
+            kwargs['sheets'] = arg.split(',')
+        elif opt == "--nessus":
+            kwargs['nessus'] = arg
+        elif opt == "--match":
+            kwargs['match'] = float(arg)
+        elif opt == "--seed":
+            kwargs['seed'] = int(arg)
+    rows = int(args[1]) if len(args) > 1 else 1000
+    sheet_dfs = _Gen_Workbook(args[0], rows, **kwargs)
+    print("Wrote %d sheet(s) of %d rows to %s" % (len(sheet_dfs), rows, args[0]))
+
+if __name__ == "__main__":
+    main(argv[1:])
@@ -0,0 +1,15 @@
+# Nessus vulnerability analysis workbooks as a library: import .nessus exports into analysis workbooks, reconcile findings, and write remediation reports
+# The API functions live in api and are only loaded (along with pandas, openpyxl and lxml) the first time one of them is used; importing the package itself is cheap
+import logging
+from .errors import AnalysisError, InputError, BackupError
+
+logging.getLogger(__name__).addHandler(logging.NullHandler()) # progress is logged at INFO and left to the application to show; the command line prints it
+
+__all__ = ['parse', 'findings', 'load', 'reconcile', 'render', 'import_reports', 'report', 'migrate', 'create', 'convert_layout', 'delta', 'query_history',
+           'AnalysisError', 'InputError', 'BackupError']
+
+def __getattr__ (name):
+    if name in __all__:
+        from . import api
+        return getattr(api, name)
+    raise AttributeError("module "+__name__+" has no attribute "+name)
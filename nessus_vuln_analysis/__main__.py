@@ -0,0 +1,6 @@
+# Lets the package run as python -m nessus_vuln_analysis, with the same options as nessus-vuln-analysis-xl.py
+from sys import argv
+from .cli import main
+
+if __name__ == "__main__": # worker processes started by spawn import this module again, and mustn't rerun the command
+    main(argv[1:])
@@ -0,0 +1,168 @@
+# Building report dataframes and reconciling them against an analysis sheet
+import logging
+from os import path
+import numpy as np
+import pandas as pd
+from . import settings
+from .settings import CATEGORY_COLUMNS
+from .rules import STATUS_RULES
+from .metrics import _Stage_End, _Stage_Start
+from .workbook import _Plugins_Merge
+from .nessus import _Index_Lookup, _Scan_Date
+from .history import _New_Events, _Sightings, _Status_Events
+
+log = logging.getLogger(__name__)
+
+# Turns one rule condition into a boolean array over the sheet; flags come from the reconciliation context, everything else is compared against the sheet column of that name
+def _Rule_Mask (vuln_analysis_df, flags, key, cond):
+    if key in flags:
+        return flags[key] == bool(cond)
+    col = vuln_analysis_df[key]
+    if isinstance(cond, dict):
+        return col.str.match(cond['regex'], na=False).to_numpy()
+    if isinstance(cond, list):
+        return col.isin(cond).to_numpy()
+    return (col == cond).to_numpy()
+
+# Evaluates the status rules column-wise over the whole sheet; every condition is checked against the statuses as they were before this report, and the first matching rule wins
+def _Apply_Status_Rules (vuln_analysis_df, rules, flags):
+    decided = np.zeros(len(vuln_analysis_df), dtype=bool)
+    masks = []
+    for rule in rules:
+        mask = ~decided
+        for key, cond in rule.get('when', dict()).items():
+            mask &= _Rule_Mask(vuln_analysis_df, flags, key, cond)
+        decided |= mask
+        masks.append(mask)
+    month = settings._Today().strftime('%b')
+    for rule, mask in zip(rules, masks):
+        vuln_analysis_df.loc[mask, 'Status'] = rule['status'].replace('{month}', month)
+        if rule.get('note') is not None:
+            vuln_analysis_df.loc[mask, 'Robot Note'] = rule['note']
+
+# Builds the 'MAC(s)' cell -> host lookup table used during reconciliation: one row per distinct cell of the sheet, holding the canonical host it resolves to, that host's MAC string, auth status and scan start time
+# Cells are resolved through the host index, so a cell written with a different but overlapping set of the host's NICs (by an older scan or an older version) still finds its host; cells that resolve to no host of this scan are left out
+def _Host_Table (report_dict, host_index, macs):
+    cells = []
+    hosts = []
+    for cell in pd.unique(macs.to_numpy()):
+        host = _Index_Lookup(host_index, cell)
+        if host is not None:
+            cells.append(cell)
+            hosts.append(host)
+    return pd.DataFrame({'host': hosts,
+                         'mac': [report_dict[h]['mac-address'] for h in hosts],
+                         'auth': [report_dict[h].get('auth', 0) for h in hosts],
+                         'HOST_START': [report_dict[h].get('HOST_START') for h in hosts]}, index=cells, dtype=object)
+
+# Modifies existing entries in the target sheet only based on vulnerabilities found (or not found) in the new report
+# Sheet rows are matched to their host through the MAC table and to the report with a hash join on (Vulnerability Name, MAC(s)), so every check runs over whole columns at once
+# A row whose host's MAC string has changed (another NIC showed up, or the cell predates the host's current set) is moved onto the current string first, so the join finds it and _Add_New_Vulns doesn't add it again
+# The status changes themselves come from the rules table (STATUS_RULES unless site rules are given)
+def _Mod_Analysis_Spreadsheet (vuln_analysis_df, report_df, report_dict, host_index, rules=STATUS_RULES):
+    time_format = '%a %b %d %H:%M:%S %Y' # EX: Tue Jan 26 08:56:53 2021
+
+    # look up each row's host by its MAC cell
+    hosts = _Host_Table(report_dict, host_index, vuln_analysis_df['MAC(s)']).reindex(vuln_analysis_df['MAC(s)'])
+    moved = hosts['mac'].notna().to_numpy() & (hosts['mac'].to_numpy() != vuln_analysis_df['MAC(s)'].to_numpy())
+    if moved.any():
+        vuln_analysis_df.loc[moved, 'MAC(s)'] = hosts['mac'].to_numpy()[moved]
+    macs = vuln_analysis_df['MAC(s)']
+
+    # check each existing vulnerability in the analysis spreadsheet for matches in both the vuln name AND mac address columns in the new report dataframe
+    sheet_keys = pd.MultiIndex.from_arrays([vuln_analysis_df['Vulnerability Name'], macs])
+    report_keys = pd.MultiIndex.from_arrays([report_df['Vulnerability Name'], report_df['MAC(s)']])
+    seen = sheet_keys.isin(report_keys)
+    no_mac = seen & (macs == '???').to_numpy() # seen again, but there's no MAC to tie the row to a host
+    common = seen & ~no_mac # rows where BOTH the vuln names and mac address cells represent matches between both dataframes
+
+    # flag rows whose host had a credentialed check at least as new as the row's Last Scanned date
+    host_start = hosts['HOST_START'].to_numpy()
+    rescanned = ((hosts['auth'] == 's').to_numpy()
+                 & (pd.to_datetime(vuln_analysis_df['Last Scanned'], format=time_format, errors='coerce').to_numpy()
+                    <= pd.to_datetime(hosts['HOST_START'], format=time_format, errors='coerce').to_numpy()))
+
+    _Apply_Status_Rules(vuln_analysis_df, rules, {'seen': common, 'seen_no_mac': no_mac, 'rescanned': rescanned})
+    vuln_analysis_df.loc[rescanned, 'Last Scanned'] = host_start[rescanned] # always change the Last Scanned cell to the report's scan date (as long as the report is, in fact, newer)
+    vuln_analysis_df.loc[vuln_analysis_df['Status'].isna().to_numpy(), 'Status'] = 'Pending Analysis' # catch any rows with empty Status cells (there should never be rows with empty Status cells)
+
+# Identifies never-before-seen vulnerabilities in the report dataframe and appends them to the spreadsheet dataframe
+def _Add_New_Vulns (vuln_analysis_df, report_df):
+    merged_df = report_df.merge(vuln_analysis_df, how='inner', on = ['Vulnerability Name', 'MAC(s)'], suffixes=('','_y')) # generate a dataframe with rows that match between the sheet df and the report df
+    merged_df.drop(list(merged_df.filter(regex='_y$')), axis=1, inplace=True) # strip away unwanted columns created by the merge
+    diff_df = pd.concat([report_df, merged_df], sort=False) # concatenate the report df and the df containg similarities between the sheet df and the report df
+    diff_df2 = diff_df.drop_duplicates(subset=['Vulnerability Name', 'MAC(s)'],keep=False) # drop all except unique entries, leaving us only with report df vulnerability/host combos that are totally unique to the report and never appear in the sheet df
+    return vuln_analysis_df.append(diff_df2.astype(object), ignore_index=True, sort=False) # return the generated final df onto the working sheet df; the sheet keeps plain columns so statuses can be assigned freely
+
+# Builds the report dataframe in one shot from column lists gathered straight out of report_dict; host-level fields are derived once per host and broadcast to that host's findings
+def _Build_Report_DF (report_dict, columns):
+    targets = [] # one entry per high/critical finding; these lists become the dataframe's columns
+    vulns = []
+    for target in report_dict:
+        for v in report_dict[target]['vulns'].values():
+            if v['severity'] == '3' or v['severity'] == '4':
+                targets.append(target)
+                vulns.append(v)
+
+    # derive the Device Name fallback chain (rDNS, then NetBIOS name, then IP) and the '???' MAC/OS defaults per host
+    host_params = ['host-rdns', 'netbios-name', 'host-ip', 'mac-address', 'operating-system', 'HOST_START']
+    hosts_df = pd.DataFrame.from_dict({t: {p: report_dict[t][p] for p in host_params if p in report_dict[t]} for t in report_dict}, orient='index', dtype=object)
+    hosts_df = hosts_df.reindex(columns=host_params)
+    hosts_df['Device Name'] = hosts_df['host-rdns'].combine_first(hosts_df['netbios-name']).combine_first(hosts_df['host-ip'])
+    hosts_df['MAC(s)'] = hosts_df['mac-address'].fillna('???')
+    hosts_df['OS'] = hosts_df['operating-system'].fillna('???')
+
+    report_df = pd.DataFrame({'Vulnerability Name': [v['pluginName'] for v in vulns],
+                              'Plugin ID': [v['pluginID'] for v in vulns],
+                              'Target': targets,
+                              'Port': [v['port'] for v in vulns],
+                              'Service': [v['svc_name'] for v in vulns],
+                              'Synopsis': [v['synopsis'] for v in vulns],
+                              'Output': [v.get('plugin_output', 'N/A') for v in vulns],
+                              'Severity': [v['severity'] for v in vulns],
+                              'Solution': [v['solution'] for v in vulns]}, dtype=object)
+    report_df['Device Name'] = report_df['Target'].map(hosts_df['Device Name'])
+    report_df['MAC(s)'] = report_df['Target'].map(hosts_df['MAC(s)'])
+    report_df['OS'] = report_df['Target'].map(hosts_df['OS'])
+    report_df['Last Scanned'] = report_df['Target'].map(hosts_df['HOST_START']) # EX: datetime.datetime.strptime('Tue Jan 26 08:56:53 2021', '%a %b %d %H:%M:%S %Y')
+    report_df['Vulnerability Details'] = 'https://www.tenable.com/plugins/nessus/' + report_df['Plugin ID']
+    report_df = report_df.reindex(columns=columns) # lay the columns out like the spreadsheet df; anything the report doesn't provide stays empty
+    report_df = report_df.astype({"Vulnerability Name": str, "MAC(s)": str})
+    return _Compact_DF(report_df)
+
+# Stores the columns that repeat the same few values over and over (CATEGORY_COLUMNS) as categoricals, which keep each distinct value once
+# Only for dataframes that are read, filtered and written; a sheet that's about to have new statuses assigned keeps plain object columns
+def _Compact_DF (df):
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and df[col].notna().any():
+            df[col] = df[col].astype('category')
+    return df
+
+# Applies parsed reports to one analysis sheet's dataframe, oldest scan first; returns the updated dataframe and plugins_df (None outside the normalized layout)
+# With a history dict ({'event': [], 'sighting': []}) the status changes, new findings and sightings of every report are added to its lists for the finding history
+def _Apply_Reports (vuln_analysis_df, parses, plugins_df, rules, history=None):
+    for nessus, report_dict, client, host_index in sorted(parses, key=lambda p: _Scan_Date(p[1])):
+        log.info("Building report dataframe for "+nessus+"...")
+        stage = _Stage_Start('build')
+        report_df = _Build_Report_DF(report_dict, vuln_analysis_df.columns) # build a dataframe for the Nessus report with the same columns as the spreadsheet df
+        if plugins_df is not None:
+            plugins_df = _Plugins_Merge(plugins_df, report_df)
+        _Stage_End(stage, rows=len(report_df), hosts=len(report_dict))
+
+        log.info("Modifying target analysis sheet with new scan data...")
+        stage = _Stage_Start('reconcile')
+        old_status = vuln_analysis_df['Status'].astype(object).where(vuln_analysis_df['Status'].notna(), None).to_numpy() if history is not None else None
+        _Mod_Analysis_Spreadsheet(vuln_analysis_df, report_df, report_dict, host_index, rules) # change the existing spreadsheet's dataframe to reflect new report data
+        _Stage_End(stage, rows=len(vuln_analysis_df))
+        stage = _Stage_Start('add-new')
+        rows = len(vuln_analysis_df)
+        vuln_analysis_df = _Add_New_Vulns(vuln_analysis_df, report_df) # add new vulnerability/target combos to the analysis dataframe
+        _Stage_End(stage, rows=len(vuln_analysis_df) - rows)
+        if history is not None:
+            scan_date = _Scan_Date(report_dict)
+            if scan_date == pd.Timestamp.min: # a report without a single HOST_START is filed under the day it was imported
+                scan_date = pd.Timestamp(settings._Today())
+            history['event'].append(_Status_Events(vuln_analysis_df.iloc[:rows], old_status, scan_date, path.basename(nessus)))
+            history['event'].append(_New_Events(vuln_analysis_df.iloc[rows:], scan_date, path.basename(nessus)))
+            history['sighting'].append(_Sightings(report_df, scan_date, path.basename(nessus)))
+    return vuln_analysis_df, plugins_df
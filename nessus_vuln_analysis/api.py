@@ -0,0 +1,176 @@
+# The library API: nothing here prompts or exits; every function takes what it needs as arguments, returns dataframes or plain objects, and raises AnalysisError subclasses
+# The command line's run-wide switches (engine, style) are set per call and put back afterwards, so one process can serve any number of calls
+# Parsed reports are (path, report_dict, client, host_index) tuples, as the commands use them
+import contextlib
+import logging
+from openpyxl import load_workbook
+from . import settings
+from .errors import InputError
+from .checks import _Check_Path, _Check_Sheet, _Workbook_Sheets
+from .rules import STATUS_RULES, _Check_Status_Rules, _Load_Status_Rules
+from .backup import _Backup, _Backup_Wait
+from .workbook import _Finagle_WB, _Gen_Fresh_Workbook, _Load_Plugins, _Plugins_Fill, _Plugins_Merge, _Sheet_DF, _Stream_WB
+from .store import _Blob_Path
+from .nessus import _Expand_Reports, _Parse_Reports
+from .analysis import _Apply_Reports, _Build_Report_DF
+from .remediation import _Remed_Frames, _Remed_Label, _Remed_Months, _Write_Remed_Report
+from .commands import _Convert_Layout, _History_Report, _Import_Reports, _Migrate, _Scan_Delta
+
+log = logging.getLogger(__name__)
+
+# Sets the output engine and sheet style for the duration of one call; None leaves a setting as it is
+@contextlib.contextmanager
+def _Run_Settings (engine=None, style=None):
+    if engine is not None and engine not in ['openpyxl', 'stream']:
+        raise InputError("engine must be either openpyxl or stream.")
+    if style is not None and style not in ['cells', 'conditional']:
+        raise InputError("style must be either cells or conditional.")
+    saved = (settings.OUTPUT_ENGINE, settings.STYLE_MODE)
+    if engine is not None:
+        settings.OUTPUT_ENGINE = engine
+    if style is not None:
+        settings.STYLE_MODE = style
+    try:
+        yield
+    finally:
+        settings.OUTPUT_ENGINE, settings.STYLE_MODE = saved
+
+# Status rules can be given as a list shaped like STATUS_RULES (checked before the built-in ones, as with --rules), a path to a JSON file of them, or None for the built-in rules alone
+def _Rules (rules):
+    if rules is None:
+        return STATUS_RULES
+    if isinstance(rules, str):
+        return _Load_Status_Rules(rules)
+    _Check_Status_Rules(rules)
+    return list(rules) + STATUS_RULES
+
+# Parse options as the command line builds them, from keyword arguments
+def _Parse_Opts (min_severity, allow_plugins, deny_plugins, host_keys, blob_threshold, blob_store):
+    if blob_threshold is not None and blob_threshold <= settings.BLOB_PREVIEW:
+        raise InputError("blob_threshold must be over "+str(settings.BLOB_PREVIEW)+", the characters an offloaded output keeps in its cell.")
+    return {'min_severity': min_severity, 'allow_plugins': set(allow_plugins) if allow_plugins else None, 'deny_plugins': set(deny_plugins) if deny_plugins else None,
+            'fallback_keys': tuple(host_keys), 'blob_threshold': blob_threshold, 'blob_store': blob_store if blob_threshold is not None else None}
+
+# A list of paths is taken as is; a string can be anything -n accepts (comma-separated files, glob patterns or directories)
+def _Reports (nessusfiles):
+    if not isinstance(nessusfiles, str):
+        nessusfiles = ','.join(nessusfiles)
+    return _Expand_Reports(nessusfiles)
+
+# Parses .nessus files into a list of parsed reports, using the parse cache unless cache is False
+def parse (nessusfiles, min_severity=3, allow_plugins=None, deny_plugins=None, host_keys=(), workers=None, cache=True, cache_size=2048, blob_threshold=None, blob_store=None):
+    parse_opts = _Parse_Opts(min_severity, allow_plugins, deny_plugins, host_keys, blob_threshold, blob_store)
+    return _Parse_Reports(_Reports(nessusfiles), parse_opts, workers, {'enabled': cache, 'max_bytes': cache_size << 20})
+
+# The findings of one parsed report as a dataframe with the given columns (normally an analysis sheet's)
+def findings (report, columns):
+    return _Build_Report_DF(report[1], columns)
+
+# Reads the analysis sheets of a workbook into dataframes, every sheet unless sheets names some; plugin text is filled in for workbooks in the normalized layout
+def load (spreadsheet, sheets=None):
+    spreadsheet = _Check_Path(spreadsheet, 'x')
+    sheetnames = _Workbook_Sheets(spreadsheet)
+    if sheets is None:
+        sheets = [s for s in sheetnames if s not in settings.REF_SHEETS]
+    else:
+        sheets = [_Check_Sheet(s, sheetnames) for s in sheets]
+    wb = load_workbook(spreadsheet, read_only=True)
+    sheet_dfs = {s: _Sheet_DF(wb[s]) for s in sheets}
+    wb.close()
+    plugins_df = _Load_Plugins(spreadsheet)
+    if plugins_df is not None:
+        sheet_dfs = {s: _Plugins_Fill(df, plugins_df) for s, df in sheet_dfs.items()}
+    return sheet_dfs
+
+# Reconciles parsed reports against one analysis sheet's dataframe, oldest scan first, and returns the updated dataframe; the one passed in is left as it was
+def reconcile (sheet_df, reports, rules=None):
+    return _Apply_Reports(sheet_df.copy(), list(reports), None, _Rules(rules))[0]
+
+# Writes analysis sheet dataframes back into their workbook after backing it up; sheets not in sheet_dfs are kept, and so is the workbook's layout
+def render (spreadsheet, sheet_dfs, engine=None, style=None):
+    spreadsheet = _Check_Path(spreadsheet, 'x')
+    sheetnames = _Workbook_Sheets(spreadsheet)
+    for sheet in sheet_dfs:
+        _Check_Sheet(sheet, sheetnames)
+    plugins_df = _Load_Plugins(spreadsheet)
+    if plugins_df is not None:
+        for df in sheet_dfs.values():
+            plugins_df = _Plugins_Merge(plugins_df, df)
+    with _Run_Settings(engine, style):
+        _Backup_Wait(_Backup(spreadsheet, ask=False))
+        if settings.OUTPUT_ENGINE == 'stream':
+            _Stream_WB(spreadsheet, dict(sheet_dfs), spreadsheet, plugins_df)
+        else:
+            _Finagle_WB(spreadsheet, load_workbook(spreadsheet, read_only=False), dict(sheet_dfs), plugins_df)
+
+# Does everything -2 does without asking anything: parses, reconciles and saves the workbook (or the state store, with store=True); returns the reconciled dataframe of every changed sheet
+# The import is added to the finding history unless history is False
+# Scans go to the sheet named after their client, or to sheet when there's no such sheet
+def import_reports (spreadsheet, nessusfiles, sheet='', rules=None, store=False, render=False, engine=None, style=None, workers=None, cache=True, cache_size=2048,
+                    min_severity=3, allow_plugins=None, deny_plugins=None, host_keys=(), blob_threshold=None, history=True):
+    spreadsheet = _Check_Path(spreadsheet, 'x')
+    reports = _Reports(nessusfiles)
+    parse_opts = _Parse_Opts(min_severity, allow_plugins, deny_plugins, host_keys, blob_threshold, _Blob_Path(spreadsheet))
+    run_opts = {'rules': _Rules(rules), 'workers': workers, 'store': store, 'render': render, 'history': history, 'cache': {'enabled': cache, 'max_bytes': cache_size << 20}}
+    with _Run_Settings(engine, style):
+        return _Import_Reports(reports, spreadsheet, sheet, parse_opts, run_opts, ask=False)
+
+# Gathers the rows remediated in the given months (anything -m accepts, or a list of month numbers) from the given sheets, every analysis sheet by default
+# Returns them in one dataframe with Sheet and Month columns, and writes the -4 report workbook to output when it's given and there's anything to report
+def report (spreadsheet, months, sheets=None, output=None):
+    spreadsheet = _Check_Path(spreadsheet, 'x')
+    sheetnames = _Workbook_Sheets(spreadsheet)
+    if sheets is None:
+        sheets = [s for s in sheetnames if s not in settings.REF_SHEETS]
+    else:
+        sheets = [_Check_Sheet(s, sheetnames) for s in sheets]
+    month_list = _Remed_Months(','.join(str(m) for m in months) if isinstance(months, (list, tuple)) else months)
+    if month_list is None:
+        raise InputError("Invalid month selection: "+str(months))
+    sheet_dfs, remed_df = _Remed_Frames(spreadsheet, sheets, month_list)
+    if output is not None and len(remed_df) == 0:
+        log.info("No remediations found for "+_Remed_Label(month_list)+"; "+output+" was not written.")
+    elif output is not None:
+        _Write_Remed_Report(_Check_Path(output, 'v'), sheet_dfs, remed_df, _Remed_Label(month_list))
+    return remed_df
+
+# Does what -5 does: writes the still-open rows of every sheet into a new workbook; returns its path
+# The new workbook is always streamed in one pass, so engine makes no difference here; it's still accepted so existing callers keep working
+def migrate (spreadsheet, new_spreadsheet, workers=None, engine=None, style=None):
+    spreadsheet = _Check_Path(spreadsheet, 'x')
+    new_spreadsheet = _Check_Path(new_spreadsheet, 'v')
+    with _Run_Settings(engine, style):
+        _Migrate(spreadsheet, new_spreadsheet, workers)
+    return new_spreadsheet
+
+# Creates a fresh analysis workbook with the given sheets, in the flat or the normalized layout; returns its path
+def create (spreadsheet, sheets, layout='flat', style=None):
+    spreadsheet = _Check_Path(spreadsheet, 'v')
+    if layout != 'normalized' and layout != 'flat':
+        raise InputError("Layout must be 'normalized' or 'flat'.")
+    with _Run_Settings(None, style):
+        _Gen_Fresh_Workbook(spreadsheet, list(sheets))
+        if layout == 'normalized':
+            _Convert_Layout(spreadsheet, layout, ask=False)
+    return spreadsheet
+
+# Rewrites a workbook in the normalized or the flat layout, backing it up first
+def convert_layout (spreadsheet, layout, engine=None, style=None):
+    with _Run_Settings(engine, style):
+        _Convert_Layout(_Check_Path(spreadsheet, 'x'), layout, ask=False)
+
+# Compares the .nessus file new with an older one, or with the rows of a sheet of spreadsheet that aren't remediated; returns the delta (one row per New, Fixed or Persisting finding) and its per-host and per-plugin counts
+# The delta is also written to output (.xlsx or .csv) when it's given; the spreadsheet is only read
+def delta (old, new, spreadsheet=None, output=None, workers=None, cache=True, cache_size=2048, min_severity=3, allow_plugins=None, deny_plugins=None, host_keys=()):
+    new = _Check_Path(new, 'n')
+    if not old.lower().endswith('.nessus'):
+        if spreadsheet is None:
+            raise InputError("Comparing against the "+old+" sheet needs the spreadsheet it's in.")
+        spreadsheet = _Check_Path(spreadsheet, 'x')
+    parse_opts = _Parse_Opts(min_severity, allow_plugins, deny_plugins, host_keys, None, None)
+    return _Scan_Delta(old, new, spreadsheet, output, parse_opts, {'workers': workers, 'cache': {'enabled': cache, 'max_bytes': cache_size << 20}})
+
+# Queries the finding history that imports record next to spreadsheet: queries is 'all' or a comma-separated list of 'mttr', 'age' and 'recurrence', and since/until limit it to months given as YYYY-MM
+# Returns a dataframe per query; they're also written to output (.xlsx or .csv) when it's given. The workbook itself is never opened
+def query_history (spreadsheet, queries='all', sheets=None, since=None, until=None, output=None):
+    return _History_Report(_Check_Path(spreadsheet, 'x'), queries, sheets, since, until, output)
@@ -0,0 +1,95 @@
+# Content-hashed backups of the analysis workbook, taken in a background thread before it's changed
+import logging
+import os
+from os import path, mkdir, replace
+import shutil
+import gzip
+import threading
+import hashlib
+from . import settings
+from .errors import BackupError
+
+log = logging.getLogger(__name__)
+
+# Backs up the analysis spreadsheet to a local directory
+# Backups are named after a hash of the workbook's contents, so an unchanged workbook is never copied twice; the copy runs in a background thread while the caller gets on with parsing
+# Returns a job to hand to _Backup_Wait, which must be called before the workbook is saved; with ask=False a missing backup directory isn't offered, and the backup goes next to the spreadsheet
+def _Backup (existing_spreadsheet, ask=True):
+    backup_dir = path.join(path.dirname(path.abspath(existing_spreadsheet)), 'Vulnerability Analysis Backups')
+    if not path.isdir(backup_dir):
+        bak = input("No dedicated backup directory specified in this running location. Would you like to create one? y|n: ") if ask else 'n'
+        if bak == 'y':
+            log.info("Creating backup directory...")
+            mkdir(backup_dir)
+        else:
+            log.info("Backup file is being saved next to the spreadsheet...")
+            backup_dir = path.dirname(path.abspath(existing_spreadsheet))
+    job = {'error': None}
+    job['thread'] = threading.Thread(target=_Backup_Copy, args=(existing_spreadsheet, backup_dir, job))
+    job['thread'].start()
+    return job
+
+# Waits for a backup job to finish; the run stops rather than save over a workbook whose backup failed
+def _Backup_Wait (job):
+    job['thread'].join()
+    if job['error'] is not None:
+        raise BackupError("Backup failed ("+str(job['error'])+"); the spreadsheet was not modified.")
+
+def _Backup_Copy (existing_spreadsheet, backup_dir, job):
+    try:
+        h = hashlib.blake2b(digest_size=8)
+        with open(existing_spreadsheet, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        name = path.basename(existing_spreadsheet)+'.'+h.hexdigest()+'.bak'+('.gz' if settings.BACKUP_MODE == 'gzip' else '')
+        backup = path.join(backup_dir, name)
+        if path.isfile(backup):
+            log.info("An identical backup already exists; skipping the copy.")
+            _Backup_Touch(backup) # counts as the newest backup for retention
+        else:
+            log.info("Now saving a backup to "+backup_dir+"...")
+            tmp = backup+'.tmp'
+            if settings.BACKUP_MODE == 'gzip':
+                with open(existing_spreadsheet, 'rb') as src, gzip.open(tmp, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+                replace(tmp, backup)
+            elif settings.BACKUP_MODE == 'hardlink': # safe because every save in this script replaces the workbook file instead of rewriting it in place
+                os.link(existing_spreadsheet, backup)
+                _Backup_Touch(backup) # the link carries the workbook's own mtime, which says nothing about when the backup was taken
+            else:
+                shutil.copyfile(existing_spreadsheet, tmp)
+                replace(tmp, backup)
+        _Backup_Prune(existing_spreadsheet, backup_dir)
+    except OSError as e:
+        job['error'] = e
+
+# Marks a backup as just taken or reused. A hardlinked backup that still shares its inode with the workbook can't be touched without touching the live workbook too,
+# so its time goes on an empty '<backup>.seen' stamp file next to it instead
+def _Backup_Touch (backup):
+    if os.stat(backup).st_nlink > 1 or path.isfile(backup+'.seen'):
+        with open(backup+'.seen', 'a'):
+            pass
+        os.utime(backup+'.seen')
+    else:
+        os.utime(backup)
+
+# When a backup was last taken or reused: its stamp file's time when it has one, otherwise its own mtime
+def _Backup_Time (backup):
+    if path.isfile(backup+'.seen'):
+        return max(path.getmtime(backup), path.getmtime(backup+'.seen'))
+    return path.getmtime(backup)
+
+# Applies the retention policy to one workbook's backups: keep the newest BACKUP_KEEP of them and drop any older than BACKUP_DAYS
+def _Backup_Prune (existing_spreadsheet, backup_dir):
+    prefix = path.basename(existing_spreadsheet)+'.'
+    backups = [path.join(backup_dir, b) for b in os.listdir(backup_dir) if b.startswith(prefix) and (b.endswith('.bak') or b.endswith('.bak.gz'))]
+    times = {b: _Backup_Time(b) for b in backups}
+    backups.sort(key=times.get, reverse=True)
+    now = settings._Today().timestamp()
+    for i in range(len(backups)):
+        too_many = settings.BACKUP_KEEP is not None and i >= settings.BACKUP_KEEP
+        too_old = settings.BACKUP_DAYS is not None and now - times[backups[i]] > settings.BACKUP_DAYS*86400
+        if too_many or too_old:
+            os.remove(backups[i])
+            if path.isfile(backups[i]+'.seen'):
+                os.remove(backups[i]+'.seen')
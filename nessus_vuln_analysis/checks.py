@@ -0,0 +1,57 @@
+# Validation of the paths and sheet names handed to the commands; failures raise InputError
+from os import path
+import zipfile
+from xml.etree import ElementTree
+from .settings import REF_SHEETS
+from .errors import InputError
+
+# Takes a path and a flag for what it should point to, and returns the path (a new spreadsheet's gets its .xlsx extension); raises InputError naming the problem if it doesn't check out
+# The path is checked once: nothing here prompts, so trying it again could only fail the same way
+def _Check_Path (p, opt):
+    if opt == 'v': # v option checks if given path / file combo is valid as a new spreadsheet
+        if not path.isdir(path.dirname(path.abspath(p))):
+            raise InputError('Invalid directory selected for '+p+'.')
+        if p.split(".")[-1] != 'xlsx':
+            p = p+'.xlsx'
+    elif opt == 'n': # n option indicates path to .nessus file, checks for valid file based on extension
+        if not (path.isfile(p) and p.split(".")[-1] == "nessus"):
+            raise InputError(p+' is not a valid nessus file.')
+    elif opt == 'f': # f option indicates path directly to file, checks simply for valid path
+        if not path.isfile(p):
+            raise InputError('Invalid path to file: '+p)
+    elif opt == 'd': # d option indicates path to a directory, checks simply for valid path
+        if not path.isdir(p):
+            raise InputError('Invalid path to directory: '+p)
+    elif opt == 'x': # x option indicates an excel file that has been generated by this Python program
+        if not (p.split('.')[-1] == "xlsx" and path.isfile(p)): # isolate/check the extension and check that the workbook exists
+            raise InputError('Invalid path for '+p+'. Make sure the full path is correct, that the extension is .xlsx, and that the target is a workbook generated originally by this Python tool.')
+        sheetlist = _Workbook_Sheets(p) # only the workbook manifest is read, not the sheets themselves
+        if "statuses" not in sheetlist or "columns" not in sheetlist: # determines if the excel file has been generated by this program by checking for the existance of specific sheetnames
+            raise InputError(p+' does not appear to be a compatible workbook. Please provide a workbook that has been generated by this program.')
+    return p
+
+# Reads the list of sheet names straight out of an xlsx file's workbook.xml manifest without loading any sheet; returns an empty list if the file isn't a readable workbook
+def _Workbook_Sheets (p):
+    try:
+        with zipfile.ZipFile(p) as z:
+            manifest = ElementTree.fromstring(z.read('xl/workbook.xml')) # the standard library parser, so validating a path never pulls in lxml
+    except (zipfile.BadZipFile, KeyError, OSError, ElementTree.ParseError):
+        return []
+    return [sheet.attrib['name'] for sheet in manifest.iterfind('.//{*}sheet')]
+
+# Takes a string input sheet name and checks to see if it's valid within the context of a valid vuln mgmt workbook's list of sheet names; raises InputError if it isn't
+def _Check_Sheet (sheet, sheetnames):
+    if sheet in REF_SHEETS:
+        raise InputError('Sheet '+sheet+' cannot be modified.')
+    if sheet not in sheetnames:
+        raise InputError('There is no sheet named '+sheet+' in the workbook.')
+    return sheet
+
+# Takes a path to a new file and makes sure it's a valid directory, raising InputError if it isn't
+def _Check_Opt_Path (opt_path):
+    dr = opt_path.split("\\")
+    dr2 = "\\".join(dr[:-2])
+    if path.isdir(dr2):
+        what = 1
+    else:
+        raise InputError("The path you provided is bad.")
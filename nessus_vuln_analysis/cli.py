@@ -0,0 +1,292 @@
+# Command line option handling; the heavy modules are only imported once the options are known to be good and a command is about to run
+from sys import exit
+import sys
+import logging
+import getopt
+from . import settings
+from .rules import STATUS_RULES, _Load_Status_Rules
+from .metrics import _Metrics_Finish, _Metrics_Start
+from .errors import AnalysisError, InputError
+
+# Takes an error description and exits the program - every AnalysisError raised by a command ends up here
+def _Err_Exit (error_text):
+    print(error_text)
+    exit(1)
+
+# The commands report their progress through logging; on the command line every message is printed as-is, the way the prompts are
+def _Log_Setup ():
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    log = logging.getLogger(__package__)
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+    log.propagate = False
+
+# Display commandline help text
+def _Opt_Help ():
+    help = r"""For CLI usage, provide an option of 1 through 5; otherwise, you'll be prompted to use the interactive prompt.
+             Example usage:
+                Import .nessus file into spreadsheet:
+                    nessus-vuln-analysis.py -2 -n \"C:\Users\Me\Report.nessus\" -s \"C:\Users\Me\Analysis_Spreadsheet.xlsx\"
+
+                -h : print this help text
+                -i : follow the script's interactive prompt
+                -1 : generate a fresh analysis spreadsheet and exit; optional arguments for new filepath and sheet names
+                -2 : import one or more .nessus files into an existing analysis spreadsheet and exit; optional arguments for paths to nessus file(s) and spreadsheet
+                -3 : add a new sheet(s) to an existing analysis spreadsheet and exit; optional argument for sheet name(s)
+                -4 : generate a remediation report and exit; optional arguments for sheet name(s) and month(s); -t all reports on every analysis sheet, and everything lands in one workbook with a summary sheet
+                -5 : transition to a new spreadsheet, saving it in the same directory as the old one, and exit; optional arguments for old spreadsheet path
+                -n : the path to a .nessus report file; include the extension! For -2 this can also be a comma-separated list (no spaces!) of files, glob patterns (quote them!) or directories
+                --style : how analysis sheets are formatted; 'cells' (default) styles every cell, 'conditional' colours rows with conditional formatting on the Status column instead of per-cell fills and fonts, which costs the same no matter how many rows there are
+                --engine : how -2 writes the workbook; 'openpyxl' (default) edits it in memory, 'stream' writes every sheet row by row with flat memory use (custom formatting added by hand in Excel is not carried over). -5 always streams its new workbook
+                --store : with -2, reconcile against the sidecar state store (<spreadsheet>.state.sqlite) instead of the workbook; analyst edits made in Excel are synced into the store first, and the workbook is only rewritten with --render
+                --sync : on its own, pull analyst edits (Status, Notes, Ticket #, ...) from the spreadsheet into its state store and exit
+                --render : with -2 --store, rewrite the workbook from the state store after importing; on its own, sync and then rewrite the workbook from the store and exit
+                --no-cache : with -2, always parse the .nessus files instead of loading them from the parse cache (~/.nessus-vuln-analysis/parse-cache)
+                --clear-cache : empty the parse cache; exits afterwards unless a numbered option was also given
+                --cache-size : size limit of the parse cache in MB (default 2048); least recently used reports are dropped first
+                --backup-mode : how -2 and -3 back up the spreadsheet before changing it; 'copy' (default), 'gzip' or 'hardlink'. Backups are named by content hash, so an unchanged spreadsheet is only backed up once
+                --backup-keep : keep only this many of the newest backups of the spreadsheet
+                --backup-days : delete backups of the spreadsheet older than this many days
+                --metrics : path of a JSON file to write run metrics to: wall time, CPU time, peak RSS and row/host counts for every stage (parse, load, build, reconcile, add-new, style, backup, save) of options 1-5
+                --profile : path of a cProfile stats file to dump for the run (open it with pstats or snakeviz)
+                --layout : 'normalized' keeps each plugin's Synopsis and Solution once in a hidden 'plugins' sheet and has the finding rows look it up by Plugin ID, which makes big workbooks much smaller; 'flat' puts the text back on every row. On its own it converts the spreadsheet and exits; with -1 it creates the new spreadsheet normalized. -2, -4 and -5 keep whichever layout a spreadsheet already has
+                --blob-threshold : with -2, plugin outputs longer than this many characters are stored compressed in <spreadsheet>.blobs.sqlite; the Output cell keeps the first 1000 characters and the output's key, so the threshold must be over 1000
+                --fetch-output : on its own, print the full plugin output stored under a key (or pasted Output cell text) in the spreadsheet's blob store and exit
+                --watch : on its own, keep running and import every .nessus file dropped into this folder into the spreadsheet (-s), keeping its sheets loaded between imports; -t names the sheet for scans whose name doesn't match one. Stop it with Ctrl+C
+                --debounce : with --watch, seconds the folder must be quiet before the files that arrived are imported together (default 5)
+                --flush-idle : with --watch, save the spreadsheet once no new files have arrived for this many seconds (default 30)
+                --flush-every : with --watch, never leave imports unsaved for longer than this many seconds (default 300)
+                --delta : on its own, compare the newer scan given with -n against this older .nessus file, or against the rows of this sheet of the spreadsheet (-s) that aren't remediated, and write which findings (Vulnerability Name + MAC) are new, fixed and persisting, with counts per host and per plugin. The spreadsheet is only read
+                --delta-out : with --delta, where to write it; an .xlsx (the default, '<scan name> Scan Delta_<date>.xlsx' next to the newer scan) gets summary, host, plugin and changes sheets, a .csv gets the new and fixed findings with <name>.hosts.csv and <name>.plugins.csv next to it
+                --no-history : with -2 or --watch, don't add the import to the spreadsheet's finding history. Otherwise every new finding, status change and sighting is appended to <spreadsheet>.history (Parquet files partitioned by the month of the scan; needs pyarrow), which -5 carries over to the new spreadsheet
+                --history : on its own, query the spreadsheet's finding history without opening the workbook: 'mttr' (mean time to remediate per month, sheet and severity), 'age' (ages of the findings still open), 'recurrence' (per plugin, how often remediated findings came back), a comma-separated list of them or 'all'; -t limits it to some sheets
+                --since, --until : with --history, the first and last month (YYYY-MM) of history to query
+                --history-out : with --history, also write the tables to this .xlsx (one sheet per query) or .csv (<name>.<query>.csv per query)
+                --workers : number of processes used to parse a batch of .nessus files and reconcile its sheets (-2) or filter sheets during migration (-5); defaults to one per CPU
+                -s : the path to an analysis spreadsheet compatible with this script; include the extension!
+                -t : provide a sheet name or list of sheet names (comma-separated, no spaces!) to pass into functions that require them
+                --min-severity : lowest Nessus severity (0-4) kept while parsing a .nessus file; defaults to 3 since only highs and criticals are imported
+                --allow-plugins : comma-separated list (no spaces!) of plugin IDs to keep while parsing; all other plugins are dropped
+                --deny-plugins : comma-separated list (no spaces!) of plugin IDs to drop while parsing
+                --host-keys : comma-separated list (no spaces!) of host properties (netbios-name, host-rdns) that identify the same device in addition to its MAC addresses
+                --rules : path to a JSON file of site-specific status rules (same shape as STATUS_RULES) that are checked before the built-in ones during -2 imports
+                -m : provide a number that represents a month, a range (1-6), a comma-separated list (1,4,7) or 'all'; the month number associations are as follows:
+                         Jan : 1
+                         Feb : 2
+                         Mar : 3
+                         Apr : 4
+                         May : 5
+                         Jun : 6
+                         Jul : 7
+                         Aug : 8
+                         Sep : 9
+                         Oct : 10
+                         Nov : 11
+                         Dec : 12"""
+    print(help)
+
+# Converts a numeric option's argument with kind (int or float), refusing anything below minimum; bad input is reported like every other bad option instead of ending in a traceback
+def _Number_Opt (opt, arg, kind, minimum):
+    try:
+        value = kind(arg)
+    except ValueError:
+        raise InputError(opt+" takes "+("a whole number" if kind is int else "a number")+", not "+repr(arg)+".")
+    if value < minimum:
+        raise InputError(opt+" must be at least "+str(minimum)+", not "+arg+".")
+    return value
+
+def _Cycle_Opts (opts):
+    nessusfile = ''
+    spreadsheet = ''
+    sheets = ''
+    month = ''
+    parse_opts = {'min_severity': 3, 'allow_plugins': None, 'deny_plugins': None, 'fallback_keys': (), 'blob_threshold': None, 'blob_store': None} # only highs and criticals are imported, so nothing lower needs to be parsed by default
+    run_opts = {'rules': STATUS_RULES, 'workers': None, 'store': False, 'render': False, 'metrics': None, 'profile': None, 'layout': None, 'fetch': None, 'delta': {'old': None, 'output': ''}, 'history': True, 'query': {'queries': None, 'since': None, 'until': None, 'output': None}, 'watch': {'dir': None, 'debounce': 5, 'flush_idle': 30, 'flush_every': 300}, 'cache': {'enabled': True, 'max_bytes': 2 << 30}}
+    for opt, arg in opts:
+        if opt == "-n":
+            nessusfile = arg
+        elif opt == "-s":
+            spreadsheet = arg
+        elif opt == "-t":
+            sheets = arg
+        elif opt == "-m":
+            month = arg
+        elif opt == "--min-severity":
+            parse_opts['min_severity'] = _Number_Opt(opt, arg, int, 0)
+        elif opt == "--allow-plugins":
+            parse_opts['allow_plugins'] = set(arg.strip(" ").split(','))
+        elif opt == "--deny-plugins":
+            parse_opts['deny_plugins'] = set(arg.strip(" ").split(','))
+        elif opt == "--host-keys":
+            parse_opts['fallback_keys'] = tuple(arg.strip(" ").split(','))
+        elif opt == "--rules":
+            run_opts['rules'] = _Load_Status_Rules(arg)
+        elif opt == "--workers":
+            run_opts['workers'] = _Number_Opt(opt, arg, int, 1)
+        elif opt == "--style":
+            if arg not in ['cells', 'conditional']:
+                raise InputError("--style must be either cells or conditional.")
+            settings.STYLE_MODE = arg
+        elif opt == "--engine":
+            if arg not in ['openpyxl', 'stream']:
+                raise InputError("--engine must be either openpyxl or stream.")
+            settings.OUTPUT_ENGINE = arg
+        elif opt == "--store":
+            run_opts['store'] = True
+        elif opt == "--metrics":
+            run_opts['metrics'] = arg
+        elif opt == "--layout":
+            run_opts['layout'] = arg
+        elif opt == "--blob-threshold":
+            parse_opts['blob_threshold'] = _Number_Opt(opt, arg, int, settings.BLOB_PREVIEW + 1) # an output no longer than its preview would only gain a key by being offloaded
+        elif opt == "--fetch-output":
+            run_opts['fetch'] = arg
+        elif opt == "--watch":
+            run_opts['watch']['dir'] = arg
+        elif opt == "--no-history":
+            run_opts['history'] = False
+        elif opt == "--history":
+            run_opts['query']['queries'] = arg
+        elif opt == "--since":
+            run_opts['query']['since'] = arg
+        elif opt == "--until":
+            run_opts['query']['until'] = arg
+        elif opt == "--history-out":
+            run_opts['query']['output'] = arg
+        elif opt == "--delta":
+            run_opts['delta']['old'] = arg
+        elif opt == "--delta-out":
+            run_opts['delta']['output'] = arg
+        elif opt == "--debounce":
+            run_opts['watch']['debounce'] = _Number_Opt(opt, arg, float, 0)
+        elif opt == "--flush-idle":
+            run_opts['watch']['flush_idle'] = _Number_Opt(opt, arg, float, 0)
+        elif opt == "--flush-every":
+            run_opts['watch']['flush_every'] = _Number_Opt(opt, arg, float, 0)
+        elif opt == "--profile":
+            run_opts['profile'] = arg
+        elif opt == "--backup-mode":
+            if arg not in ['copy', 'gzip', 'hardlink']:
+                raise InputError("--backup-mode must be copy, gzip or hardlink.")
+            settings.BACKUP_MODE = arg
+        elif opt == "--backup-keep":
+            settings.BACKUP_KEEP = _Number_Opt(opt, arg, int, 1)
+        elif opt == "--backup-days":
+            settings.BACKUP_DAYS = _Number_Opt(opt, arg, float, 0)
+        elif opt == "--no-cache":
+            run_opts['cache']['enabled'] = False
+        elif opt == "--cache-size":
+            run_opts['cache']['max_bytes'] = _Number_Opt(opt, arg, int, 0) << 20
+        elif opt == "--render":
+            run_opts['render'] = True
+    return nessusfile, spreadsheet, sheets, month, parse_opts, run_opts
+
+def main (argv):
+    _Log_Setup()
+    try:
+        opts, args = getopt.getopt(argv,"hi12345n:s:t:m:",["nessusfile=","spreadsheet=","sheets=","month=","min-severity=","allow-plugins=","deny-plugins=","host-keys=","rules=","workers=","style=","engine=","store","sync","render","no-cache","clear-cache","cache-size=","backup-mode=","backup-keep=","backup-days=","metrics=","profile=","layout=","blob-threshold=","fetch-output=","watch=","debounce=","flush-idle=","flush-every=","delta=","delta-out=","no-history","history=","since=","until=","history-out="])
+    except getopt.GetoptError:
+        _Opt_Help()
+        exit(2)
+
+    selection = 0
+    while selection == 0:
+        for opt, arg in opts:
+            if opt == '-h':
+                _Opt_Help()
+                exit()
+            elif opt == "-i":
+                break
+            elif opt == "-1":
+                selection = 1
+            elif opt == "-2":
+                selection = 2
+            elif opt == "-3":
+                selection = 3
+            elif opt == "-4":
+                selection = 4
+            elif opt == "-5":
+                selection = 5
+            elif (opt == "--sync" or opt == "--render") and selection == 0:
+                selection = 'store'
+            elif opt == "--layout" and selection == 0:
+                selection = 'layout'
+            elif opt == "--fetch-output" and selection == 0:
+                selection = 'fetch'
+            elif opt == "--watch" and selection == 0:
+                selection = 'watch'
+            elif opt == "--delta" and selection == 0:
+                selection = 'delta'
+            elif opt == "--history" and selection == 0:
+                selection = 'history'
+            elif opt == "--clear-cache":
+                from .nessus import _Cache_Clear
+                _Cache_Clear()
+                if selection == 0:
+                    selection = 6
+
+        if selection == 0:
+            print("----------MENU----------")
+            print("1. Create fresh spreadsheet")
+            print("2. Feed new reports")
+            print("3. Add a new sheet to existing spreadsheet")
+            print("4. Generate a Remediation Report")
+            print("5. Transition to new workbook")
+            print("6. Exit")
+            selection = int(input("Enter a number option: "))
+
+    try:
+        nessusfile, spreadsheet, sheets, month, parse_opts, run_opts = _Cycle_Opts(opts)
+    except AnalysisError as e:
+        _Err_Exit(str(e))
+    if selection == 6:
+        exit()
+    from .commands import _1_Create_Fresh_Spreadsheet, _2_Feed_New_Reports, _3_Add_New_Sheet, _4_Generate_Remed_Report, _5_Migrate_Spreadsheet, _Convert_Layout, _Delta_Command, _Fetch_Output, _History_Command, _Store_Command, _Watch_Folder # pandas, openpyxl and lxml load here, after the options have been checked
+    profiler = _Metrics_Start(selection, run_opts)
+    try:
+        if selection == 1:
+            spreadsheet = _1_Create_Fresh_Spreadsheet(spreadsheet, sheets)
+            if run_opts['layout'] == 'normalized':
+                _Convert_Layout(spreadsheet, 'normalized')
+            exit()
+        if selection == 2:
+            _2_Feed_New_Reports(nessusfile, spreadsheet, sheets, parse_opts, run_opts)
+            exit()
+        if selection == 3:
+            _3_Add_New_Sheet(spreadsheet, sheets)
+            exit()
+        if selection == 4:
+            _4_Generate_Remed_Report(spreadsheet, sheets, month)
+            exit()
+        if selection == 5:
+            _5_Migrate_Spreadsheet(spreadsheet, run_opts['workers'])
+            exit()
+        if selection == 'layout':
+            _Convert_Layout(spreadsheet, run_opts['layout'])
+            exit()
+        if selection == 'watch':
+            _Watch_Folder(run_opts['watch']['dir'], spreadsheet, sheets, parse_opts, run_opts)
+            exit()
+        if selection == 'delta':
+            _Delta_Command(run_opts['delta']['old'], nessusfile, spreadsheet, run_opts['delta']['output'], parse_opts, run_opts)
+            exit()
+        if selection == 'history':
+            output = run_opts['query']['output']
+            tables = _History_Command(spreadsheet, run_opts['query']['queries'], sheets, run_opts['query']['since'], run_opts['query']['until'], output)
+            for query in tables:
+                print("\n----------"+query.upper()+"----------")
+                print(tables[query].to_string(index=False) if len(tables[query]) > 0 else "(nothing recorded)")
+            if output not in [None, '']:
+                print("\nThe tables have been saved to "+output+".")
+            exit()
+        if selection == 'fetch':
+            print(_Fetch_Output(spreadsheet, run_opts['fetch']))
+            exit()
+        if selection == 'store':
+            _Store_Command(spreadsheet, run_opts['render'])
+            exit()
+    except AnalysisError as e:
+        _Err_Exit(str(e))
+    finally: # options finish by calling exit(), so the metrics are written on the way out
+        _Metrics_Finish(run_opts, profiler)
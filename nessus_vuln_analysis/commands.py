@@ -0,0 +1,641 @@
+# The commands behind the numbered options and the standalone long options; these prompt for anything they weren't given
+import logging
+from logging.handlers import QueueHandler
+import queue
+import re
+import time
+from openpyxl import load_workbook
+from lxml import etree
+import os
+from os import path
+import shutil
+import hashlib
+import zipfile
+import glob
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import pandas as pd
+from . import settings
+from .settings import DELTA_CHANGES, MONTH_NAMES, PLUGINS_SHEET, PLUGIN_TEXT_COLUMNS, REF_SHEETS, blob_re
+from .metrics import _Metrics_Option, _Stage_End, _Stage_Start, _Stages_Merge, _Worker_Metrics_End, _Worker_Metrics_Start
+from .errors import BackupError, InputError
+from .checks import _Check_Path, _Check_Sheet, _Workbook_Sheets
+from .backup import _Backup, _Backup_Wait
+from .workbook import _Finagle_WB, _Gen_Fresh_Workbook, _Load_Plugins, _Plugins_Fill, _Plugins_Merge, _Rows_DF, _Save_WB, _Set_Col_Widths, _Set_Cond_Formats, _Sheet_DF, _Stream_WB, _Style_Cols, data_val
+from .store import _Blob_Connect, _Blob_Get, _Blob_Path, _Store_Connect, _Store_Load_Sheet, _Store_Moves, _Store_Path, _Store_Read, _Store_Set_Meta, _Store_Sheets, _Store_Snapshot, _Store_Sync, _Store_Write
+from .nessus import _Expand_Reports, _Parse_Reports, _Scan_Date
+from .analysis import _Apply_Reports, _Compact_DF
+from .remediation import _Remed_Frames, _Remed_Label, _Remed_Months, _Write_Remed_Report
+from .compare import _Report_Side, _Scan_Delta_Frames, _Sheet_Side, _Write_Delta
+from .history import HISTORY_QUERIES, _History_Available, _History_Path, _History_Query, _History_Write
+
+log = logging.getLogger(__name__)
+
+# Function to run for --layout without a numbered option: rewrite a workbook in the normalized or the flat layout
+def _Convert_Layout (spreadsheet, layout, ask=True):
+    if spreadsheet == '':
+        spreadsheet = _Check_Path(input("Enter a path to your existing analysis spreadsheet"), 'x')
+    else:
+        spreadsheet = _Check_Path(spreadsheet, 'x')
+    if layout != 'normalized' and layout != 'flat':
+        raise InputError("Layout must be 'normalized' or 'flat'.")
+    backup = _Backup(spreadsheet, ask)
+    plugins_df = _Load_Plugins(spreadsheet)
+    wb = load_workbook(spreadsheet, read_only=True)
+    sheet_dfs = {s: _Sheet_DF(wb[s]) if wb[s].max_row else pd.DataFrame() for s in wb.sheetnames if s not in REF_SHEETS}
+    wb.close()
+    sheet_dfs = {s: df for s, df in sheet_dfs.items() if 'Plugin ID' in df.columns}
+    log.info("Converting "+path.basename(spreadsheet)+" to the "+layout+" layout...")
+    if plugins_df is not None: # the text of a normalized workbook is filled back in first, so every row carries it whichever way it's going
+        sheet_dfs = {s: _Plugins_Fill(df, plugins_df) for s, df in sheet_dfs.items()}
+    if layout == 'normalized':
+        plugins_df = pd.DataFrame(columns=['Plugin ID'] + PLUGIN_TEXT_COLUMNS)
+        for df in sheet_dfs.values():
+            plugins_df = _Plugins_Merge(plugins_df, df)
+    else:
+        plugins_df = None
+    _Backup_Wait(backup)
+    if settings.OUTPUT_ENGINE == 'stream':
+        _Stream_WB(spreadsheet, sheet_dfs, spreadsheet, plugins_df)
+    else:
+        wb = load_workbook(spreadsheet, read_only=False)
+        if plugins_df is None and PLUGINS_SHEET in wb.sheetnames:
+            wb.remove(wb[PLUGINS_SHEET])
+        _Finagle_WB(spreadsheet, wb, sheet_dfs, plugins_df)
+
+# Re-renders the workbook's analysis sheets from the store with the active output engine
+def _Store_Render (con, spreadsheet):
+    sheetnames = _Workbook_Sheets(spreadsheet)
+    sheet_dfs = dict()
+    for sheet in _Store_Sheets(con):
+        if sheet in sheetnames:
+            sheet_dfs[sheet] = _Store_Read(con, sheet)
+    plugins_df = _Load_Plugins(spreadsheet)
+    if plugins_df is not None: # normalized layout: new plugin text in the store goes into the plugins sheet
+        for sheet in sheet_dfs:
+            plugins_df = _Plugins_Merge(plugins_df, sheet_dfs[sheet])
+    if settings.OUTPUT_ENGINE == 'stream':
+        _Stream_WB(spreadsheet, sheet_dfs, spreadsheet, plugins_df)
+    else:
+        _Finagle_WB(spreadsheet, load_workbook(spreadsheet, read_only=False), sheet_dfs, plugins_df)
+    for sheet in sheet_dfs:
+        _Store_Snapshot(con, sheet, sheet_dfs[sheet])
+    _Store_Set_Meta(con, 'workbook_mtime', str(path.getmtime(spreadsheet)))
+
+# Function to run for --sync and --render without a numbered option: bring the store and the workbook back in line
+def _Store_Command (spreadsheet, render):
+    if spreadsheet == '':
+        spreadsheet = _Check_Path(input("Enter a path to your existing analysis spreadsheet"), 'x')
+    else:
+        spreadsheet = _Check_Path(spreadsheet, 'x')
+    con = _Store_Connect(spreadsheet)
+    _Store_Sync(con, spreadsheet)
+    if render:
+        _Backup_Wait(_Backup(spreadsheet))
+        _Store_Render(con, spreadsheet)
+    con.close()
+
+# Function to run for --fetch-output without a numbered option: return an offloaded plugin output in full for printing; the key can also be given as the whole cell text
+def _Fetch_Output (spreadsheet, key):
+    if spreadsheet == '':
+        spreadsheet = _Check_Path(input("Enter a path to your existing analysis spreadsheet"), 'x')
+    else:
+        spreadsheet = _Check_Path(spreadsheet, 'x')
+    match = blob_re.search(key)
+    if match is not None:
+        key = match.group(1)
+    if not path.isfile(_Blob_Path(spreadsheet)):
+        raise InputError("No blob store found for "+path.basename(spreadsheet)+".")
+    con = _Blob_Connect(_Blob_Path(spreadsheet))
+    text = _Blob_Get(con, key.strip())
+    con.close()
+    if text is None:
+        raise InputError("No stored output with key "+key+".")
+    return text
+
+# Function to run for --delta without a numbered option: compare the newer scan (-n) with an older .nessus file, or with the open rows of a sheet of the spreadsheet (-s), and write the delta
+def _Delta_Command (old, nessusfile, spreadsheet, output, parse_opts, run_opts):
+    if nessusfile == '':
+        nessusfile = input("Enter a filepath to the newer .nessus file: ")
+    nessusfile = _Check_Path(nessusfile, 'n')
+    if not old.lower().endswith('.nessus'): # anything else names a sheet
+        if spreadsheet == '':
+            spreadsheet = _Check_Path(input("Enter a path to the analysis spreadsheet holding the "+old+" sheet: "), 'x')
+        else:
+            spreadsheet = _Check_Path(spreadsheet, 'x')
+    _Scan_Delta(old, nessusfile, spreadsheet, output, parse_opts, run_opts)
+
+# Computes the delta between old (a .nessus file, or a sheet of spreadsheet) and the .nessus file new, and returns it with its host and plugin counts
+# It's written to output as well: '' picks a name next to new, None writes nothing. The spreadsheet is only read
+def _Scan_Delta (old, new, spreadsheet, output, parse_opts, run_opts):
+    parse_opts = dict(parse_opts, blob_threshold=None, blob_store=None) # a delta doesn't carry plugin outputs, so none are offloaded
+    old_is_scan = old.lower().endswith('.nessus')
+    reports = [_Check_Path(old, 'n'), new] if old_is_scan else [new]
+    stage = _Stage_Start('parse')
+    parsed = _Parse_Reports(reports, parse_opts, run_opts['workers'], run_opts['cache']) # both scans are parsed side by side
+    _Stage_End(stage, reports=len(parsed), hosts=sum(len(p[1]) for p in parsed), findings=sum(len(p[1][h]['vulns']) for p in parsed for h in p[1]))
+    new_scans = [p for p in parsed if p[0] == new]
+    if len(new_scans) > 1:
+        raise InputError(path.basename(new)+" holds the scans of several clients ("+", ".join(p[2] for p in new_scans)+"); a delta compares the scans of one.")
+    new_path, new_dict, client = new_scans[0][:3]
+
+    if old_is_scan:
+        old_scans = [p for p in parsed if p[0] == reports[0]]
+        old_scan = next((p for p in old_scans if p[2] == client), old_scans[0]) # a consolidated export is compared by its scan of the same client
+        if old_scan[2] != client:
+            log.warning("Note: "+path.basename(old)+" is a scan of "+old_scan[2]+", not "+client+".")
+        stage = _Stage_Start('build')
+        old_df = _Report_Side(old_scan[1])
+        old_label = _Scan_Label(old_scan[0], old_scan[1], old_scan[2])
+    else:
+        sheet = _Check_Sheet(old, _Workbook_Sheets(spreadsheet))
+        log.info("Reading the open findings of "+sheet+"...")
+        stage = _Stage_Start('load')
+        wb = load_workbook(spreadsheet, read_only=True)
+        sheet_df = _Sheet_DF(wb[sheet])
+        wb.close()
+        old_df = _Sheet_Side(sheet_df)
+        old_label = 'the open rows of '+sheet+' in '+path.basename(spreadsheet)
+    _Stage_End(stage, rows=len(old_df))
+    stage = _Stage_Start('build')
+    new_df = _Report_Side(new_dict)
+    _Stage_End(stage, rows=len(new_df))
+
+    delta_df, host_df, plugin_df = _Scan_Delta_Frames(old_df, new_df)
+    counts = delta_df['Change'].value_counts()
+    log.info(", ".join(str(counts[c])+" "+c.lower() for c in DELTA_CHANGES)+" finding(s) across "+str(len(host_df))+" host(s) and "+str(len(plugin_df))+" plugin(s).")
+    if output is not None:
+        if output == '':
+            date = _Scan_Date(new_dict)
+            output = path.join(path.dirname(path.abspath(new_path)), (client+' ' if client else '')+'Scan Delta'+('_'+date.strftime('%Y-%m-%d') if date != pd.Timestamp.min else '')+'.xlsx')
+        elif output.lower().endswith('.csv'):
+            if not path.isdir(path.dirname(path.abspath(output))):
+                raise InputError("Invalid directory for "+output+".")
+        else:
+            output = _Check_Path(output, 'v')
+        log.info("Writing "+path.basename(output)+"...")
+        _Write_Delta(output, delta_df, host_df, plugin_df, [old_label, _Scan_Label(new_path, new_dict, client)])
+        log.info("\nYour delta has been saved to "+output+".")
+    return delta_df, host_df, plugin_df
+
+# Function to run for --history without a numbered option: query the spreadsheet's finding history and return the tables for printing, writing them to output as well when it's given
+def _History_Command (spreadsheet, queries, sheets, since, until, output):
+    if spreadsheet == '':
+        spreadsheet = _Check_Path(input("Enter a path to your existing analysis spreadsheet"), 'x')
+    else:
+        spreadsheet = _Check_Path(spreadsheet, 'x')
+    return _History_Report(spreadsheet, queries, sheets.split(',') if sheets not in ['', 'all'] else None, since, until, output)
+
+# Runs history queries ('all' or a comma-separated list of HISTORY_QUERIES) for months given as YYYY-MM, and writes the tables to output if it's given:
+# one sheet per query in an .xlsx, or <name>.<query>.csv files next to a .csv path. Returns the tables by query name
+def _History_Report (spreadsheet, queries, sheets=None, since=None, until=None, output=None):
+    queries = HISTORY_QUERIES if queries.strip().lower() == 'all' else [q.strip().lower() for q in queries.split(',')]
+    for query in queries:
+        if query not in HISTORY_QUERIES:
+            raise InputError("Unknown history query "+query+"; choose from "+", ".join(HISTORY_QUERIES)+" or all.")
+    for month in [since, until]:
+        if month is not None and re.fullmatch(r'\d{4}-(0[1-9]|1[0-2])', month) is None:
+            raise InputError("Months are given as YYYY-MM, not "+month+".")
+    tables = _History_Query(spreadsheet, queries, sheets, since, until)
+    if output not in [None, '']:
+        if output.lower().endswith('.csv'):
+            for query in tables:
+                tables[query].to_csv(output[:-4]+'.'+query+'.csv', index=False)
+        else:
+            with pd.ExcelWriter(_Check_Path(output, 'v'), engine='xlsxwriter') as writer:
+                for query in tables:
+                    tables[query].to_excel(writer, sheet_name=query, index=False)
+    return tables
+
+# Describes a parsed scan for a delta's summary: its file, client and scan date
+def _Scan_Label (report_path, report_dict, client):
+    date = _Scan_Date(report_dict)
+    return path.basename(report_path)+' ('+(client or 'no scan name')+(', '+date.strftime('%Y-%m-%d %H:%M') if date != pd.Timestamp.min else '')+')'
+
+# Function to run if user chose '1'
+def _1_Create_Fresh_Spreadsheet (spreadsheet, sheets):
+    if spreadsheet == '':
+        spreadsheet = _Check_Path(input("Enter full path and name for your new spreadsheet: "), 'v')
+    else:
+        spreadsheet = _Check_Path(spreadsheet, 'v')
+    if sheets == '':
+        sheetz = input("Enter a comma-separated list (no spaces) of sheet names to create: ").replace(" ", "").split(',')
+    else:
+        sheetz = sheets.strip(" ").split(',')
+    _Gen_Fresh_Workbook(spreadsheet, sheetz)
+    return spreadsheet
+
+# Function to run if user chose '2'; imports a batch of .nessus files, reconciling each sheet's reports in scan-date order (sheets in parallel) and saving the workbook once
+def _2_Feed_New_Reports (nessusfile, spreadsheet, sheet, parse_opts, run_opts):
+    if nessusfile == '':
+        nessusfile = input("Enter a filepath to your .nessus file(s), a glob pattern or a directory: ") # Provide path to .nessus report file(s) for importing
+    reports = _Expand_Reports(nessusfile)
+
+    if spreadsheet == '':
+        spreadsheet = _Check_Path(input("Enter a path to your existing analysis spreadsheet"), 'x')
+    else:
+        spreadsheet = _Check_Path(spreadsheet, 'x')
+    _Import_Reports(reports, spreadsheet, sheet, parse_opts, run_opts)
+
+# Imports already expanded .nessus files into a checked spreadsheet and returns the reconciled dataframe of every sheet it changed
+# With ask=False nothing is prompted for: a scan whose name matches no sheet goes to sheet, or raises InputError when there isn't one
+def _Import_Reports (reports, spreadsheet, sheet, parse_opts, run_opts, ask=True):
+    if parse_opts['blob_threshold'] is not None: # oversized outputs go to the spreadsheet's own blob store; the store is part of the parse settings, so cached parses stay tied to it
+        parse_opts = dict(parse_opts, blob_store=_Blob_Path(spreadsheet))
+    history = dict() if _History_On(run_opts) else None # sheet -> the events and sightings its imports produced
+    backup = _Backup(spreadsheet, ask) # the backup copies in the background while the reports are parsed
+    stage = _Stage_Start('parse')
+    parsed = _Parse_Reports(reports, parse_opts, run_opts['workers'], run_opts['cache']) # parse .nessus files for report dicts and sheet (client) names, dropping filtered items as they're read
+    _Stage_End(stage, reports=len(parsed), hosts=sum(len(p[1]) for p in parsed), findings=sum(len(p[1][h]['vulns']) for p in parsed for h in p[1]))
+
+    stage = _Stage_Start('load')
+    plugins_df = _Load_Plugins(spreadsheet) # None unless the workbook is in the normalized layout
+
+    if run_opts['store']: # the sidecar store holds the findings; the workbook is only read to seed the store and pick up analyst edits
+        con = _Store_Connect(spreadsheet)
+        _Store_Sync(con, spreadsheet)
+        sheetnames = _Workbook_Sheets(spreadsheet)
+    else:
+        wb = load_workbook(spreadsheet, read_only=(settings.OUTPUT_ENGINE == 'stream')) # the streaming engine writes a fresh copy, so it only needs to read the workbook
+        sheetnames = wb.sheetnames
+    _Stage_End(stage)
+
+    batches = dict() # target sheet -> list of parsed reports
+    client_sheets = dict()
+    for parse in parsed:
+        client = parse[2]
+        if client not in client_sheets:
+            if client in sheetnames and client not in REF_SHEETS:
+                log.info("Target sheet name for "+client+" automatically gathered according to Scan name.")
+                client_sheets[client] = client
+            elif sheet == '' and ask:
+                client_sheets[client] = _Check_Sheet(input("Enter the name of the worksheet to load the "+client+" results into: "), sheetnames)
+            elif sheet == '':
+                raise InputError("No sheet is named after "+client+" ("+path.basename(parse[0])+"); give a sheet to load it into.")
+            else:
+                client_sheets[client] = _Check_Sheet(sheet, sheetnames)
+        batches.setdefault(client_sheets[client], []).append(parse)
+
+    # Sheets don't depend on each other, so when the batch spans several each one is reconciled in a worker process; the results all come back here and the workbook is saved once
+    # The sheets are all read here, from the workbook or store that's about to be written, so the workbook's shared strings are parsed once rather than once per worker
+    parallel = len(batches) > 1 and run_opts['workers'] != 1
+    sheet_inputs = []
+    loaded_keys = dict() # each store sheet's finding keys as loaded, so the MACs an import moves can be followed in its snapshot
+    for target_sheet in batches:
+        log.info("Initializing and preparing vulnerability dataframes for "+target_sheet+"...")
+        stage = _Stage_Start('load')
+        if run_opts['store']:
+            vuln_analysis_df = _Store_Load_Sheet(con, spreadsheet, target_sheet)
+            loaded_keys[target_sheet] = vuln_analysis_df[['Vulnerability Name', 'MAC(s)']].copy()
+        else:
+            vuln_analysis_df = _Sheet_DF(wb[target_sheet])
+        _Stage_End(stage, rows=len(vuln_analysis_df))
+        sheet_inputs.append(vuln_analysis_df)
+    sheet_args = (None if plugins_df is None else plugins_df.iloc[:0], run_opts['rules'], history is not None)
+    stage = _Stage_Start('sheets')
+    if parallel:
+        log.info("Reconciling "+str(len(batches))+" sheets in parallel...")
+        results = []
+        with ProcessPoolExecutor(max_workers=run_opts['workers']) as pool:
+            for result, records, stages in pool.map(partial(_Import_Sheet_Worker, _Metrics_Option(), *sheet_args), list(batches), sheet_inputs, list(batches.values())):
+                _Log_Replay(records) # each sheet's messages come out together, in sheet order, instead of interleaving with the other workers'
+                _Stages_Merge(stages)
+                results.append(result)
+    else:
+        results = [_Import_Sheet(*sheet_args, t, df, batches[t]) for t, df in zip(batches, sheet_inputs)]
+    _Stage_End(stage, sheets=len(batches), rows=sum(len(r[0]) for r in results))
+    del sheet_inputs
+    sheet_dfs = dict()
+    for target_sheet, (sheet_df, sheet_plugins, sheet_history) in zip(batches, results):
+        sheet_dfs[target_sheet] = sheet_df
+        if plugins_df is not None: # merged in sheet order, so the newest text for a plugin still wins as it would one sheet at a time
+            plugins_df = _Plugins_Merge(plugins_df, sheet_plugins)
+        if history is not None:
+            history[target_sheet] = sheet_history
+    del results
+    stage = _Stage_Start('backup')
+    _Backup_Wait(backup) # never write over the workbook before its backup is complete
+    _Stage_End(stage)
+    if run_opts['store']:
+        stage = _Stage_Start('save')
+        for target_sheet in sheet_dfs:
+            _Store_Write(con, target_sheet, sheet_dfs[target_sheet])
+            _Store_Moves(con, target_sheet, loaded_keys[target_sheet], sheet_dfs[target_sheet])
+        _Stage_End(stage, sheets=len(sheet_dfs), rows=sum(len(df) for df in sheet_dfs.values()))
+        log.info("State store "+path.basename(_Store_Path(spreadsheet))+" updated.")
+        if run_opts['render']:
+            _Store_Render(con, spreadsheet)
+        con.close()
+    elif settings.OUTPUT_ENGINE == 'stream':
+        wb.close()
+        _Stream_WB(spreadsheet, sheet_dfs, spreadsheet, plugins_df)
+    else:
+        _Finagle_WB(spreadsheet, wb, sheet_dfs, plugins_df)
+    if history is not None: # only once the import has been saved, so the history never records changes that were lost
+        _History_Write(spreadsheet, history)
+    return sheet_dfs
+
+# Reconciles one sheet's batch of parsed reports; returns the sheet's dataframe, the plugin text its reports carried (None outside the normalized layout) and its finding history lists (None unless record)
+# Runs in a worker process when an import spans several sheets, so it shares nothing: sheet_df was read by the parent, and plugins_df is an empty plugins frame that only gathers this sheet's text
+def _Import_Sheet (plugins_df, rules, record, target_sheet, sheet_df, parses):
+    history = {'event': [], 'sighting': []} if record else None
+    sheet_df, plugins_df = _Apply_Reports(sheet_df, parses, plugins_df, rules, history)
+    return sheet_df, plugins_df, history
+
+# _Import_Sheet in a worker process: the package's log messages are held back instead of going out as they're made, and come back with the result for _Log_Replay to emit in the parent
+# The stages it runs are recorded when the parent's metrics are on (metrics_option isn't None), and come back with the result too
+def _Import_Sheet_Worker (metrics_option, plugins_df, rules, record, target_sheet, sheet_df, parses):
+    records = queue.SimpleQueue()
+    pkg = logging.getLogger(__package__)
+    handlers, propagate, level = pkg.handlers, pkg.propagate, pkg.level
+    pkg.handlers, pkg.propagate = [QueueHandler(records)], False
+    pkg.setLevel(logging.DEBUG) # everything is kept; the parent's logging decides what's shown
+    _Worker_Metrics_Start(metrics_option)
+    try:
+        result = _Import_Sheet(plugins_df, rules, record, target_sheet, sheet_df, parses)
+    finally:
+        pkg.handlers, pkg.propagate = handlers, propagate
+        pkg.setLevel(level)
+        stages = _Worker_Metrics_End()
+    held = []
+    while not records.empty():
+        held.append(records.get())
+    return result, held, stages
+
+# Emits log records a worker process held back, through the logger each was made on
+def _Log_Replay (records):
+    for record in records:
+        logger = logging.getLogger(record.name)
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+
+# Whether an import records the finding history: on unless --no-history was given, and only where pyarrow is installed
+def _History_On (run_opts):
+    if not run_opts.get('history', True):
+        return False
+    if not _History_Available():
+        log.warning("pyarrow isn't installed, so this import won't be added to the finding history.")
+        return False
+    return True
+
+# Function to run if user chose '3'
+def _3_Add_New_Sheet (spreadsheet, new_sheet):
+    if spreadsheet == '':
+        spreadsheet = _Check_Path(input("Enter a path to your existing analysis spreadsheet"), 'x')
+    else:
+        spreadsheet = _Check_Path(spreadsheet, 'x')
+
+    backup = _Backup(spreadsheet)
+    stage = _Stage_Start('load')
+    wb = load_workbook(spreadsheet, read_only=False)
+    _Stage_End(stage)
+    sheets = [s for s in wb.sheetnames if s not in REF_SHEETS]
+    ws = wb[sheets[0]] # get a sheet to duplicate
+    columns = [cell.value for cell in ws[1]] # only the column names are needed for the new sheet
+    new_df = pd.DataFrame(columns=columns)
+
+    if new_sheet == '':
+        new_sheet = input("Enter the name of the new sheet (only one will be added): ")
+
+    stage = _Stage_Start('style')
+    writer = pd.ExcelWriter(spreadsheet, engine='openpyxl')
+    writer.book = wb
+    new_df.to_excel(writer, sheet_name=new_sheet, index=False, engine='openpyxl')
+    ws1 = wb[new_sheet]
+
+    ws1.add_data_validation(data_val) # applies data validation to the statuses column so that the program's modify logic doesn't hit any snags
+    data_val.add('T2:T1048576')
+    ws1 = _Style_Cols(ws1) # apply alignment and border styles to the specified columns
+    if settings.STYLE_MODE == 'conditional':
+        ws1 = _Set_Cond_Formats(ws1) # rows are coloured by rule, so the rules go in from the start
+    ws1 = _Set_Col_Widths(ws1) # set column widths
+    ws1.freeze_panes = "A2" # freeze top row column names
+    _Stage_End(stage, sheets=1)
+
+    stage = _Stage_Start('backup')
+    _Backup_Wait(backup)
+    _Stage_End(stage)
+    stage = _Stage_Start('save')
+    _Save_WB(wb, spreadsheet) # finally save and close the workbook
+    _Stage_End(stage)
+
+# Function to run if user chose '4'; reports every remediation for the chosen month(s) across the chosen sheet(s) in a single workbook with a summary sheet
+def _4_Generate_Remed_Report (spreadsheet, sheets, month):
+    if spreadsheet == '':
+        spreadsheet = _Check_Path(input("Enter a path to your existing analysis spreadsheet"), 'x')
+    else:
+        spreadsheet = _Check_Path(spreadsheet, 'x')
+
+    sheetnames = _Workbook_Sheets(spreadsheet)
+    analysis_sheets = [s for s in sheetnames if s not in REF_SHEETS]
+
+    if sheets == '':
+        sheets = input("Enter the name(s) of the worksheet(s) to load remediations from (comma-separated, or 'all'): ")
+    if sheets.strip().lower() == 'all':
+        sheets = analysis_sheets
+    else:
+        sheets = [_Check_Sheet(s, sheetnames) for s in sheets.split(',')]
+
+    while True:
+        if month == '':
+            menu = "".join("--------- "+str(m+1).ljust(2)+" - "+MONTH_NAMES[m]+"\n" for m in range(12))
+            month = input("----------Choose the month(s) to generate a report for----------\n"+menu+"Enter a number 1-12, a range (1-6), a list (1,4,7) or 'all': ")
+        months = _Remed_Months(month)
+        if months is not None:
+            break
+        log.warning("Invalid month selection")
+        month = ''
+
+    sheet_dfs, remed_df = _Remed_Frames(spreadsheet, sheets, months)
+    label = _Remed_Label(months)
+    if len(remed_df) == 0:
+        log.info("No remediations found for "+label+" in "+(", ".join(sheets) if len(sheets) > 0 else "the workbook")+"; no report was written.")
+        return
+    fn = path.join(path.dirname(spreadsheet), (sheets[0]+' ' if len(sheets) == 1 else '')+'Remediation Report_'+label+'.xlsx') # the name of the report file
+    log.info("Writing "+path.basename(fn)+"...")
+    _Write_Remed_Report(fn, sheet_dfs, remed_df, label)
+    log.info("\nYour report has been saved in the same directory as the spreadsheet.")
+
+# Keeps the vulns of one analysis sheet that are still active and in question - excluding those that have been remediated
+# Runs in a worker process during migration; the parent reads the workbook once and hands it the sheet's rows, so the shared strings aren't parsed again for every sheet
+def _Migrate_Sheet (rows):
+    df = _Rows_DF(rows)
+    return _Compact_DF(df.loc[~((df.Status.str.match('Remed.*', na=False)))].copy()) # compacted before it's pickled back to the parent
+
+# Function to run if user chose '5'; every sheet is filtered independently in a pool of worker processes, then the new workbook is assembled and saved once
+def _5_Migrate_Spreadsheet (spreadsheet, workers=None):
+    if spreadsheet == '':
+        spreadsheet = _Check_Path(input("Enter a path to your existing analysis spreadsheet"), 'x')
+    else:
+        spreadsheet = _Check_Path(spreadsheet, 'x')
+
+    new_spreadsheet = _Check_Path(input("Enter full path and name for your new spreadsheet: "), 'v')
+    _Migrate(spreadsheet, new_spreadsheet, workers)
+
+# Writes the still-open rows of every analysis sheet into a new workbook; neither path is prompted for
+def _Migrate (spreadsheet, new_spreadsheet, workers=None):
+    sheets = [s for s in _Workbook_Sheets(spreadsheet) if s not in REF_SHEETS] # the old spreadsheet is only ever streamed, never modified
+    log.info("Filtering "+str(len(sheets))+" sheet(s) from "+path.basename(spreadsheet)+"...")
+    stage = _Stage_Start('load')
+    wb = load_workbook(spreadsheet, read_only=True)
+    sheet_rows = (list(wb[s].values) for s in sheets) # each sheet is read as it's handed out
+    if len(sheets) <= 1 or workers == 1:
+        filtered = [_Migrate_Sheet(rows) for rows in sheet_rows]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            filtered = list(pool.map(_Migrate_Sheet, sheet_rows))
+    wb.close()
+    sheet_dfs = dict(zip(sheets, filtered))
+    plugins_df = _Load_Plugins(spreadsheet)
+    if plugins_df is not None: # the new workbook keeps the normalized layout, with only the plugins its remaining rows still reference
+        plugin_ids = set()
+        for df in filtered:
+            plugin_ids.update(df['Plugin ID'].astype(str))
+        plugins_df = plugins_df[plugins_df['Plugin ID'].astype(str).isin(plugin_ids)]
+    _Stage_End(stage, sheets=len(sheets), rows=sum(len(df) for df in filtered))
+    if path.isfile(_Blob_Path(spreadsheet)): # offloaded outputs in the carried-over rows still need their full text
+        shutil.copyfile(_Blob_Path(spreadsheet), _Blob_Path(new_spreadsheet))
+    if path.isdir(_History_Path(spreadsheet)): # the finding history goes along in full, including the remediated findings left behind
+        shutil.copytree(_History_Path(spreadsheet), _History_Path(new_spreadsheet), dirs_exist_ok=True)
+
+    # whatever the engine, the filtered sheets are streamed straight into the new workbook in a single pass and a single save; the reference sheets are carried over from the old one
+    _Stream_WB(new_spreadsheet, sheet_dfs, spreadsheet, plugins_df)
+
+# Identifies the workbook's current contents: (size, mtime) is checked every poll, and the hash only when those change, so a save that didn't change anything isn't taken for an edit
+def _Watch_Signature (spreadsheet, old=None):
+    stat = os.stat(spreadsheet)
+    if old is not None and old[0] == (stat.st_size, stat.st_mtime_ns):
+        return old
+    h = hashlib.blake2b(digest_size=20)
+    with open(spreadsheet, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return ((stat.st_size, stat.st_mtime_ns), h.hexdigest())
+
+# Function to run for --watch: a long-running import loop for a folder that scanners drop .nessus exports into
+# The analysis sheets stay loaded between imports; new files are gathered into a batch once nothing has arrived or grown for the debounce time, applied straight to the in-memory sheets,
+# and the workbook is written when it has been idle for flush_idle seconds or unsaved for flush_every seconds. If an analyst saves the workbook in the meantime it is reloaded and the unsaved imports are applied again on top
+def _Watch_Folder (watch_dir, spreadsheet, sheet, parse_opts, run_opts):
+    if spreadsheet == '':
+        spreadsheet = _Check_Path(input("Enter a path to your existing analysis spreadsheet"), 'x')
+    else:
+        spreadsheet = _Check_Path(spreadsheet, 'x')
+    if not path.isdir(watch_dir):
+        raise InputError(watch_dir+" is not a directory.")
+    if parse_opts['blob_threshold'] is not None:
+        parse_opts = dict(parse_opts, blob_store=_Blob_Path(spreadsheet))
+    opts = run_opts['watch']
+    _Backup_Wait(_Backup(spreadsheet)) # answers the backup directory prompt up front; flushes back up in the background after this
+
+    state = {'sig': None, 'sheet_dfs': dict(), 'plugins_df': None, 'sheetnames': [], 'pending': [], 'history': None} # pending holds the (target sheet, parse) pairs applied since the last flush
+    record = _History_On(run_opts)
+    def history (target): # the finding history gathered for target since the last flush, or None when it isn't recorded
+        if not record:
+            return None
+        return state['history'].setdefault(target, {'event': [], 'sighting': []})
+    def load ():
+        state['sig'] = _Watch_Signature(spreadsheet)
+        state['sheetnames'] = _Workbook_Sheets(spreadsheet)
+        state['plugins_df'] = _Load_Plugins(spreadsheet)
+        state['sheet_dfs'] = dict()
+        state['history'] = dict() # the pending imports are applied again below, which gathers their history afresh
+        targets = {t for t, parse in state['pending']}
+        if len(targets) > 0:
+            wb = load_workbook(spreadsheet, read_only=True)
+            for t in targets:
+                state['sheet_dfs'][t] = _Sheet_DF(wb[t])
+            wb.close()
+        for t in targets:
+            state['sheet_dfs'][t], state['plugins_df'] = _Apply_Reports(state['sheet_dfs'][t], [parse for t2, parse in state['pending'] if t2 == t], state['plugins_df'], run_opts['rules'], history(t))
+
+    def check_edits ():
+        sig = _Watch_Signature(spreadsheet, state['sig'])
+        if sig[1] != state['sig'][1]:
+            log.info("\n"+path.basename(spreadsheet)+" was changed outside of the watcher; reloading it...")
+            load()
+        state['sig'] = sig
+
+    def flush ():
+        check_edits()
+        sheet_dfs = {t: state['sheet_dfs'][t] for t in {t for t, parse in state['pending']}}
+        _Backup_Wait(_Backup(spreadsheet, ask=False))
+        if settings.OUTPUT_ENGINE == 'stream':
+            _Stream_WB(spreadsheet, sheet_dfs, spreadsheet, state['plugins_df'])
+        else:
+            _Finagle_WB(spreadsheet, load_workbook(spreadsheet, read_only=False), sheet_dfs, state['plugins_df'])
+        state['sig'] = _Watch_Signature(spreadsheet)
+        state['pending'] = []
+        log.info(time.strftime('%H:%M:%S')+" "+path.basename(spreadsheet)+" saved.")
+        if record:
+            try:
+                _History_Write(spreadsheet, state['history'])
+            except OSError as e: # the imports are saved either way; only their history is missing
+                log.warning("The finding history couldn't be written ("+str(e)+"); the imports just saved are missing from it.")
+            state['history'] = dict()
+
+    # A save that fails (Excel holding the workbook open, a failed backup, the workbook caught mid-save) keeps the pending imports in memory to be saved at a later attempt; returns whether it saved
+    def try_flush ():
+        try:
+            flush()
+            return True
+        except (OSError, BackupError, zipfile.BadZipFile, KeyError) as e:
+            log.warning(time.strftime('%H:%M:%S')+" Couldn't save "+path.basename(spreadsheet)+" ("+str(e)+"); "+str(len(state['pending']))+" unsaved import(s) are kept for the next attempt.")
+            return False
+
+    load()
+    seen = dict() # .nessus path -> (size, mtime) when last polled
+    done = set(glob.glob(path.join(watch_dir, '*.nessus'))) # exports already in the folder are taken as imported
+    log.info("Watching "+watch_dir+" for new .nessus files ("+str(len(done))+" already there are skipped). Press Ctrl+C to stop.")
+    last_change = time.monotonic()
+    last_flush = time.monotonic()
+    next_try = 0 # when a failed save may be tried again
+    try:
+        while True:
+            now = time.monotonic()
+            for f in glob.glob(path.join(watch_dir, '*.nessus')):
+                if f in done:
+                    continue
+                try:
+                    stat = os.stat(f)
+                except OSError: # removed between the listing and the stat
+                    continue
+                if seen.get(f) != (stat.st_size, stat.st_mtime_ns): # a new file, or one still being copied in
+                    seen[f] = (stat.st_size, stat.st_mtime_ns)
+                    last_change = now
+            if len(seen) > 0 and now - last_change >= opts['debounce']: # nothing arrived or grew for a whole debounce period, so the batch is complete
+                batch = sorted(seen)
+                try:
+                    check_edits()
+                    parsed = _Parse_Reports(batch, parse_opts, run_opts['workers'], run_opts['cache'])
+                except (OSError, etree.XMLSyntaxError, zipfile.BadZipFile, KeyError) as e: # a half-written export or workbook; the batch stays in seen and is tried again after another quiet debounce period
+                    log.warning("Couldn't import this batch yet ("+str(e)+"); trying again shortly.")
+                    last_change = now
+                    continue
+                seen = dict()
+                done.update(batch) # only now that it has been parsed; nothing that failed is ever marked as imported
+                for parse in parsed:
+                    target = parse[2] if parse[2] in state['sheetnames'] and parse[2] not in REF_SHEETS else sheet
+                    if target not in state['sheetnames'] or target in REF_SHEETS:
+                        log.warning("No sheet for "+parse[2]+" ("+path.basename(parse[0])+"); pass -t to choose one. Skipped.")
+                        continue
+                    if target not in state['sheet_dfs']:
+                        wb = load_workbook(spreadsheet, read_only=True)
+                        state['sheet_dfs'][target] = _Sheet_DF(wb[target])
+                        wb.close()
+                    state['sheet_dfs'][target], state['plugins_df'] = _Apply_Reports(state['sheet_dfs'][target], [parse], state['plugins_df'], run_opts['rules'], history(target))
+                    state['pending'].append((target, parse))
+                last_change = now
+            if len(state['pending']) > 0 and now >= next_try and (now - last_change >= opts['flush_idle'] or now - last_flush >= opts['flush_every']):
+                if try_flush():
+                    last_flush = time.monotonic()
+                else:
+                    next_try = time.monotonic() + max(opts['flush_idle'], 1)
+            elif len(state['pending']) == 0:
+                last_flush = now
+            time.sleep(min(1, opts['debounce']))
+    except KeyboardInterrupt:
+        if len(state['pending']) > 0:
+            log.info("\nSaving the imports made since the last save before stopping...")
+            if not try_flush():
+                log.warning("The imports made since the last save were not saved; they'll be picked up again by importing their .nessus files with -2.")
+        log.info("Stopped watching "+watch_dir+".")
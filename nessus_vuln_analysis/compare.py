@@ -0,0 +1,128 @@
+# Scan-to-scan deltas: which findings are new, fixed or persisting between an older and a newer scan of the same client, counted per host and per plugin
+# Either side can be a parsed .nessus report or the open rows of an analysis sheet; the analysis workbook is only ever read
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from .settings import DELTA_CHANGES, DELTA_COLUMNS, FINDING_KEY, remed_re
+from .errors import InputError
+from .metrics import _Stage_End, _Stage_Start
+from .workbook import _Stream_Formats
+from .analysis import _Build_Report_DF
+
+XLSX_MAX_ROWS = 1048575 # rows a worksheet can hold below its header
+
+# Narrows a report or sheet dataframe to the delta columns with one row per finding key; a finding reported on several ports counts once
+def _Delta_Side (df):
+    df = df.reindex(columns=DELTA_COLUMNS[1:])
+    for col in FINDING_KEY:
+        df[col] = df[col].astype(str)
+    return df.drop_duplicates(subset=FINDING_KEY).reset_index(drop=True)
+
+# The delta side of a parsed report, built like the -2 report dataframe so its keys match what an import would write
+def _Report_Side (report_dict):
+    return _Delta_Side(_Build_Report_DF(report_dict, DELTA_COLUMNS[1:]))
+
+# The delta side of an analysis sheet: every row that hasn't been remediated, which is what the sheet believes is still out there
+def _Sheet_Side (sheet_df):
+    return _Delta_Side(sheet_df.loc[~sheet_df['Status'].astype(str).str.match(remed_re)])
+
+# One 64-bit hash per row over the finding key, so the set operations below are a single np.isin over integers instead of a join on strings
+def _Key_Hashes (df):
+    return pd.util.hash_pandas_object(df[FINDING_KEY], index=False).to_numpy()
+
+# Compares two delta sides: findings only in the new side are New, only in the old side Fixed, in both Persisting (described by the new scan)
+def _Delta_Frame (old_df, new_df):
+    old_hashes = _Key_Hashes(old_df)
+    new_hashes = _Key_Hashes(new_df)
+    still_there = np.isin(old_hashes, new_hashes)
+    seen_before = np.isin(new_hashes, old_hashes)
+    delta_df = pd.concat([new_df.loc[~seen_before].assign(Change='New'),
+                          old_df.loc[~still_there].assign(Change='Fixed'),
+                          new_df.loc[seen_before].assign(Change='Persisting')], ignore_index=True, sort=False)
+    delta_df['Change'] = pd.Categorical(delta_df['Change'], categories=DELTA_CHANGES)
+    return delta_df.reindex(columns=DELTA_COLUMNS)
+
+# Counts the delta's changes per group: one row per value of key, labelled with the first value of each labels column, busiest groups first
+def _Delta_Counts (delta_df, key, labels):
+    counts = delta_df.groupby([key, 'Change'], observed=False, sort=False).size().unstack('Change', fill_value=0).reindex(columns=DELTA_CHANGES, fill_value=0)
+    counts = counts[counts.sum(axis=1) > 0]
+    counts['Net'] = counts['New'] - counts['Fixed']
+    counts.columns = list(counts.columns) # drop the categorical column index so the frame writes like any other
+    firsts = delta_df.drop_duplicates(subset=key).set_index(key)[labels]
+    counts = firsts.join(counts, how='inner').reset_index()
+    order = np.lexsort((counts[key].astype(str).to_numpy(), -(counts['New'] + counts['Fixed']).to_numpy()))
+    return counts.iloc[order].reset_index(drop=True)
+
+# Hosts are told apart by their MAC string, or by their address when the scan found no MAC
+def _Host_Counts (delta_df):
+    delta_df = delta_df.assign(Host=delta_df['MAC(s)'].where(delta_df['MAC(s)'] != '???', delta_df['Target'].astype(str)))
+    return _Delta_Counts(delta_df, 'Host', ['Device Name', 'Target', 'OS'])
+
+def _Plugin_Counts (delta_df):
+    return _Delta_Counts(delta_df, 'Vulnerability Name', ['Plugin ID', 'Severity'])
+
+# Computes the delta between two sides and both of its count tables
+def _Scan_Delta_Frames (old_df, new_df):
+    stage = _Stage_Start('delta')
+    delta_df = _Delta_Frame(old_df, new_df)
+    host_df = _Host_Counts(delta_df)
+    plugin_df = _Plugin_Counts(delta_df)
+    _Stage_End(stage, rows=len(delta_df), hosts=len(host_df))
+    return delta_df, host_df, plugin_df
+
+# Writes a delta out: an .xlsx gets a summary, the host and plugin counts and the new and fixed findings on separate sheets
+# A .csv holds the new and fixed findings, with the counts next to it in <name>.hosts.csv and <name>.plugins.csv; persisting findings are only counted either way
+def _Write_Delta (fn, delta_df, host_df, plugin_df, labels):
+    stage = _Stage_Start('save')
+    changes = delta_df.loc[delta_df['Change'] != 'Persisting']
+    if fn.lower().endswith('.csv'):
+        base = fn[:-4]
+        changes.to_csv(fn, index=False)
+        host_df.to_csv(base+'.hosts.csv', index=False)
+        plugin_df.to_csv(base+'.plugins.csv', index=False)
+        _Stage_End(stage, rows=len(changes))
+        return
+    if len(changes) > XLSX_MAX_ROWS or len(host_df) > XLSX_MAX_ROWS:
+        raise InputError("The delta has "+str(len(changes))+" new and fixed findings, more than a worksheet holds; write it to a .csv instead.")
+
+    workbook = xlsxwriter.Workbook(fn, {'constant_memory': True, 'strings_to_formulas': False, 'strings_to_urls': False, 'strings_to_numbers': False})
+    formats = _Stream_Formats(workbook)
+    bands = {'New': workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'}), 'Fixed': workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'})}
+    title = workbook.add_format({'align': 'center', 'valign': 'vcenter', 'bold': True, 'font_size': 18, 'font_color': '#FFFFFF', 'bg_color': '#000000'})
+
+    ws = workbook.add_worksheet('Summary')
+    ws.set_column(0, 0, 14)
+    ws.set_column(1, 1, 60)
+    ws.merge_range(0, 0, 0, 4, 'Scan Delta', title)
+    ws.write_row(2, 0, ['Old', labels[0]])
+    ws.write_row(3, 0, ['New', labels[1]])
+    ws.write_row(5, 0, ['Change', 'Findings', 'Hosts'], formats['header'])
+    r = 6
+    for change in DELTA_CHANGES:
+        ws.write_row(r, 0, [change, int(host_df[change].sum()), int((host_df[change] > 0).sum())], formats[(None, 'center')])
+        r+=1
+
+    for name, df, widths in [('Hosts', host_df, [40, 30, 18, 30]), ('Plugins', plugin_df, [60, 12, 10])]:
+        ws = workbook.add_worksheet(name)
+        for col in range(len(df.columns)):
+            ws.set_column(col, col, widths[col] if col < len(widths) else 12)
+        ws.freeze_panes(1, 0)
+        ws.write_row(0, 0, list(df.columns), formats['header'])
+        r = 1
+        for row in df.astype(object).where(df.notna(), None).itertuples(index=False, name=None):
+            ws.write_row(r, 0, row)
+            r+=1
+        ws.autofilter(0, 0, max(r-1, 1), len(df.columns)-1)
+
+    ws = workbook.add_worksheet('Changes')
+    for col, width in enumerate([10, 60, 12, 10, 30, 18, 40, 30, 8, 25]):
+        ws.set_column(col, col, width)
+    ws.freeze_panes(1, 0)
+    ws.write_row(0, 0, DELTA_COLUMNS, formats['header'])
+    r = 1
+    for row in changes.astype(object).where(changes.notna(), None).itertuples(index=False, name=None):
+        ws.write_row(r, 0, row, bands[row[0]])
+        r+=1
+    ws.autofilter(0, 0, max(r-1, 1), len(DELTA_COLUMNS)-1)
+    workbook.close()
+    _Stage_End(stage, rows=len(changes))
@@ -0,0 +1,11 @@
+# Exceptions raised instead of exiting the process; the command line prints their message and exits, library callers catch them
+class AnalysisError (Exception):
+    pass
+
+# A bad path, sheet name, month, layout or option value
+class InputError (AnalysisError):
+    pass
+
+# The workbook couldn't be backed up, so it was left untouched
+class BackupError (AnalysisError):
+    pass
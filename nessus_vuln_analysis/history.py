@@ -0,0 +1,206 @@
+# Finding history: an append-only Parquet log, next to the spreadsheet, of every sighting and status change an import produces, so findings keep their history after -5 drops them
+# The log lives in <spreadsheet>.history/, partitioned into kind=event (new findings and status changes) and kind=sighting (every finding of every scan), then by the month of the scan (month=YYYY-MM)
+# Imports only ever add files to it; the queries read the event partitions, never the workbook
+from os import path
+import numpy as np
+import pandas as pd
+from . import settings
+from .settings import FINDING_KEY, remed_re
+from .errors import InputError
+from .metrics import _Stage_End, _Stage_Start
+
+EVENT_COLUMNS = ['Event', 'Sheet', 'Vulnerability Name', 'MAC(s)', 'Plugin ID', 'Severity', 'Old Status', 'New Status', 'Scanned', 'Robot Note', 'Report', 'Recorded']
+SIGHTING_COLUMNS = ['Sheet', 'Vulnerability Name', 'MAC(s)', 'Plugin ID', 'Severity', 'Scanned', 'Report', 'Recorded']
+AGE_BUCKETS = [0, 30, 60, 90, 180, 365, np.inf] # day boundaries of the open-finding age histogram
+AGE_LABELS = ['0-30', '31-60', '61-90', '91-180', '181-365', '365+']
+HISTORY_QUERIES = ['mttr', 'age', 'recurrence']
+time_format = '%a %b %d %H:%M:%S %Y' # EX: Tue Jan 26 08:56:53 2021
+
+def _History_Path (spreadsheet):
+    return path.splitext(spreadsheet)[0]+'.history'
+
+# pyarrow is only needed once the history is written or queried (and by the parse cache), so it's imported here rather than with the package
+def _Arrow ():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError: # not installed, or built for another numpy
+        raise InputError("The finding history needs pyarrow; install it with pip install -r requirements.txt.")
+    return pyarrow, pyarrow.parquet
+
+# Whether the history can be written here; an import goes ahead without it when pyarrow is missing or won't load
+def _History_Available ():
+    try:
+        _Arrow()
+    except InputError:
+        return False
+    return True
+
+# Turns Last Scanned strings into timestamps; rows without one get the report's scan date
+def _Scanned (last_scanned, scan_date):
+    scanned = pd.to_datetime(pd.Series(last_scanned, dtype=object).reset_index(drop=True), format=time_format, errors='coerce')
+    return scanned.fillna(scan_date)
+
+# Events for the rows whose Status an import changed; the time is the host's scan when the row was rescanned, otherwise the report's
+def _Status_Events (vuln_analysis_df, old_status, scan_date, report):
+    new_status = vuln_analysis_df['Status'].astype(object).where(vuln_analysis_df['Status'].notna(), None).to_numpy()
+    changed = pd.Series(new_status).fillna('').to_numpy() != pd.Series(old_status).fillna('').to_numpy()
+    rows = vuln_analysis_df.loc[changed]
+    scanned = _Scanned(rows['Last Scanned'], scan_date)
+    return pd.DataFrame({'Event': 'status', 'Vulnerability Name': rows['Vulnerability Name'].to_numpy(), 'MAC(s)': rows['MAC(s)'].to_numpy(),
+                         'Plugin ID': rows['Plugin ID'].to_numpy(), 'Severity': rows['Severity'].to_numpy(), 'Old Status': old_status[changed], 'New Status': new_status[changed],
+                         'Scanned': scanned.where(scanned >= scan_date, scan_date).to_numpy(), 'Robot Note': rows['Robot Note'].to_numpy(), 'Report': report}, columns=EVENT_COLUMNS[:-1])
+
+# Events for the findings an import added to the sheet, stamped with their own scan time
+def _New_Events (new_rows, scan_date, report):
+    return pd.DataFrame({'Event': 'new', 'Vulnerability Name': new_rows['Vulnerability Name'].to_numpy(), 'MAC(s)': new_rows['MAC(s)'].to_numpy(),
+                         'Plugin ID': new_rows['Plugin ID'].to_numpy(), 'Severity': new_rows['Severity'].to_numpy(), 'Old Status': None,
+                         'New Status': new_rows['Status'].astype(object).where(new_rows['Status'].notna(), None).to_numpy(),
+                         'Scanned': _Scanned(new_rows['Last Scanned'], scan_date).to_numpy(), 'Robot Note': None, 'Report': report}, columns=EVENT_COLUMNS[:-1])
+
+# One sighting per finding key in a report
+def _Sightings (report_df, scan_date, report):
+    seen = report_df.drop_duplicates(subset=FINDING_KEY)
+    return pd.DataFrame({'Vulnerability Name': seen['Vulnerability Name'].astype(str).to_numpy(), 'MAC(s)': seen['MAC(s)'].astype(str).to_numpy(),
+                         'Plugin ID': seen['Plugin ID'].astype(object).to_numpy(), 'Severity': seen['Severity'].astype(object).to_numpy(),
+                         'Scanned': _Scanned(seen['Last Scanned'], scan_date).to_numpy(), 'Report': report}, columns=SIGHTING_COLUMNS[:-1])
+
+# Appends an import's events and sightings to the spreadsheet's history; history maps each sheet to the {'event': [...], 'sighting': [...]} frames gathered while its reports were applied
+# Every call writes new files and never touches the ones already there, so a log is never rewritten
+def _History_Write (spreadsheet, history):
+    pa, pq = _Arrow()
+    stage = _Stage_Start('history')
+    recorded = pd.Timestamp(settings._Today())
+    rows = 0
+    for kind, columns in [('event', EVENT_COLUMNS), ('sighting', SIGHTING_COLUMNS)]:
+        frames = [df.assign(Sheet=sheet) for sheet in history for df in history[sheet][kind] if len(df) > 0]
+        if len(frames) == 0:
+            continue
+        df = pd.concat(frames, ignore_index=True, sort=False).assign(Recorded=recorded).reindex(columns=columns)
+        for col in columns:
+            if col not in ['Scanned', 'Recorded']:
+                df[col] = df[col].astype(str).where(df[col].notna(), None) # every other column is text, however the sheet happened to type it
+        df['month'] = df['Scanned'].dt.strftime('%Y-%m')
+        schema = pa.schema([(col, pa.timestamp('ns') if col in ['Scanned', 'Recorded'] else pa.string()) for col in columns + ['month']]) # spelled out, since a file whose column is all empty would otherwise be typed null and hide the column's values in every other file
+        table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+        pq.write_to_dataset(table, path.join(_History_Path(spreadsheet), 'kind='+kind), partition_cols=['month'])
+        rows += len(df)
+    _Stage_End(stage, rows=rows)
+
+# Reads the event log, optionally only the months from since to until (YYYY-MM, inclusive) and the given sheets; only the partitions asked for are opened
+def _History_Events (spreadsheet, sheets=None, since=None, until=None):
+    pa, pq = _Arrow()
+    root = path.join(_History_Path(spreadsheet), 'kind=event')
+    if not path.isdir(root):
+        raise InputError("No finding history found for "+path.basename(spreadsheet)+"; it's recorded by -2 and --watch imports.")
+    filters = []
+    if since is not None:
+        filters.append(('month', '>=', since))
+    if until is not None:
+        filters.append(('month', '<=', until))
+    if sheets is not None:
+        filters.append(('Sheet', 'in', list(sheets)))
+    table = pq.read_table(root, columns=['Event', 'Sheet', 'Vulnerability Name', 'MAC(s)', 'Plugin ID', 'Severity', 'Old Status', 'New Status', 'Scanned', 'Recorded'],
+                          filters=filters if len(filters) > 0 else None, read_dictionary=['Event', 'Sheet', 'Vulnerability Name', 'MAC(s)', 'Plugin ID', 'Severity', 'Old Status', 'New Status'])
+    events = table.to_pandas() # the text columns come back as categoricals, so grouping on them works on integer codes
+    return events.sort_values(['Scanned', 'Recorded'], kind='stable').reset_index(drop=True) # one import's status changes were written ahead of its new findings, and stay that way
+
+# Which entries of a status column are 'Remediated - <Mon>'; the regex runs once per distinct status, not once per row
+def _Is_Remed (col):
+    col = col.astype('category')
+    hits = np.append(col.cat.categories.astype(str).str.match(remed_re), False) # missing statuses have code -1, which picks the False at the end
+    return hits[col.cat.codes.to_numpy()]
+
+# Lays out each finding's open spells: a spell starts when the finding is first recorded or comes back after being remediated, and ends when it's marked remediated
+# Returns the events grouped by finding (oldest first within each) with the finding's Key, whether each event starts, reopens or ends a spell,
+# and when the spell it belongs to started (the finding's first event when that predates the history)
+# Everything is computed on the one sorted order with running sums and maxima, rather than a groupby per column
+def _History_Spells (events):
+    key = pd.factorize(pd.util.hash_pandas_object(events[['Sheet'] + FINDING_KEY], index=False).to_numpy())[0]
+    order = np.argsort(key, kind='stable') # the events arrive oldest first, and a stable sort keeps them that way within each finding
+    events = events.iloc[order].reset_index(drop=True)
+    key = key[order]
+    pos = np.arange(len(key))
+    first = np.ones(len(key), dtype=bool)
+    first[1:] = key[1:] != key[:-1]
+    head = np.maximum.accumulate(np.where(first, pos, 0)) # where each event's finding begins
+
+    old_remed = _Is_Remed(events['Old Status'])
+    new_remed = _Is_Remed(events['New Status'])
+    remeds = np.cumsum(new_remed) - new_remed # remediations before each event, counted across findings
+    was_remed = remeds > remeds[head] # ... and within its own finding
+    start = (events['Event'] == 'new').to_numpy() | (old_remed & ~new_remed) # reopened by the status rules, or added again after -5 dropped the remediated row
+    last_start = np.maximum.accumulate(np.where(start, pos, -1))
+    scanned = events['Scanned'].to_numpy()
+    events['Key'] = key
+    events['Start'] = start
+    events['Reopen'] = start & (was_remed | old_remed)
+    events['End'] = new_remed & ~old_remed
+    events['Since'] = np.where(last_start >= head, scanned[np.maximum(last_start, 0)], scanned[head])
+    return events
+
+# A text column as a categorical with missing values shown as '(blank)', so the queries group on its integer codes
+def _Labels (col):
+    col = col.astype('category')
+    if col.isna().any():
+        col = col.cat.add_categories(['(blank)']).fillna('(blank)')
+    return col
+
+# Mean time to remediate: how long the findings remediated in each month were open, per sheet and severity
+def _Query_MTTR (events):
+    ends = events.loc[events['End']]
+    df = pd.DataFrame({'Sheet': _Labels(ends['Sheet']).to_numpy(), 'Month': ends['Scanned'].to_numpy().astype('datetime64[M]'), 'Severity': _Labels(ends['Severity']).to_numpy(),
+                       'Days': (ends['Scanned'] - ends['Since']).to_numpy() / np.timedelta64(1, 'D')})
+    mttr = df.groupby(['Sheet', 'Month', 'Severity'], observed=True).agg(Remediated=('Days', 'size'), Mean_Days=('Days', 'mean'), Median_Days=('Days', 'median'), Max_Days=('Days', 'max')).round(1).reset_index()
+    mttr['Month'] = mttr['Month'].dt.strftime('%Y-%m') # formatted once the months are grouped, not once per finding
+    return mttr.astype({'Sheet': str, 'Severity': str})
+
+# Ages of the findings still open at the end of the history (their latest event isn't a remediation), counted per sheet and severity in AGE_BUCKETS
+def _Query_Age (events, as_of=None):
+    as_of = events['Scanned'].max() if as_of is None else as_of
+    latest = events.drop_duplicates(subset='Key', keep='last')
+    latest = latest.loc[~_Is_Remed(latest['New Status'])]
+    days = (as_of - latest['Since']).to_numpy() / np.timedelta64(1, 'D')
+    df = pd.DataFrame({'Sheet': _Labels(latest['Sheet']).to_numpy(), 'Severity': _Labels(latest['Severity']).to_numpy(),
+                       'Age': pd.cut(days, AGE_BUCKETS, labels=AGE_LABELS, include_lowest=True)})
+    counts = df.groupby(['Sheet', 'Severity', 'Age'], observed=False).size().unstack('Age', fill_value=0)
+    counts.columns = list(counts.columns)
+    counts['Total'] = counts.sum(axis=1)
+    return counts[counts['Total'] > 0].reset_index().astype({'Sheet': str, 'Severity': str})
+
+# Per-plugin recurrence: how many findings of each plugin were remediated, and how often one came back afterwards, most recurrent plugins first
+# A finding's key includes its plugin name, so every count is a bincount over the name's categorical codes
+def _Query_Recurrence (events):
+    names = events['Vulnerability Name'].astype('category')
+    codes = names.cat.codes.to_numpy()
+    n = len(names.cat.categories)
+    reopen = events['Reopen'].to_numpy()
+    first = ~events['Key'].duplicated().to_numpy()
+    first_reopen = ~events['Key'].loc[reopen].duplicated().to_numpy()
+    plugin_ids = events['Plugin ID'].astype(object).to_numpy()[np.unique(codes, return_index=True)[1]]
+    counts = pd.DataFrame({'Findings': np.bincount(codes[first], minlength=n), 'Remediations': np.bincount(codes, weights=events['End'].to_numpy(), minlength=n).astype(np.int64),
+                           'Recurrences': np.bincount(codes, weights=reopen, minlength=n).astype(np.int64), 'Findings_Recurred': np.bincount(codes[reopen][first_reopen], minlength=n)})
+    counts.insert(0, 'Vulnerability Name', names.cat.categories.astype(str))
+    counts = counts.iloc[np.unique(codes)] # categories no event uses drop out
+    counts.insert(0, 'Plugin ID', [str(p) if p is not None else '' for p in plugin_ids])
+    counts = counts[counts['Remediations'] > 0]
+    counts['Recurrence_Rate'] = (counts['Recurrences'] / counts['Remediations']).round(3)
+    return counts.sort_values(['Recurrences', 'Remediations'], ascending=False, kind='stable').reset_index(drop=True)
+
+# Runs the history queries asked for (any of HISTORY_QUERIES) and returns their tables by name
+def _History_Query (spreadsheet, queries, sheets=None, since=None, until=None):
+    stage = _Stage_Start('load')
+    events = _History_Events(spreadsheet, sheets, since, until)
+    _Stage_End(stage, rows=len(events))
+    stage = _Stage_Start('build')
+    events = _History_Spells(events)
+    tables = dict()
+    for query in queries:
+        if query == 'mttr':
+            tables[query] = _Query_MTTR(events)
+        elif query == 'age':
+            tables[query] = _Query_Age(events)
+        elif query == 'recurrence':
+            tables[query] = _Query_Recurrence(events)
+    _Stage_End(stage, rows=len(events))
+    return tables
@@ -0,0 +1,120 @@
+# Per-stage run metrics and profiling for --metrics and --profile
+import logging
+from sys import argv
+import sys
+import time
+import cProfile
+import datetime
+import os
+import json
+
+log = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError: # not on Windows; peak memory comes from the Win32 API there
+    resource = None
+
+METRICS = None # per-stage run metrics while --metrics or --profile is on; None keeps instrumentation switched off
+
+# Run metrics for --metrics and --profile: each pipeline stage records its wall time, CPU time (including finished worker processes), the peak RSS so far and any row/host counts
+# Stages are opened with _Stage_Start and closed with _Stage_End; with metrics off (METRICS is None) both return straight away, so the calls can stay in every code path
+def _Stage_Start (name):
+    if METRICS is None:
+        return None
+    return {'stage': name, 'option': METRICS['option'], 'wall': time.perf_counter(), 'cpu': _CPU_Time()}
+
+def _Stage_End (stage, **counts):
+    if stage is None:
+        return
+    stage['wall_s'] = round(time.perf_counter() - stage.pop('wall'), 4)
+    stage['cpu_s'] = round(_CPU_Time() - stage.pop('cpu'), 4)
+    stage['peak_rss_mb'] = _Peak_RSS_MB()
+    stage['counts'] = counts
+    METRICS['stages'].append(stage)
+
+# Stages that run in a worker process are recorded in the worker's own METRICS, which the parent never sees: the parent passes _Metrics_Option() to the worker, the worker switches
+# metrics on with _Worker_Metrics_Start and returns _Worker_Metrics_End() with its result, and the parent adds those stages to its own with _Stages_Merge
+def _Metrics_Option ():
+    return None if METRICS is None else METRICS['option']
+
+def _Worker_Metrics_Start (option):
+    global METRICS
+    METRICS = None if option is None else {'option': option, 'stages': []}
+
+def _Worker_Metrics_End ():
+    global METRICS
+    stages = [] if METRICS is None else METRICS['stages']
+    METRICS = None
+    return stages
+
+def _Stages_Merge (stages):
+    if METRICS is None:
+        return
+    for stage in stages:
+        stage['worker'] = True # its CPU time and peak RSS are the worker's, not this process's
+        METRICS['stages'].append(stage)
+
+def _CPU_Time ():
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+# Peak resident set size of this process so far in MB; None where it can't be read
+def _Peak_RSS_MB ():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1) # bytes on macOS, KB elsewhere
+    try:
+        import ctypes
+        from ctypes import wintypes
+        class PROCESS_MEMORY_COUNTERS (ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD), ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t), ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaNonPagedPoolUsage', ctypes.c_size_t), ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return round(counters.PeakWorkingSetSize / (1 << 20), 1)
+    except (ImportError, AttributeError, OSError):
+        return None
+
+# Turns metrics on for one run of a numbered option; the profiler is only created when a --profile dump was asked for
+def _Metrics_Start (selection, run_opts):
+    global METRICS
+    if run_opts['metrics'] is None and run_opts['profile'] is None:
+        return None
+    METRICS = {'option': selection, 'started': datetime.datetime.now().isoformat(timespec='seconds'), 'argv': argv[1:], 'stages': [],
+               'wall': time.perf_counter(), 'cpu': _CPU_Time()}
+    if run_opts['profile'] is not None:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    return None
+
+# Writes the --metrics JSON file (every stage plus per-stage totals) and the --profile cProfile dump
+def _Metrics_Finish (run_opts, profiler):
+    global METRICS
+    if METRICS is None:
+        return
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(run_opts['profile'])
+        log.info("cProfile stats saved to "+run_opts['profile'])
+    if run_opts['metrics'] is not None:
+        totals = dict()
+        for stage in METRICS['stages']:
+            total = totals.setdefault(stage['stage'], {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_rss_mb': None, 'counts': dict()})
+            total['calls'] += 1
+            total['wall_s'] = round(total['wall_s'] + stage['wall_s'], 4)
+            total['cpu_s'] = round(total['cpu_s'] + stage['cpu_s'], 4)
+            if stage['peak_rss_mb'] is not None: # the highest of any process that ran the stage
+                total['peak_rss_mb'] = max(total['peak_rss_mb'] or 0, stage['peak_rss_mb'])
+            for k in stage['counts']:
+                total['counts'][k] = total['counts'].get(k, 0) + stage['counts'][k]
+        metrics = {'option': METRICS['option'], 'started': METRICS['started'], 'argv': METRICS['argv'],
+                   'wall_s': round(time.perf_counter() - METRICS['wall'], 4), 'cpu_s': round(_CPU_Time() - METRICS['cpu'], 4), 'peak_rss_mb': _Peak_RSS_MB(),
+                   'totals': totals, 'stages': METRICS['stages']}
+        with open(run_opts['metrics'], 'w') as f:
+            json.dump(metrics, f, indent=2)
+        log.info("Run metrics saved to "+run_opts['metrics'])
+    METRICS = None
@@ -0,0 +1,475 @@
+# Parsing .nessus exports into report dicts, the host identity index, and the parse cache
+import logging
+from lxml import etree
+import os
+from os import path, replace
+import shutil
+import json
+import hashlib
+import glob
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+import pandas as pd
+from . import settings
+from .settings import CACHE_VERSION, PLUGIN_META
+from .errors import InputError
+from .checks import _Check_Path
+from .store import _Blob_Connect, _Blob_Flush, _Blob_Put
+from .history import _Arrow
+
+log = logging.getLogger(__name__)
+
+# Takes a HostProperties element and adds the host properties we care about to the given dictionary
+# Values that repeat from host to host (OS names, scan start times) go through the strings table so every host shares one copy
+def _Parse_Host_Props (HostProperties, props_dict, host_params, strings):
+    for prop in HostProperties:
+        if prop.attrib['name'] in host_params:
+            if prop.attrib['name'] == "mac-address" and len(prop.text) > 17: # if property is mac, sorts them so that they are the same order every run
+                macs = prop.text.split("\n", 100)
+                macs.sort()
+                final_macs = '\n'.join(macs)
+                props_dict[prop.attrib['name']] = final_macs
+            elif prop.attrib['name'] == "operating-system" or prop.attrib['name'] == "HOST_START":
+                props_dict[prop.attrib['name']] = strings.setdefault(prop.text, prop.text)
+            else:
+                props_dict[prop.attrib['name']] = prop.text
+    return props_dict
+
+# Takes a ReportItem element and builds the dictionary of its vulnerability details
+# The plugin's own text (name, synopsis, solution) is the same on every host, so it's kept once per pluginID in the plugins table and each finding refers to that copy
+# Short attribute values (pluginID, port, service, severity) go through the strings table, leaving plugin_output as the only text held per finding
+# With a blob store (a connection, a threshold and the outputs waiting to be written), outputs over the threshold go to it and only their preview is held
+def _Parse_Report_Item (ReportItem, vuln_params, plugins, strings, blobs=None):
+    vuln_dict = dict()
+    meta = plugins.get(ReportItem.attrib.get('pluginID'))
+    for attr in ReportItem.attrib:
+        if attr in vuln_params:
+            value = ReportItem.attrib[attr]
+            vuln_dict[attr] = strings.setdefault(value, value)
+    for param in ReportItem:
+        if param.tag in vuln_params and (meta is None or param.tag not in PLUGIN_META):
+            if param.tag == 'plugin_output' and blobs is not None and param.text is not None and len(param.text) > blobs['threshold']:
+                vuln_dict[param.tag] = _Blob_Put(blobs, param.text)
+            else:
+                vuln_dict[param.tag] = param.text
+    if meta is None:
+        plugins[vuln_dict.get('pluginID')] = {k: vuln_dict[k] for k in PLUGIN_META if k in vuln_dict}
+    else:
+        vuln_dict.update(meta)
+    return vuln_dict
+
+# Decides from a ReportItem's attributes alone whether it passes the severity and plugin filters; credential failure plugins always pass so auth status can still be determined
+def _Keep_Report_Item (attrib, min_severity, allow_plugins, deny_plugins, cred_fail_plugins):
+    plugin = attrib.get('pluginID')
+    if plugin in cred_fail_plugins:
+        return True
+    if allow_plugins and plugin not in allow_plugins:
+        return False
+    if deny_plugins and plugin in deny_plugins:
+        return False
+    try:
+        return int(attrib.get('severity', 0)) >= min_severity
+    except ValueError:
+        return True
+
+# Creates an empty host identity index: a union-find forest over ReportHost names plus hash maps from each identity key to a host
+# Identity keys are every individual MAC address a host reports and, optionally, fallback properties like netbios-name or host-rdns (the FQDN)
+def _New_Host_Index ():
+    return {'parent': dict(), # host name -> parent host name; a host that is its own parent is canonical
+            'order': dict(), # host name -> the order it was seen in, so the first host seen always stays canonical
+            'keys': dict(), # identity key -> a host name that owns it
+            'mac_strings': dict()} # canonical host's full 'mac-address' string -> canonical host name
+
+# Returns the canonical host name for any host in the index, compressing the path on the way
+def _Index_Find (host_index, host):
+    parent = host_index['parent']
+    root = host
+    while parent[root] != root:
+        root = parent[root]
+    while parent[host] != root:
+        parent[host], host = root, parent[host]
+    return root
+
+# Merges the sets holding two hosts and returns the canonical host of the merged set along with the one that was absorbed (None if they were already merged)
+def _Index_Union (host_index, a, b):
+    a = _Index_Find(host_index, a)
+    b = _Index_Find(host_index, b)
+    if a == b:
+        return a, None
+    if host_index['order'][b] < host_index['order'][a]: # the earliest seen host wins, same as the old first-come dedup
+        a, b = b, a
+    host_index['parent'][b] = a
+    return a, b
+
+# Builds the list of identity keys for a host's properties; individual MACs are normalized so the same NIC always hashes the same
+def _Host_Identity_Keys (props_dict, fallback_keys):
+    keys = []
+    if props_dict.get('mac-address'):
+        for mac in props_dict['mac-address'].split('\n'):
+            if mac.strip() != '':
+                keys.append(('mac', mac.strip().lower()))
+    for k in fallback_keys:
+        if props_dict.get(k):
+            keys.append((k, props_dict[k].strip().lower()))
+    return keys
+
+# Adds a parsed host to the identity index and report_dict; a host sharing any identity key with hosts already seen is merged into them instead of becoming a new entry
+def _Index_Add_Host (host_index, report_dict, host, props_dict, fallback_keys):
+    if host in host_index['parent']: # same ReportHost name seen twice; fold the new findings into the existing entry
+        canonical = _Index_Find(host_index, host)
+        for plugin in props_dict['vulns']:
+            report_dict[canonical]['vulns'].setdefault(plugin, props_dict['vulns'][plugin])
+    else:
+        host_index['parent'][host] = host
+        host_index['order'][host] = len(host_index['order'])
+        report_dict[host] = props_dict
+    for key in _Host_Identity_Keys(props_dict, fallback_keys):
+        if key not in host_index['keys']:
+            host_index['keys'][key] = host
+            continue
+        canonical, absorbed = _Index_Union(host_index, host_index['keys'][key], host)
+        if absorbed is not None and absorbed in report_dict: # fold the absorbed host's findings into the canonical host, keeping the canonical host's own findings and properties
+            for plugin in report_dict[absorbed]['vulns']:
+                report_dict[canonical]['vulns'].setdefault(plugin, report_dict[absorbed]['vulns'][plugin])
+            del report_dict[absorbed]
+
+# Gives every canonical host the sorted union of the normalized MACs of all the hosts merged into it, so its 'mac-address' (and the MAC(s) cells built from it) doesn't depend on the order the ReportHosts came in
+def _Index_Merge_MACs (host_index, report_dict):
+    macs = dict() # canonical host -> its set's MACs
+    for key, host in host_index['keys'].items():
+        if key[0] == 'mac':
+            macs.setdefault(_Index_Find(host_index, host), set()).add(key[1])
+    for host in macs:
+        report_dict[host]['mac-address'] = '\n'.join(sorted(macs[host]))
+
+# Resolves an analysis sheet 'MAC(s)' cell to the canonical host in the index; an exact match on the host's MAC string wins, otherwise any of its individual MACs will do (normalized, as the index keys them)
+def _Index_Lookup (host_index, macs):
+    if macs in host_index['mac_strings']:
+        return host_index['mac_strings'][macs]
+    if not isinstance(macs, str):
+        return None
+    for mac in macs.split('\n'):
+        key = ('mac', mac.strip().lower())
+        if key in host_index['keys']:
+            return _Index_Find(host_index, host_index['keys'][key])
+    return None
+
+# Takes the Nessus XML report and generates a dictionary; the report is streamed one ReportHost at a time so peak memory depends on the largest host, not the file size
+# ReportItems below min_severity, outside allow_plugins or inside deny_plugins are dropped as soon as they are read, before any of their details are collected
+# Hosts that share any MAC address (or any of the optional fallback_keys host properties) are merged through the returned host identity index
+# Every client gets a result of its own, so a consolidated export with one Report block per client returns a list of (report_dict, client, host_index), in the order the clients first appear
+# Report blocks of the same client are merged into one result, the way a single-client export always was
+def _Parse_Nessus(report_path, min_severity=0, allow_plugins=None, deny_plugins=None, fallback_keys=(), blob_threshold=None, blob_store=None):
+    scans = dict() # client -> (report_dict, client, host_index)
+    report_dict = dict()
+    host_index = _New_Host_Index()
+    host_params = ["HOST_START",
+                   "mac-address",
+                   "netbios-name",
+                   "host-rdns",
+                   "operating-system",
+                   "host-ip"]
+    vuln_params = ["pluginName",
+                   "pluginID",
+                   "port",
+                   "svc_name",
+                   "severity",
+                   "synopsis",
+                   "solution",
+                   "plugin_output"]
+    cred_fail_plugins = ["21745",
+                         "110385"]
+    plugins = dict() # pluginID -> the plugin's name, synopsis and solution, shared by all of its findings
+    strings = dict() # one shared copy of every repeated short string
+    blobs = None
+    if blob_threshold is not None and blob_store is not None:
+        blobs = {'con': _Blob_Connect(blob_store), 'threshold': blob_threshold, 'pending': []}
+
+    # Incrementally parse the XML report; only the blocks we work with are handed back, and each one is freed as soon as it has been read
+    context = etree.iterparse(report_path, events=("start", "end"), tag=("Report", "ReportHost", "HostProperties", "ReportItem"), huge_tree=True)
+
+    # Iterate over the parsed blocks and generate a dictionary that contains useful values.
+    props_dict = dict() # dict for holding host properties
+    vulns_dict = dict() # dict for holding individual vulnerability dicts
+    for event, elem in context:
+        if event == "start":
+            if elem.tag == "Report":
+                client = elem.attrib['name'].split(" ", 1)[0] # grabs the client acronym from the scan name
+                if client not in scans:
+                    scans[client] = (dict(), client, _New_Host_Index())
+                report_dict, client, host_index = scans[client] # the hosts that follow belong to this client's result
+            continue
+        if elem.tag == "HostProperties": # assemble host properties
+            _Parse_Host_Props(elem, props_dict, host_params, strings)
+            elem.clear()
+        elif elem.tag == "ReportItem": # assemble vuln details, skipping items that don't pass the filters
+            if _Keep_Report_Item(elem.attrib, min_severity, allow_plugins, deny_plugins, cred_fail_plugins):
+                vulns_dict[elem.attrib['pluginID']] = _Parse_Report_Item(elem, vuln_params, plugins, strings, blobs)
+            elem.clear()
+        elif elem.tag == "ReportHost":
+            props_dict['vulns'] = vulns_dict
+            # Resolve the host's identity against the hosts seen so far in the current scan. This helps prevent duplicate vulnerabilities when a device has more than one NIC/IP
+            _Index_Add_Host(host_index, report_dict, elem.attrib['name'], props_dict, fallback_keys)
+            props_dict = dict()
+            vulns_dict = dict()
+            # Free the finished host and any already-processed siblings so the tree never grows past one host
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    del context
+    if blobs is not None:
+        _Blob_Flush(blobs)
+        blobs['con'].close()
+
+    if len(scans) == 0: # no Report block at all; an empty result keeps the file's place in the batch
+        scans[""] = (report_dict, "", host_index)
+
+    # Determine credentialed scan status of each host and create a dictionary key for each
+    for report_dict, client, host_index in scans.values():
+        _Index_Merge_MACs(host_index, report_dict)
+        for host in report_dict:
+            fail_count = 0
+            for prop in report_dict[host]:
+                if prop == "vulns":
+                    for plugin in report_dict[host][prop]:
+                        if plugin in cred_fail_plugins:
+                            fail_count+=1
+            if fail_count == 0:
+                report_dict[host]["auth"] = 's'
+            else:
+                report_dict[host]["auth"] = 'f'
+            if 'mac-address' in report_dict[host]:
+                host_index['mac_strings'][report_dict[host]['mac-address']] = host
+
+    return list(scans.values())
+
+# Takes the -n argument and expands it into a list of .nessus files; it can be a comma-separated list (no spaces!) of files, glob patterns and directories
+def _Expand_Reports (nessusfiles):
+    reports = []
+    for item in nessusfiles.split(','):
+        if path.isdir(item): # every .nessus file directly inside the directory
+            found = sorted(glob.glob(path.join(glob.escape(item), '*.nessus')))
+        elif glob.has_magic(item):
+            found = sorted(glob.glob(item))
+        else:
+            found = [item]
+        if len(found) == 0:
+            log.warning("\nNo .nessus files found for "+item+"\n")
+        for f in found:
+            f = _Check_Path(f, 'n')
+            if f not in reports:
+                reports.append(f)
+    if len(reports) == 0:
+        raise InputError("No .nessus files to import.")
+    return reports
+
+# Parses every report, in a process pool when there's more than one; returns a list of (report path, report_dict, client, host_index), one per client of every report
+# Reports already in the parse cache are loaded from it instead; freshly parsed reports are added to the cache afterwards
+def _Parse_Reports (reports, parse_opts, workers, cache_opts=None):
+    results = dict()
+    keys = dict()
+    if cache_opts is not None and cache_opts['enabled'] and _Cache_Arrow() is None:
+        log.warning("pyarrow isn't installed, so the parse cache is off.")
+        cache_opts = None
+    if cache_opts is not None and cache_opts['enabled']:
+        for r in reports:
+            keys[r] = _Cache_Key(r, parse_opts)
+            cached = _Cache_Load(keys[r])
+            if cached is not None:
+                log.info("Loaded "+r+" from the parse cache")
+                results[r] = cached
+    misses = [r for r in reports if r not in results]
+    for r in misses:
+        log.info("Now parsing "+r)
+    if len(misses) <= 1 or workers == 1:
+        parsed = [_Parse_Nessus(r, **parse_opts) for r in misses]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(partial(_Parse_Nessus, **parse_opts), misses))
+    for i in range(len(misses)):
+        results[misses[i]] = parsed[i]
+        if misses[i] in keys:
+            _Cache_Store(keys[misses[i]], parsed[i])
+    if len(keys) > 0 and len(misses) > 0:
+        _Cache_Evict(cache_opts['max_bytes'])
+    return [(r,) + tuple(scan) for r in reports for scan in results[r]]
+
+# Parse cache: parsed reports are stored under CACHE_DIR, named by a hash of the .nessus file's contents plus the parser settings, so re-importing the same export skips the XML entirely
+# Each entry is a <key>.parsed directory: every client's hosts and findings columns as Feather (Arrow) files, and the small rest (client names, field names, host identity indexes) in scans.json
+# Nothing in an entry is ever executed on load, so a cache directory shared between analysts is safe to read
+# Hashing a large report is itself slow, so each file's hash is remembered against its size and modification time and only recomputed when those change
+def _Cache_Key (report_path, parse_opts):
+    memo_path = path.join(settings.CACHE_DIR, 'hashes.json')
+    memo = dict()
+    if path.isfile(memo_path):
+        with open(memo_path) as f:
+            memo = json.load(f)
+    full_path = path.abspath(report_path)
+    stat = os.stat(full_path)
+    if full_path in memo and memo[full_path][0] == stat.st_size and memo[full_path][1] == stat.st_mtime_ns:
+        digest = memo[full_path][2]
+    else:
+        h = hashlib.blake2b(digest_size=20)
+        with open(full_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        memo[full_path] = [stat.st_size, stat.st_mtime_ns, digest]
+        os.makedirs(settings.CACHE_DIR, exist_ok=True)
+        with open(memo_path, 'w') as f:
+            json.dump(memo, f)
+    parse_settings = json.dumps({k: sorted(v) if isinstance(v, (set, tuple, list)) else v for k, v in parse_opts.items()}, sort_keys=True)
+    return hashlib.blake2b((str(CACHE_VERSION)+digest+parse_settings).encode(), digest_size=20).hexdigest()
+
+# Flattens a parsed report into columns: one row per host and one row per finding, with a bitmask per row recording which fields were present
+def _Cache_Columns (report_dict):
+    host_props = sorted({prop for host in report_dict for prop in report_dict[host] if prop != 'vulns'})
+    vuln_params = sorted({param for host in report_dict for vuln in report_dict[host]['vulns'].values() for param in vuln})
+    hosts = {'name': list(report_dict), 'present': [], 'props': host_props}
+    findings = {'host': [], 'plugin': [], 'present': [], 'params': vuln_params}
+    for prop in host_props:
+        hosts[prop] = []
+    for param in vuln_params:
+        findings[param] = []
+    for i, host in enumerate(report_dict):
+        present = 0
+        for bit, prop in enumerate(host_props):
+            if prop in report_dict[host]:
+                present |= 1 << bit
+            hosts[prop].append(report_dict[host].get(prop))
+        hosts['present'].append(present)
+        for plugin, vuln in report_dict[host]['vulns'].items():
+            present = 0
+            for bit, param in enumerate(vuln_params):
+                if param in vuln:
+                    present |= 1 << bit
+                findings[param].append(vuln.get(param))
+            findings['host'].append(i)
+            findings['plugin'].append(plugin)
+            findings['present'].append(present)
+    hosts['present'] = np.array(hosts['present'], dtype=np.int64)
+    findings['host'] = np.array(findings['host'], dtype=np.int32)
+    findings['present'] = np.array(findings['present'], dtype=np.int64)
+    return hosts, findings
+
+# Rebuilds the report dict from its cached columns
+def _Cache_Report_Dict (hosts, findings):
+    report_dict = dict()
+    host_names = hosts['name']
+    host_props = hosts['props']
+    host_present = hosts['present'].tolist()
+    for i, host in enumerate(host_names):
+        props_dict = dict()
+        for bit, prop in enumerate(host_props):
+            if host_present[i] >> bit & 1:
+                props_dict[prop] = hosts[prop][i]
+        props_dict['vulns'] = dict()
+        report_dict[host] = props_dict
+    vuln_params = findings['params']
+    full = (1 << len(vuln_params)) - 1
+    mask_params = dict() # bitmask -> positions of the fields it has, worked out once per distinct mask
+    rows = zip(findings['host'].tolist(), findings['plugin'], findings['present'].tolist(), *[findings[param] for param in vuln_params])
+    for row in rows:
+        if row[2] == full:
+            vuln = dict(zip(vuln_params, row[3:]))
+        else:
+            if row[2] not in mask_params:
+                mask_params[row[2]] = [bit for bit in range(len(vuln_params)) if row[2] >> bit & 1]
+            vuln = {vuln_params[bit]: row[3+bit] for bit in mask_params[row[2]]}
+        report_dict[host_names[row[0]]]['vulns'][row[1]] = vuln
+    return report_dict
+
+# The cache is written and read with pyarrow; None when it isn't installed or won't load, which leaves the cache off
+def _Cache_Arrow ():
+    try:
+        pa, pq = _Arrow()
+        import pyarrow.feather as feather
+    except (InputError, ImportError):
+        return None
+    return pa, feather
+
+# The host identity index as plain JSON: its identity keys are tuples, so they're written as [kind, value, host] triples
+def _Index_To_JSON (host_index):
+    return {'parent': host_index['parent'], 'order': host_index['order'], 'keys': [[k[0], k[1], h] for k, h in host_index['keys'].items()], 'mac_strings': host_index['mac_strings']}
+
+def _Index_From_JSON (data):
+    return {'parent': data['parent'], 'order': data['order'], 'keys': {(kind, value): h for kind, value, h in data['keys']}, 'mac_strings': data['mac_strings']}
+
+# Writes one side of _Cache_Columns (hosts or findings) to a Feather file; the integer columns stay integers and everything else is a string column. fields names the entry holding the field list, which goes to scans.json instead
+def _Cache_Write_Table (pa, feather, columns, fields, file):
+    arrays = dict()
+    for col, values in columns.items():
+        if col != fields:
+            arrays[col] = pa.array(values) if isinstance(values, np.ndarray) else pa.array(values, type=pa.string())
+    feather.write_feather(pa.table(arrays), file)
+
+def _Cache_Read_Table (pa, feather, file):
+    table = feather.read_table(file)
+    return {col: table.column(col).to_numpy() if pa.types.is_integer(table.schema.field(col).type) else table.column(col).to_pylist() for col in table.column_names}
+
+# Stores every client's result of one parsed report under the report's key; the entry is assembled under a temporary name and renamed into place, so a reader never sees half of one
+def _Cache_Store (key, parsed):
+    pa, feather = _Cache_Arrow()
+    tmp = path.join(settings.CACHE_DIR, key+'.'+str(os.getpid())+'.tmp')
+    os.makedirs(tmp, exist_ok=True)
+    scans = []
+    for i, (report_dict, client, host_index) in enumerate(parsed):
+        hosts, findings = _Cache_Columns(report_dict)
+        _Cache_Write_Table(pa, feather, hosts, 'props', path.join(tmp, '%d.hosts.feather' % i))
+        _Cache_Write_Table(pa, feather, findings, 'params', path.join(tmp, '%d.findings.feather' % i))
+        scans.append({'client': client, 'props': hosts['props'], 'params': findings['params'], 'host_index': _Index_To_JSON(host_index)})
+    with open(path.join(tmp, 'scans.json'), 'w') as f:
+        json.dump(scans, f)
+    entry = path.join(settings.CACHE_DIR, key+'.parsed')
+    if path.isdir(entry): # another run cached the same report in the meantime
+        shutil.rmtree(entry, ignore_errors=True)
+    replace(tmp, entry)
+
+# Returns the cached list of (report_dict, client, host_index) for a key, or None on a miss; a hit refreshes the entry's place in the LRU order
+def _Cache_Load (key):
+    entry = path.join(settings.CACHE_DIR, key+'.parsed')
+    if not path.isdir(entry):
+        return None
+    pa, feather = _Cache_Arrow()
+    parsed = []
+    try:
+        with open(path.join(entry, 'scans.json')) as f:
+            scans = json.load(f)
+        for i, scan in enumerate(scans):
+            hosts = dict(_Cache_Read_Table(pa, feather, path.join(entry, '%d.hosts.feather' % i)), props=scan['props'])
+            findings = dict(_Cache_Read_Table(pa, feather, path.join(entry, '%d.findings.feather' % i)), params=scan['params'])
+            parsed.append((_Cache_Report_Dict(hosts, findings), scan['client'], _Index_From_JSON(scan['host_index'])))
+    except (OSError, ValueError, KeyError): # a damaged entry is dropped and the report parsed again
+        shutil.rmtree(entry, ignore_errors=True)
+        return None
+    os.utime(entry)
+    return parsed
+
+# Drops the least recently used entries until the cache fits in max_bytes; files left by the old pickled format can never be loaded again, so they go straight away
+def _Cache_Evict (max_bytes):
+    entries = []
+    for e in os.listdir(settings.CACHE_DIR):
+        entry = path.join(settings.CACHE_DIR, e)
+        if e.endswith('.parsed') and path.isdir(entry):
+            entries.append(entry)
+        elif e.endswith('.parsed'):
+            os.remove(entry)
+    entries.sort(key=path.getmtime, reverse=True)
+    total = 0
+    for entry in entries:
+        total += sum(path.getsize(path.join(entry, f)) for f in os.listdir(entry))
+        if total > max_bytes:
+            shutil.rmtree(entry, ignore_errors=True)
+
+def _Cache_Clear ():
+    if path.isdir(settings.CACHE_DIR):
+        shutil.rmtree(settings.CACHE_DIR)
+    log.info("Parse cache "+settings.CACHE_DIR+" cleared.")
+
+# Returns the earliest host scan start in a parsed report, used to reconcile reports in the order they were scanned
+def _Scan_Date (report_dict):
+    starts = pd.to_datetime(pd.Series([report_dict[h].get('HOST_START') for h in report_dict], dtype=object), format='%a %b %d %H:%M:%S %Y', errors='coerce')
+    if starts.notna().any():
+        return starts.min()
+    return pd.Timestamp.min
@@ -0,0 +1,122 @@
+# Remediation reports: month selection, gathering the remediated rows and writing the report workbook
+from openpyxl import load_workbook
+import pandas as pd
+import xlsxwriter
+from .settings import MONTH_ABBRS, col_widths
+from .metrics import _Stage_End, _Stage_Start
+from .workbook import _Load_Plugins, _Plugins_Fill, _Sheet_DF, _Stream_Date, _Stream_Formats
+from .analysis import _Compact_DF
+
+# Turns a month selection into a sorted list of month numbers; accepts "all", a single number, a range ("1-6") or a comma-separated list ("1,4,7"), returning None if anything is out of range
+def _Remed_Months (month):
+    month = str(month).strip().lower()
+    if month == 'all':
+        return list(range(1, 13))
+    months = set()
+    try:
+        for part in month.split(','):
+            if '-' in part:
+                first, last = part.split('-', 1)
+                months.update(range(int(first), int(last)+1))
+            else:
+                months.add(int(part))
+    except ValueError:
+        return None
+    if len(months) == 0 or min(months) < 1 or max(months) > 12:
+        return None
+    return sorted(months)
+
+# Names the months covered by a report for its file name and titles, e.g. 'Mar', 'Jan-Jun' or 'Jan+Apr+Jul'
+def _Remed_Label (months):
+    if len(months) == 12:
+        return 'All'
+    if len(months) > 1 and months == list(range(months[0], months[-1]+1)):
+        return MONTH_ABBRS[months[0]-1]+'-'+MONTH_ABBRS[months[-1]-1]
+    return '+'.join(MONTH_ABBRS[m-1] for m in months)
+
+# Counts a report's remediations per sheet and month, broken down by one column (Severity, Risk or Tier)
+def _Remed_Summary (remed_df, by):
+    counts = remed_df.assign(**{by: remed_df[by].fillna('(blank)').astype(str)}).groupby(['Sheet', 'Month', by], observed=True).size().unstack(by, fill_value=0)
+    counts['Total'] = counts.sum(axis=1)
+    return counts.reset_index()
+
+# Gathers every row remediated in the chosen months from the chosen sheets; returns the rows of each sheet, and all of them in one dataframe with Sheet and Month columns
+def _Remed_Frames (spreadsheet, sheets, months):
+    statuses = {'Remediated - '+MONTH_ABBRS[m-1]: MONTH_ABBRS[m-1] for m in months}
+    sheet_dfs = dict()
+    stage = _Stage_Start('load')
+    wb = load_workbook(spreadsheet, read_only=True) # the analysis sheets are only read, so stream them
+    rows = 0
+    for sheet in sheets: # one boolean mask per sheet picks out every row remediated in any of the chosen months
+        df = _Sheet_DF(wb[sheet])
+        rows += len(df)
+        sheet_dfs[sheet] = _Compact_DF(df[df['Status'].isin(statuses)].reset_index(drop=True))
+    wb.close()
+    plugins_df = _Load_Plugins(spreadsheet)
+    if plugins_df is not None: # normalized layout: the report carries the plugin text itself
+        sheet_dfs = {sheet: _Plugins_Fill(df, plugins_df) for sheet, df in sheet_dfs.items()}
+    _Stage_End(stage, sheets=len(sheets), rows=rows)
+
+    stage = _Stage_Start('build')
+    frames = [df.assign(Sheet=sheet, Month=df['Status'].map(statuses)) for sheet, df in sheet_dfs.items()]
+    remed_df = pd.concat(frames, ignore_index=True, sort=False) if len(frames) > 0 else pd.DataFrame(columns=['Sheet', 'Month']) # a workbook without analysis sheets has nothing to gather
+    remed_df['Month'] = pd.Categorical(remed_df['Month'], categories=MONTH_ABBRS, ordered=True) # keep months in calendar order in the summary
+    _Stage_End(stage, rows=len(remed_df))
+    return sheet_dfs, remed_df
+
+# Names the detail sheets: '<sheet> Remed. Report', cut to Excel's 31 characters; sheets that share a prefix that long get a ~2, ~3... suffix, since Excel won't hold two sheets of the same name (in any case)
+def _Remed_Sheet_Names (sheets):
+    names = dict()
+    taken = set()
+    for sheet in sheets:
+        name = (sheet+' Remed. Report')[:31]
+        n = 1
+        while name.lower() in taken:
+            n += 1
+            name = (sheet+' Remed. Report')[:31-len('~'+str(n))]+'~'+str(n)
+        taken.add(name.lower())
+        names[sheet] = name
+    return names
+
+# Writes the remediation report workbook: a summary sheet counting remediations by severity, risk and tier, then one detail sheet per analysis sheet
+def _Write_Remed_Report (fn, sheet_dfs, remed_df, label):
+    stage = _Stage_Start('save') # the summary tables are computed as they're written
+    workbook = xlsxwriter.Workbook(fn, {'constant_memory': True, 'strings_to_formulas': False, 'strings_to_urls': False, 'strings_to_numbers': False})
+    formats = _Stream_Formats(workbook)
+    title = workbook.add_format({'align': 'center', 'valign': 'vcenter', 'bold': True, 'font_size': 18, 'font_color': '#FFFFFF', 'bg_color': '#000000'})
+
+    ws = workbook.add_worksheet('Summary')
+    ws.set_column(0, 1, 20)
+    ws.merge_range(0, 0, 0, 8, 'Remediation Summary - '+label, title)
+    r = 2
+    for by in ['Severity', 'Risk', 'Tier']:
+        summary = _Remed_Summary(remed_df, by) if len(remed_df) > 0 else pd.DataFrame(columns=['Sheet', 'Month', 'Total'])
+        ws.write(r, 0, 'By '+by, formats['header'])
+        r+=1
+        ws.write_row(r, 0, [str(c) for c in summary.columns], formats['header'])
+        r+=1
+        for row in summary.astype(object).itertuples(index=False, name=None):
+            ws.write_row(r, 0, [str(v) if i == 1 else v for i, v in enumerate(row)], formats[(None, 'center')])
+            r+=1
+        r+=1
+
+    aligns = ['left' if col == 0 or col == 9 else 'center' for col in range(len(col_widths))] # columns A and J are left-aligned like vuln_name_style
+    names = _Remed_Sheet_Names(list(sheet_dfs))
+    for sheet, df in sheet_dfs.items(): # one detail sheet per analysis sheet, laid out like the old single-month report
+        ws = workbook.add_worksheet(names[sheet])
+        for col in range(len(col_widths)):
+            ws.set_column(col, col, col_widths[col])
+        ws.merge_range(0, 0, 0, len(col_widths)-1, sheet+' Remediation Report - '+label, title)
+        ws.set_row(0, 30)
+        ws.freeze_panes(2, 0)
+        df = df.astype(object).where(df.notna(), None)
+        ws.write_row(1, 0, list(df.columns), formats[(None, 'center')])
+        r = 2
+        for row in df.itertuples(index=False, name=None):
+            for col in range(len(row)):
+                align = aligns[col] if col < len(aligns) else 'center'
+                if not _Stream_Date(ws, r, col, row[col], formats, ('good', align)):
+                    ws.write(r, col, row[col], formats[('good', align)])
+            r+=1
+    workbook.close()
+    _Stage_End(stage, sheets=len(sheet_dfs), rows=len(remed_df))
@@ -0,0 +1,51 @@
+# Status transition rules checked against the analysis sheet after every import, and loading site-specific ones from JSON
+import json
+from .settings import SHEET_COLUMNS
+from .errors import InputError
+
+RULE_FLAGS = ['seen', 'seen_no_mac', 'rescanned'] # the conditions that come from reconciliation rather than a sheet column
+
+# Status transition rules applied to the analysis sheet after every import; the first rule a row matches decides its new Status and Robot Note
+# 'when' holds the conditions, all of which must hold: 'seen' (the vuln/MAC combo is in the new report), 'seen_no_mac' (it is, but with a '???' MAC),
+# 'rescanned' (the row's host had a credentialed check at least as new as the row), or any sheet column name mapped to a value, a list of values, or {"regex": pattern}
+# '{month}' in a new status is replaced with the current month's abbreviation; site-specific rules can be loaded from a JSON file with --rules and take precedence over these
+STATUS_RULES = [{'when': {'seen_no_mac': True},
+                 'status': 'Pending Reevaluation',
+                 'note': 'A MAC address could not be detected for this device, but it was in a recent scan - please manually determine the status of this vulnerability (delete this note)'},
+                {'when': {'seen': True, 'rescanned': True, 'Status': 'Pending Patch Cycle'},
+                 'status': 'Pending Reevaluation',
+                 'note': 'was pending patch cycle - re-examine vulnerability.'},
+                {'when': {'seen': True, 'rescanned': True, 'Status': 'Pending Ticket Creation', 'Risk': ['Med', 'Low']},
+                 'status': 'Pending Reevaluation',
+                 'note': 'was pending ticket creation and med/low risk - time to process it now?'},
+                {'when': {'seen': True, 'rescanned': True, 'Status': 'Pending Ticket Creation', 'Risk': ['High', 'Crit']},
+                 'status': 'Pending Reevaluation',
+                 'note': 'was pending ticket creation and crit/high risk - HANDLE IT THIS CYCLE.'},
+                {'when': {'seen': True, 'rescanned': True, 'Status': {'regex': 'Remed.*'}},
+                 'status': 'Pending Reevaluation',
+                 'note': 'marked remediated but was picked up in last scan - re-examine host.'},
+                {'when': {'seen': False, 'rescanned': True, 'Status': ['Pending Remediation', 'Pending Ticket Creation', 'Pending Analysis', 'Pending Patch Cycle']},
+                 'status': 'Remediated - {month}',
+                 'note': 'was pending, and was not found in the last credentialed check of the host - marked remediated.'}]
+
+# Loads site-specific status rules from a JSON file (a list of rules shaped like STATUS_RULES) and puts them ahead of the built-in rules
+def _Load_Status_Rules (rules_path):
+    try:
+        with open(rules_path, encoding="utf8") as f:
+            site_rules = json.load(f)
+    except (OSError, ValueError) as e:
+        raise InputError("Could not read status rules from "+rules_path+": "+str(e))
+    if not isinstance(site_rules, list) or not all(isinstance(r, dict) and 'status' in r for r in site_rules):
+        raise InputError("Status rules file must hold a list of rules, each with at least a 'status' value.")
+    _Check_Status_Rules(site_rules)
+    return site_rules + STATUS_RULES
+
+# Checks every rule's conditions name a reconciliation flag or an analysis sheet column, so a typo is reported before an import starts instead of failing halfway through one
+def _Check_Status_Rules (rules):
+    for i, rule in enumerate(rules):
+        when = rule.get('when', dict())
+        if not isinstance(when, dict):
+            raise InputError("Status rule "+str(i+1)+": 'when' must map conditions to values.")
+        for key in when:
+            if key not in RULE_FLAGS and key not in SHEET_COLUMNS:
+                raise InputError("Status rule "+str(i+1)+": unknown condition '"+key+"'; use "+", ".join(RULE_FLAGS)+" or an analysis sheet column.")
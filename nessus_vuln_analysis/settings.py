@@ -0,0 +1,36 @@
+# Constants shared across the package, plus the run-wide switches the command line sets (OUTPUT_ENGINE, STYLE_MODE, BACKUP_*, CACHE_DIR)
+# Nothing here imports pandas, openpyxl or lxml, so option handling and validation never pay for them
+import re
+import datetime
+from os import path
+
+# The date statuses, history stamps and backup ages are worked out from; read on every use, since a --watch process or a library host outlives the day it started
+def _Today ():
+    return datetime.datetime.today()
+
+# Global constants for the spreadsheet formatting options
+col_widths = [40, 12, 14, 18, 18, 18, 12, 18, 25, 40, 14, 14, 12, 8, 10, 10, 25, 25, 12, 18, 18, 12, 18] # analysis sheet column widths for columns A through W
+remed_re = re.compile("Remed.*") # matches any of the month-based remediated statuses
+OUTPUT_ENGINE = 'openpyxl' # 'openpyxl' edits the loaded workbook in memory; 'stream' writes a fresh copy row by row with xlsxwriter
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
+MONTH_ABBRS = [m[:3] for m in MONTH_NAMES] # the month suffix used by the 'Remediated - <Mon>' statuses
+BACKUP_MODE = 'copy' # how backups are stored: 'copy', 'gzip' or 'hardlink'
+BACKUP_KEEP = None # how many backups of each workbook to keep; None keeps them all
+BACKUP_DAYS = None # drop backups older than this many days; None keeps them all
+PLUGIN_META = ['pluginName', 'synopsis', 'solution'] # ReportItem fields that belong to the plugin rather than the finding
+CATEGORY_COLUMNS = ['Vulnerability Name', 'Solution', 'Synopsis', 'OS', 'Status', 'Service'] # dataframe columns held as categoricals where they're only read
+PLUGINS_SHEET = 'plugins' # hidden sheet holding per-plugin text in the normalized layout
+PLUGIN_TEXT_COLUMNS = ['Synopsis', 'Solution'] # the plugin text the normalized layout keeps in PLUGINS_SHEET
+SHEET_COLUMNS = ['Vulnerability Name', 'Plugin ID', 'Target', 'Device Name', 'MAC(s)', 'OS', 'Port', 'Service', 'Synopsis', 'Output', 'Last Scanned', 'Analysis Date', 'Analyst',
+                 'Severity', 'Risk', 'Tier', 'Solution', 'Notes', 'Ticket #', 'Status', 'Vulnerability Details', 'Scanner Config?', 'Robot Note'] # an analysis sheet's columns, A through W
+REF_SHEETS = ['statuses', 'columns', PLUGINS_SHEET] # sheets that aren't analysis sheets
+CACHE_DIR = path.join(path.expanduser('~'), '.nessus-vuln-analysis', 'parse-cache') # where parsed reports are cached between runs
+CACHE_VERSION = 4 # bump whenever the parser's output changes so stale cache entries are never loaded
+ANALYST_COLUMNS = ['Analysis Date', 'Analyst', 'Risk', 'Tier', 'Notes', 'Ticket #', 'Status', 'Scanner Config?'] # columns analysts fill in by hand in Excel
+BLOB_PREVIEW = 1000 # characters of an offloaded plugin output that stay in its cell
+BLOB_BATCH = 200 # offloaded outputs a parse worker writes to the blob store per transaction
+blob_re = re.compile(r'full output: ([0-9a-f]{32})\]') # finds the blob store key in an offloaded output's cell text
+STYLE_MODE = 'cells' # 'cells' styles every cell individually; 'conditional' keeps the per-cell alignment and borders but colours rows with sheet-level conditional formatting keyed on the Status column
+FINDING_KEY = ['Vulnerability Name', 'MAC(s)'] # what makes a finding the same finding from one scan to the next, as _Add_New_Vulns matches them
+DELTA_COLUMNS = ['Change', 'Vulnerability Name', 'Plugin ID', 'Severity', 'Device Name', 'Target', 'MAC(s)', 'OS', 'Port', 'Last Scanned'] # what a scan delta keeps of each finding
+DELTA_CHANGES = ['New', 'Fixed', 'Persisting']
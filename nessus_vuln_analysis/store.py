@@ -0,0 +1,182 @@
+# The SQLite sidecars kept next to a workbook: the findings state store and the plugin output blob store
+import logging
+from openpyxl import load_workbook
+from os import path
+import hashlib
+import sqlite3
+import zlib
+import numpy as np
+import pandas as pd
+from .settings import ANALYST_COLUMNS, BLOB_BATCH, BLOB_PREVIEW, REF_SHEETS
+from .workbook import _Sheet_DF
+
+log = logging.getLogger(__name__)
+
+STORE_MAC = 'MAC(s) in store' # snapshot column: the MAC(s) a rendered row has in the store, which an import can move on from what the workbook shows
+
+# Sidecar state store: a SQLite file next to the workbook holding the authoritative findings table for every analysis sheet, so imports never have to round-trip the xlsx
+# Each sheet is one table; '<sheet> (rendered)' tables remember the analyst columns as they were last written to the workbook, so edits made in Excel can be told apart from stale values
+def _Store_Path (spreadsheet):
+    return path.splitext(spreadsheet)[0]+'.state.sqlite'
+
+def _Store_Connect (spreadsheet):
+    con = sqlite3.connect(_Store_Path(spreadsheet))
+    con.execute('CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)')
+    return con
+
+# Quotes a sheet name for use as a SQLite table name
+def _Store_Table (sheet):
+    return '"'+sheet.replace('"', '""')+'"'
+
+def _Store_Sheets (con):
+    tables = [r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    return [t for t in tables if t != 'store_meta' and t not in REF_SHEETS and not t.endswith(' (rendered)')]
+
+def _Store_Read (con, sheet):
+    if sheet not in [r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]:
+        return None
+    df = pd.read_sql('SELECT * FROM '+_Store_Table(sheet), con)
+    return df.astype(object).where(df.notna(), None)
+
+def _Store_Write (con, sheet, df):
+    _Store_Text(df).to_sql(sheet, con, if_exists='replace', index=False)
+    con.commit()
+
+def _Store_Get_Meta (con, key):
+    row = con.execute('SELECT value FROM store_meta WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else None
+
+def _Store_Set_Meta (con, key, value):
+    con.execute('INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)', (key, value))
+    con.commit()
+
+# Makes every value in a dataframe either None or text, the way the store holds it, so values read from Excel compare cleanly against stored ones
+def _Store_Text (df):
+    df = df.astype(object).where(df.notna(), None)
+    for col in df.columns:
+        df[col] = df[col].map(lambda v: v if v is None or isinstance(v, str) else str(v))
+    return df
+
+# Records the analyst columns of a sheet as they are now in the workbook; sync compares against this to find what analysts changed in Excel
+# STORE_MAC holds the MAC(s) each row is keyed by in the store: the workbook's own cell unless store_macs says otherwise, or an import has since moved the row (_Store_Moves)
+def _Store_Snapshot (con, sheet, df, store_macs=None):
+    cols = [c for c in ['Vulnerability Name', 'MAC(s)'] + ANALYST_COLUMNS if c in df.columns]
+    snap_df = _Store_Text(df[cols])
+    snap_df[STORE_MAC] = snap_df['MAC(s)'].to_numpy() if store_macs is None else store_macs
+    snap_df.to_sql(sheet+' (rendered)', con, if_exists='replace', index=False)
+    con.commit()
+
+# Follows the rows an import moved onto their host's current MAC string (see _Mod_Analysis_Spreadsheet) in the sheet's snapshot, so the next sync matches the workbook rows that still show the old string to their store rows
+# old_df is the sheet as it was loaded from the store; an import keeps the existing rows first and in order, so its rows line up with the start of new_df
+def _Store_Moves (con, sheet, old_df, new_df):
+    old = old_df['MAC(s)'].to_numpy()
+    moved = old != new_df['MAC(s)'].to_numpy()[:len(old)]
+    snap_df = _Store_Read(con, sheet+' (rendered)')
+    if not moved.any() or snap_df is None:
+        return
+    if STORE_MAC not in snap_df.columns: # a snapshot from before keys were followed
+        snap_df[STORE_MAC] = snap_df['MAC(s)']
+    moves = pd.Series(new_df['MAC(s)'].to_numpy()[:len(old)][moved], index=pd.MultiIndex.from_arrays([old_df['Vulnerability Name'].to_numpy()[moved], old[moved]]))
+    moves = moves[~moves.index.duplicated()]
+    keys = pd.MultiIndex.from_arrays([snap_df['Vulnerability Name'], snap_df[STORE_MAC]])
+    hit = keys.isin(moves.index)
+    snap_df.loc[hit, STORE_MAC] = moves.reindex(keys[hit]).to_numpy()
+    snap_df.to_sql(sheet+' (rendered)', con, if_exists='replace', index=False)
+    con.commit()
+
+# The store key MAC(s) of each workbook row: the snapshot's STORE_MAC for rows it rendered, the row's own cell for any other
+def _Store_MACs (xl_df, snap_df):
+    if STORE_MAC not in snap_df.columns:
+        return xl_df['MAC(s)'].to_numpy()
+    keys = ['Vulnerability Name', 'MAC(s)']
+    rendered = snap_df.drop_duplicates(keys, keep='last').set_index(keys)[STORE_MAC]
+    store_macs = rendered.reindex(pd.MultiIndex.from_frame(xl_df[keys])).to_numpy()
+    return np.where(pd.isna(store_macs), xl_df['MAC(s)'].to_numpy(), store_macs)
+
+# Loads a sheet's findings from the store, seeding the store from the workbook the first time a sheet is used
+def _Store_Load_Sheet (con, spreadsheet, sheet):
+    df = _Store_Read(con, sheet)
+    if df is None:
+        log.info("Seeding the state store with "+sheet+" from "+path.basename(spreadsheet)+"...")
+        wb = load_workbook(spreadsheet, read_only=True)
+        df = _Store_Text(_Sheet_DF(wb[sheet]))
+        wb.close()
+        _Store_Write(con, sheet, df)
+        _Store_Snapshot(con, sheet, df)
+    return df
+
+# Pulls analyst edits (Status, Notes, Ticket # and the other ANALYST_COLUMNS) from the workbook back into the store by (Vulnerability Name, MAC(s)) key
+# Only cells that differ from what was last rendered count as edits; rows added by hand in Excel are appended; nothing happens if the workbook hasn't changed since the last sync or render
+def _Store_Sync (con, spreadsheet):
+    mtime = str(path.getmtime(spreadsheet))
+    if _Store_Get_Meta(con, 'workbook_mtime') == mtime or len(_Store_Sheets(con)) == 0:
+        _Store_Set_Meta(con, 'workbook_mtime', mtime)
+        return
+    log.info("Syncing analyst edits from "+path.basename(spreadsheet)+" into the state store...")
+    keys = ['Vulnerability Name', 'MAC(s)']
+    wb = load_workbook(spreadsheet, read_only=True)
+    for sheet in _Store_Sheets(con):
+        if sheet not in wb.sheetnames:
+            continue
+        store_df = _Store_Read(con, sheet)
+        xl_df = _Store_Text(_Sheet_DF(wb[sheet]))
+        snap_df = _Store_Read(con, sheet+' (rendered)')
+        if snap_df is None:
+            snap_df = store_df
+        rendered_df = xl_df
+        store_macs = _Store_MACs(xl_df, snap_df)
+        xl_df = xl_df.assign(**{'MAC(s)': store_macs}) # workbook rows and the snapshot are matched to the store by the store's keys
+        if STORE_MAC in snap_df.columns:
+            snap_df = snap_df.assign(**{'MAC(s)': snap_df[STORE_MAC]})
+        cols = [c for c in ANALYST_COLUMNS if c in store_df.columns and c in xl_df.columns and c in snap_df.columns]
+        store_keys = pd.MultiIndex.from_frame(store_df[keys])
+        xl = xl_df.drop_duplicates(keys, keep='last').set_index(keys)
+        snap = snap_df.drop_duplicates(keys, keep='last').set_index(keys)
+        in_xl = store_keys.isin(xl.index)
+        xl_vals = xl[cols].reindex(store_keys)
+        snap_vals = snap[cols].reindex(store_keys)
+        for c in cols:
+            a = xl_vals[c].to_numpy()
+            b = snap_vals[c].to_numpy()
+            edited = in_xl & ~((a == b) | (pd.isna(a) & pd.isna(b)))
+            store_df.loc[edited, c] = a[edited]
+        added = xl_df[~pd.MultiIndex.from_frame(xl_df[keys]).isin(store_keys)]
+        if len(added) > 0:
+            store_df = pd.concat([store_df, added], ignore_index=True, sort=False)
+        _Store_Write(con, sheet, store_df)
+        _Store_Snapshot(con, sheet, rendered_df, store_macs)
+    wb.close()
+    _Store_Set_Meta(con, 'workbook_mtime', mtime)
+
+# Blob store: plugin outputs longer than the --blob-threshold are kept zlib-compressed in a SQLite file next to the workbook, keyed by a hash of their text
+# The cell only keeps a preview and the key, so neither the parsed reports nor the workbook carry the full text; --fetch-output gets it back
+def _Blob_Path (spreadsheet):
+    return path.splitext(spreadsheet)[0]+'.blobs.sqlite'
+
+# Parse workers write to the same store: in WAL mode readers never block them, and each writer only holds the write lock for one short batch (see _Blob_Put), so the timeout is only a backstop
+def _Blob_Connect (blob_path):
+    con = sqlite3.connect(blob_path, timeout=60)
+    con.execute('PRAGMA journal_mode=WAL')
+    con.execute('CREATE TABLE IF NOT EXISTS blobs (key TEXT PRIMARY KEY, size INTEGER, data BLOB)')
+    con.commit()
+    return con
+
+# Stores one output and returns the text its cell keeps instead; identical outputs from other hosts or scans share one entry
+# Outputs are compressed straight away but written in batches of BLOB_BATCH, each its own transaction; blobs is the parser's {'con', 'threshold', 'pending'}, and _Blob_Flush writes whatever is left
+def _Blob_Put (blobs, text):
+    data = text.encode('utf-8')
+    key = hashlib.blake2b(data, digest_size=16).hexdigest()
+    blobs['pending'].append((key, len(text), zlib.compress(data, 6)))
+    if len(blobs['pending']) >= BLOB_BATCH:
+        _Blob_Flush(blobs)
+    return text[:BLOB_PREVIEW]+'\n... ['+str(len(text))+' characters; full output: '+key+']'
+
+def _Blob_Flush (blobs):
+    if len(blobs['pending']) > 0:
+        with blobs['con']: # commits straight away, releasing the write lock for the other workers
+            blobs['con'].executemany('INSERT OR IGNORE INTO blobs VALUES (?, ?, ?)', blobs['pending'])
+        blobs['pending'] = []
+
+def _Blob_Get (con, key):
+    row = con.execute('SELECT data FROM blobs WHERE key = ?', (key,)).fetchone()
+    return None if row is None else zlib.decompress(row[0]).decode('utf-8')
@@ -0,0 +1,538 @@
+# Reading and writing analysis workbooks: styles, fresh workbooks, the openpyxl and streaming writers, and the normalized plugin layout
+import logging
+import datetime
+from openpyxl import load_workbook
+from openpyxl.styles import NamedStyle, Border, Side, Alignment, PatternFill, Font
+from openpyxl.worksheet.datavalidation import DataValidation
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.utils import get_column_letter
+from os import path, replace
+import pandas as pd
+import xlsxwriter
+from . import settings
+from .settings import PLUGINS_SHEET, PLUGIN_TEXT_COLUMNS, SHEET_COLUMNS, col_widths, remed_re
+from .metrics import _Stage_End, _Stage_Start
+from .checks import _Workbook_Sheets
+
+log = logging.getLogger(__name__)
+
+border = Border(left=Side(border_style='thin'), # basic black cell border
+                right=Side(style='thin'),
+                top=Side(style='thin'),
+                bottom=Side(style='thin'))
+
+gray_border = Border(left=Side(border_style='double'), # mirrors excel's "Check Cell" built-in style border
+                     right=Side(style='double'),
+                     top=Side(style='double'),
+                     bottom=Side(style='double'))
+
+my_bad = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid') # cell style config that mirrors excel "Bad" built-in
+
+bad_font = Font(color='9C0006')
+
+my_neutral = PatternFill(start_color='FFEB9C', end_color='FFEB9C', fill_type='solid') # cell style config that mirrors excel "Neutral" built-in
+
+neutral_font = Font(color='9C5700')
+
+my_good = PatternFill(start_color='C6EFCE', end_color='C6EFCE', fill_type='solid') # cell style config that mirrors excel "Good" built-in
+
+good_font = Font(color='006100')
+
+my_check = PatternFill(start_color='A5A5A5', end_color='A5A5A5', fill_type='solid') # cell style config that mirrors excel "Check Cell" built-in
+
+check_font = Font(color='FFFFFF', bold=True)
+
+data_val = DataValidation(type="list", formula1='=statuses!$A$2:$A$22', allow_blank=True) # data validation object for limiitng status column values
+
+vuln_name_style = NamedStyle(name="vuln_name_style") # global text alignment and wrapping style specs
+
+vuln_name_style.alignment = Alignment(horizontal='left',
+                                      vertical='center',
+                                      wrapText=True)
+
+the_rest_style = NamedStyle(name="the_rest_style")
+
+the_rest_style.alignment = Alignment(horizontal='center',
+                                     vertical='center',
+                                     wrapText=True)
+
+vuln_name_style.border = border # applies the thin black border to all custom cell styles
+
+the_rest_style.border = border
+
+# Saves an openpyxl workbook to a temporary file and swaps it into place, so a half-written save never replaces the spreadsheet and hardlinked backups are left untouched
+def _Save_WB (wb, spreadsheet):
+    tmp = spreadsheet+'.tmp'
+    wb.save(tmp)
+    replace(tmp, spreadsheet)
+
+# Setting column styles is needed several times throughout the program's functions
+def _Set_Col_Styles (ws):
+    for cell in ws['A']:
+        cell.style = 'vuln_name_style'
+    for cell in ws['J']:
+        cell.style = 'vuln_name_style'
+    for column in ws['B:I']:
+        for cell in column:
+            cell.style = 'the_rest_style'
+    for column in ws['K:W']:
+        for cell in column:
+            cell.style = 'the_rest_style'
+    return ws
+
+# Setting column dimensions is needed several times throughout the program's functions
+def _Set_Col_Widths (ws):
+    for col in range(len(col_widths)):
+        ws.column_dimensions[get_column_letter(col+1)].width = col_widths[col]
+    return ws
+
+# Setting cell format based on the row's 'Status' field is needed several times throughout the program's functions
+def _Set_Row_Format (ws):
+    for row in ws.iter_rows():
+        if row[19].value == '':
+            row[19].value = 'Pending Analysis'
+        if row[19].value == "Pending Analysis" or row[19].value == "Pending Ticket Creation" or row[19].value == "Pending Reevaluation":
+            for cell in row:
+                cell.fill = my_bad
+                cell.font = bad_font
+        elif row[19].value == "Pending Patch Cycle" or row[19].value == "Pending Remediation" or row[19].value == "On Hold":
+            for cell in row:
+                cell.fill = my_neutral
+                cell.font = neutral_font
+        elif remed_re.match(row[19].value) or row[19].value == "Closed":
+            for cell in row:
+                cell.fill = my_good
+                cell.font = good_font
+        elif row[19].value == "Risk Ack. Needed" or row[19].value == "False Positive Doc. Needed":
+            for cell in row:
+                cell.fill = my_check
+                cell.font = check_font
+                cell.border = gray_border
+    return ws
+
+# Column-level defaults matching _Set_Col_Styles; Excel only gives them to cells created after the file is opened, so they cover rows analysts add by hand, not the cells already written
+def _Set_Col_Defaults (ws):
+    for col in range(1, 24): # columns A through W
+        letter = get_column_letter(col)
+        if letter == 'A' or letter == 'J':
+            ws.column_dimensions[letter].alignment = vuln_name_style.alignment
+        else:
+            ws.column_dimensions[letter].alignment = the_rest_style.alignment
+        ws.column_dimensions[letter].border = border
+    return ws
+
+# Conditional-formatting equivalent of _Set_Row_Format: the status colour bands become a handful of sheet-level rules on column T, so the cost doesn't grow with the row count
+def _Set_Cond_Formats (ws):
+    rows = 'A2:W1048576'
+    ws.conditional_formatting.add(rows, FormulaRule(formula=['OR($T2="Pending Analysis",$T2="Pending Ticket Creation",$T2="Pending Reevaluation",AND($T2="",$A2<>""))'], fill=my_bad, font=bad_font, stopIfTrue=True))
+    ws.conditional_formatting.add(rows, FormulaRule(formula=['OR($T2="Pending Patch Cycle",$T2="Pending Remediation",$T2="On Hold")'], fill=my_neutral, font=neutral_font, stopIfTrue=True))
+    ws.conditional_formatting.add(rows, FormulaRule(formula=['OR(LEFT($T2,5)="Remed",$T2="Closed")'], fill=my_good, font=good_font, stopIfTrue=True))
+    ws.conditional_formatting.add(rows, FormulaRule(formula=['OR($T2="Risk Ack. Needed",$T2="False Positive Doc. Needed")'], fill=my_check, font=check_font, border=gray_border, stopIfTrue=True))
+    return ws
+
+# Applies baseline alignment and border formats; every existing cell gets its named style in both styling modes, since only the fills and fonts can come from conditional formatting
+# The conditional mode adds the column defaults as well, so rows typed in later line up too
+def _Style_Cols (ws):
+    ws = _Set_Col_Styles(ws)
+    if settings.STYLE_MODE == 'conditional':
+        return _Set_Col_Defaults(ws)
+    return ws
+
+# Applies the Status-based row formatting in the active styling mode
+def _Style_Rows (ws):
+    if settings.STYLE_MODE == 'conditional':
+        return _Set_Cond_Formats(ws)
+    return _Set_Row_Format(ws)
+
+# Applies the reference sheet formats (widths, wrapping and the status colour key) to xlsxwriter 'statuses' and 'columns' worksheets
+def _Format_Ref_Sheets (workbook, statuses_sheet, columns_sheet):
+    pgraph = workbook.add_format({'text_wrap': True, # define various cell styles and formats compatible with the xlsxwriter writer object
+                                    'align': 'left',
+                                    'valign': 'top'})
+    stat = workbook.add_format({'text_wrap': True,
+                                'align': 'left',
+                                'valign': 'vcenter'})
+    red = workbook.add_format({'bg_color': '#FFC7CE',
+                                'font_color': '#9C0006',
+                                'align': 'center',
+                                'valign': 'vcenter',
+                                'border': True,
+                                'border_color': 'black'})
+    yellow = workbook.add_format({'bg_color': '#FFEB9C',
+                                'font_color': '#9C5700',
+                                'align': 'left',
+                                'valign': 'vcenter',
+                                'border': True,
+                                'border_color': 'black'})
+    gray = workbook.add_format({'bg_color': '#A5A5A5',
+                                'font_color': 'white',
+                                'bold': True,
+                                'align': 'left',
+                                'valign': 'vcenter',
+                                'border': 6,
+                                'border_color': 'black'})
+    green = workbook.add_format({'bg_color': '#C6EFCE',
+                                'font_color': '#006100',
+                                'align': 'left',
+                                'valign': 'vcenter',
+                                'border': True,
+                                'border_color': 'black'})
+
+    statuses_sheet.set_column(1, 1, 120, pgraph) # format the sheets with appropriate cell widths and styles previously defined
+    statuses_sheet.set_column(0, 0, 27, stat)
+    columns_sheet.set_column(1, 1, 120, pgraph)
+    columns_sheet.set_column(0, 0, 27, stat)
+    statuses_sheet.conditional_format('A2:A3', {'type': 'no_errors', 'format': red})
+    statuses_sheet.conditional_format('A4:A5', {'type': 'no_errors', 'format': yellow})
+    statuses_sheet.conditional_format('A6', {'type': 'no_errors', 'format': red})
+    statuses_sheet.conditional_format('A7:A8', {'type': 'no_errors', 'format': gray})
+    statuses_sheet.conditional_format('A9', {'type': 'no_errors', 'format': yellow})
+    statuses_sheet.conditional_format('A10:A22', {'type': 'no_errors', 'format': green})
+
+#Generate a fresh workbook for importing vulnerability data
+def _Gen_Fresh_Workbook (spreadsheet, sheets):
+    statuses_data = {'Status':['Pending Analysis', 'Pending Ticket Creation', # define the data that goes into the default reference sheets
+                                'Pending Patch Cycle', 'Pending Remediation', 'Pending Reevaluation',
+                                'Risk Ack. Needed', 'False Positive Doc. Needed',
+                                'On Hold', 'Closed',
+                                'Remediated - Jan', 'Remediated - Feb',
+                                'Remediated - Mar', 'Remediated - Apr',
+                                'Remediated - May', 'Remediated - Jun',
+                                'Remediated - Jul', 'Remediated - Aug',
+                                'Remediated - Sep', 'Remediated - Oct',
+                                'Remediated - Nov', 'Remediated - Dec'],
+                                'Explanation':["The vulnerability has yet to be analyzed by a security analyst",
+                                                "The vulnerability has been analyzed by a security analyst, but the assigned analyst has not yet created a ticket for it.",
+                                                "The vulnerability is very recent and references one or several critical or important OS patches. This status is used when the analyst determines that the vulnerability does not pose an immediate threat and has no reason to believe the patching procedure will not handle the vulnerability according to its schedule.",
+                                                "The vulnerability has been analyzed and a ticket has been created/assigned outlining remediation steps.",
+                                                "The vulnerability entry has been modified or marked wrongly in some way, or an oddity in the scan data warrants manual examination. This could be due to a vulnerability's status being marked as \"Remediated\" even though it continues to be detected in scans. Whenever this status is seen, refer to the vulnerability's \"Mitigation Notes\" or \"Robot Notes\" columns for more information.",
+                                                "The vulnerability entry has been confirmed to represent a true positive, however certain factors dictate that the vulnerability cannot or will not be remediated and the risk will be accepted instead. This decision usually comes from the Leadership Team or the Head of the Security Department. Every risk acknowledgment needs to be documented according to a template/standard.",
+                                                "The vulnerability has been confirmed to represent a false positive. This is usually accompanied by a modified scanner configuration, listing the false positive vulnerability as a lower default risk level to prevent it from appearing as High or Critical. Every false positive needs to be documented according to a template/standard.",
+                                                "This status ought not be used frequently. It is a catch-all status for any vulnerability entry that does not meet any of the other status conditions and must be picked back up in the future.",
+                                                "This status ought not be used frequently. It is a catch-all status for any vulnerability entry that does not meet any of the other status conditions and does not need to be handled, modified, analyzed, remediated, or otherwise worried about.",
+                                                "This status and all other month-based remediation statuses signify the vulnerability has been handled and will not be seen again on the device in question. Having separate remediation statuses for every month allows for the use of macros to generate remediation reports for any given month out of the year.", "\"", "\"", "\"", "\"", "\"", "\"", "\"", "\"", "\"", "\"", "\""]}
+    columns_data = {'Column': SHEET_COLUMNS,
+                                'Explanation':["The name of the vulnerability as it is reported by the scan source.",
+                                "The scanner plugin that detected the vulnerability.",
+                                "The target identifier used by the scan to identify unique targets detected.",
+                                "The DNS name or NetBIOS name of the target host - this is not a fixed or globally unique identifier!",
+                                "The device's MAC address; contains multiple addresses if the scanner detects multiple network interfaces. If a MAC is not detected, '???' will be listed. This severely limits the Python tool's ability to examine vulnerability entries.",
+                                "The detected OS; this is most likely not accurate. Don't rely on it.",
+                                "The port that the vulnerability was detected on.",
+                                "The service name using the port in question. Determination of the name happens on the scanner's side, not the target's side.",
+                                "The basic description of the vulnerability provided by the scanner's plugin description.",
+                                "The plugin output that shows you why the plugin picked up the vulnerability on the target host; this is important information for determining the remediation steps required.",
+                                "The last time this device was seen in a scan report (does not consider authentication success though)",
+                                "The date on which the assigned security analyst performed analysis on the vulnerability",
+                                "The security analyst who performed the initial analysis on the vulnerability",
+                                "The scanner's reported severity rating for the vulnerability in question; 4 is critical. 3 is High.",
+                                "The risk level assigned by the security analyst; this ranking, of critical, high, medium, low, or N/A, signifies the practical threat level - not the abstract default threat level given by Nessus; this ranking informs the remediation prioritization schedule",
+                                "The tier of MRW that needs to address the vulnerability: Reactive, Tech Admin, Engineer, or Security.",
+                                "The default solution provided by the scanner plugin.",
+                                "The security analysts notes on the vulnerability; this could be notes on tracking the vulnerability, more insight into why it was detected, or more details about how to remediate it.",
+                                "The ticket number of the ticket created to handle the remediation of the vulnerability",
+                                "Describes the stage in which the vulnerability is within the analysis/remediation cycle",
+                                "A link to the scanner plugin details; usually a link to an external resource.",
+                                "Indicates whether the vulnerability prompted a reconfiguration of the scanner's default plugin threat rankings; provides detail on what the change entails if a change has taken place",
+                                "Any notes left by the vuln_analysis.py script for the given vulnerability"]}
+
+    statuses_df = pd.DataFrame(statuses_data) # create the not-yet-formatted dataframes that hold the above data dictionaries
+    columns_df = pd.DataFrame(columns_data)
+
+    stage = _Stage_Start('build')
+    writer = pd.ExcelWriter(spreadsheet, engine='xlsxwriter') # initialize the new spreadsheet writer object and a workbook object to work with
+    workbook = writer.book
+
+    for s in sheets: # iterate over the sheetnames you provided previously
+        worksheet_df = pd.DataFrame(columns=columns_df['Column']) # create temp dataframe using column names according to those listed in the 'columns' sheet
+        worksheet_df.to_excel(writer, s, index=False) # transfer temp dataframe to the spreadsheet object as a new sheet
+        ws = writer.sheets[s] # define a new temp sheet object in order to freeze the first row column names and set formats
+        ws.freeze_panes(1, 0)
+
+    statuses_df.to_excel(writer, 'statuses', index=False) # transfer default sheet dataframes to the spreadsheet object as new sheets
+    columns_df.to_excel(writer, 'columns', index=False)
+
+    statuses_sheet = writer.sheets['statuses'] # initialize worksheet objects out of the previously transferred dataframe sheets in order to apply formatting to them
+    columns_sheet = writer.sheets['columns']
+
+    _Format_Ref_Sheets(workbook, statuses_sheet, columns_sheet) # format the sheets with appropriate cell widths and styles
+
+    writer.save() # save the spreadsheet object and close it
+
+    _Stage_End(stage, sheets=len(sheets))
+
+    stage = _Stage_Start('style')
+    wb = load_workbook(spreadsheet, read_only=False) # initialize a new workbook object so we can modify the now-existing xlsx file
+
+    wb.add_named_style(vuln_name_style) # add the previously defined styles to the workbook object so they can be used; this should stick between saves
+    wb.add_named_style(the_rest_style)
+
+    for sheet in wb.sheetnames: # iterate over sheetnames as they occur in the spreadsheet previously created and saved
+        if sheet in sheets: # check if the current sheet is one of the analysis sheets
+            ws1 = wb[sheet] # initialize a worksheet object to apply styles and widths
+            ws1.add_data_validation(data_val) # applies data validation to the statuses column so that the program's modification logic doesn't hit any snags
+            data_val.add("T2:T1048576")
+            ws1 = _Style_Cols(ws1) # apply alignment and border styles to the specified columns
+            if settings.STYLE_MODE == 'conditional':
+                ws1 = _Set_Cond_Formats(ws1) # rows are coloured by rule, so the rules go in from the start
+            ws1 = _Set_Col_Widths(ws1) # set custom column widths
+    _Stage_End(stage, sheets=len(sheets))
+    # finally save and close the fresh worksheet, ready to be fed into the program
+    stage = _Stage_Start('save')
+    wb.save(spreadsheet)
+    _Stage_End(stage)
+
+# Performs all modification of the analysis spreadsheet after analyzing the scan reports; every rewritten sheet is placed into the workbook first and the workbook is saved only once
+def _Finagle_WB (existing_spreadsheet, wb, sheet_dfs, plugins_df=None):
+    writer = pd.ExcelWriter(existing_spreadsheet, engine='openpyxl') # declare engine to write dataframes to the spreadsheet
+    writer.book = wb # define the workbook that the writer writes to
+    log.info("Making changes in "+existing_spreadsheet.split('\\')[-1]+"...")
+    for style in [vuln_name_style, the_rest_style]: # workbooks last written by the streaming engine don't carry the named styles
+        if style.name not in wb.named_styles:
+            wb.add_named_style(style)
+    stage = _Stage_Start('style')
+    for target_sheet in sheet_dfs:
+        wb.remove(wb[target_sheet]) # remove the unedited sheet in prep for adding modified ones
+
+        df = _Lookup_Formulas(sheet_dfs[target_sheet]) if plugins_df is not None else sheet_dfs[target_sheet] # openpyxl stores the lookup strings as formulas
+        df.to_excel(writer, sheet_name=target_sheet, index=False, engine='openpyxl') # delicately place new dataframes into the excel spreadsheet and define a new worksheet object to add in-place formatting to
+        ws1 = wb[target_sheet]
+
+        ws1 = _Style_Cols(ws1) # apply baseline alignment and border formats to appropriate columns in both the working sheet and targets sheet
+
+        ws1 = _Style_Rows(ws1) # fine-tune formatting (color, border, font, etc.) based on vulnerability status
+
+        ws1 = _Set_Col_Widths(ws1) # set adequate column widths for all columns in the working sheet as well as the targets sheet
+
+        ws1.freeze_panes = "A2" # freeze top row column names
+
+    if plugins_df is not None: # rewrite the hidden plugin text sheet the lookups point at
+        if PLUGINS_SHEET in wb.sheetnames:
+            wb.remove(wb[PLUGINS_SHEET])
+        ws3 = wb.create_sheet(PLUGINS_SHEET)
+        ws3.append(list(plugins_df.columns))
+        for row in plugins_df.astype(object).where(plugins_df.notna(), None).itertuples(index=False, name=None):
+            ws3.append(row)
+        ws3.sheet_state = 'hidden'
+
+    sheetnames = [s for s in wb.sheetnames if s != 'statuses' or s != 'columns'] # get list of sheets to iterate through so we can apply data validation to Statuses columns
+
+    for s in sheetnames: # apply dropdown menu data validation to the Statuses column in every sheet
+        for sheet in wb.sheetnames:
+            if s == sheet:
+                ws2 = wb[s]
+                ws2.add_data_validation(data_val)
+                data_val.add("T2:T1048576") # specifies the column/rows to apply to; the second value means ALL rows under column O
+
+    _Stage_End(stage, sheets=len(sheet_dfs), rows=sum(len(df) for df in sheet_dfs.values()))
+
+    log.info("Saving and closing "+existing_spreadsheet.split('\\')[-1]+".")
+    # save and close objects, finalizing spreadsheet changes
+    stage = _Stage_Start('save')
+    _Save_WB(wb, existing_spreadsheet)
+    _Stage_End(stage)
+
+# Sorts a Status value into the colour band it's formatted with; returns None for statuses that aren't coloured
+def _Status_Band (status):
+    if status == "Pending Analysis" or status == "Pending Ticket Creation" or status == "Pending Reevaluation":
+        return 'bad'
+    elif status == "Pending Patch Cycle" or status == "Pending Remediation" or status == "On Hold":
+        return 'neutral'
+    elif (isinstance(status, str) and remed_re.match(status)) or status == "Closed":
+        return 'good'
+    elif status == "Risk Ack. Needed" or status == "False Positive Doc. Needed":
+        return 'check'
+    return None
+
+# Builds the xlsxwriter formats used by the streaming engine; cell formats for every (status band, column alignment) pair mirror the openpyxl named styles and row fills,
+# (status band, column alignment, 'date' or 'datetime') adds the number format openpyxl gives dates and times, as ('date',) and ('datetime',) do on their own, and the 'cf' formats are the matching conditional-format styles for STYLE_MODE 'conditional'
+def _Stream_Formats (workbook):
+    bands = {None: dict(),
+             'bad': {'bg_color': '#FFC7CE', 'font_color': '#9C0006'},
+             'neutral': {'bg_color': '#FFEB9C', 'font_color': '#9C5700'},
+             'good': {'bg_color': '#C6EFCE', 'font_color': '#006100'},
+             'check': {'bg_color': '#A5A5A5', 'font_color': '#FFFFFF', 'bold': True, 'border': 6}}
+    formats = dict()
+    for band in bands:
+        for align in ['left', 'center']:
+            spec = {'align': align, 'valign': 'vcenter', 'text_wrap': True, 'border': 1}
+            spec.update(bands[band])
+            formats[(band, align)] = workbook.add_format(spec)
+            formats[(band, align, 'date')] = workbook.add_format(dict(spec, num_format='yyyy-mm-dd'))
+            formats[(band, align, 'datetime')] = workbook.add_format(dict(spec, num_format='yyyy-mm-dd h:mm:ss'))
+        formats[('cf', band)] = workbook.add_format(bands[band] if band is not None else {'border': 1})
+    formats[('date',)] = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+    formats[('datetime',)] = workbook.add_format({'num_format': 'yyyy-mm-dd h:mm:ss'})
+    formats['header'] = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'}) # the same header look pandas gives the reference sheets
+    return formats
+
+# Writes one date or time cell of a streamed sheet with a date format on top of its own, which it would otherwise show as a bare serial number; returns False for any other value
+# key picks the cell's formats: (status band, column alignment) on analysis sheets, () for plain cells
+def _Stream_Date (ws, r, col, value, formats, key):
+    if isinstance(value, datetime.datetime):
+        ws.write_datetime(r, col, value, formats[key + ('date' if value.time() == datetime.time() else 'datetime',)])
+    elif isinstance(value, datetime.date):
+        ws.write_datetime(r, col, value, formats[key + ('date',)])
+    else:
+        return False
+    return True
+
+# Whether a sheet's dataframe is an analysis sheet (it has the finding and Status columns) rather than a sheet of some other kind kept in the workbook
+def _Is_Analysis_DF (df):
+    return 'Vulnerability Name' in df.columns and 'Status' in df.columns
+
+# Streams one analysis dataframe into a constant_memory xlsxwriter worksheet; it carries the same status data validation, freeze panes, column widths and formatting as the openpyxl path
+def _Stream_Analysis_Sheet (workbook, formats, sheet, df, normalized=False):
+    ws = workbook.add_worksheet(sheet)
+    aligns = ['left' if col == 0 or col == 9 else 'center' for col in range(max(len(df.columns), len(col_widths)))] # columns A and J are left-aligned like vuln_name_style
+    for col in range(len(col_widths)):
+        if settings.STYLE_MODE == 'conditional':
+            ws.set_column(col, col, col_widths[col], formats[(None, aligns[col])])
+        else:
+            ws.set_column(col, col, col_widths[col])
+    ws.freeze_panes(1, 0) # freeze top row column names
+    ws.data_validation('T2:T1048576', {'validate': 'list', 'source': '=statuses!$A$2:$A$22'}) # dropdown menu data validation on the Statuses column
+    if settings.STYLE_MODE == 'conditional':
+        rules = [('bad', '=OR($T2="Pending Analysis",$T2="Pending Ticket Creation",$T2="Pending Reevaluation",AND($T2="",$A2<>""))'),
+                 ('neutral', '=OR($T2="Pending Patch Cycle",$T2="Pending Remediation",$T2="On Hold")'),
+                 ('good', '=OR(LEFT($T2,5)="Remed",$T2="Closed")'),
+                 ('check', '=OR($T2="Risk Ack. Needed",$T2="False Positive Doc. Needed")')]
+        for band, criteria in rules:
+            ws.conditional_format('A2:W1048576', {'type': 'formula', 'criteria': criteria, 'format': formats[('cf', band)], 'stop_if_true': True})
+        ws.conditional_format('A2:W1048576', {'type': 'formula', 'criteria': '=$A2<>""', 'format': formats[('cf', None)]})
+
+    df = df.astype(object).where(df.notna(), None)
+    status_col = list(df.columns).index('Status') if 'Status' in df.columns else None
+    if status_col is not None and settings.STYLE_MODE != 'conditional':
+        df.loc[df['Status'].isna() | (df['Status'] == ''), 'Status'] = 'Pending Analysis' # same empty Status fix-up _Set_Row_Format does
+    formula_cols = set()
+    if normalized and 'Plugin ID' in df.columns: # plugin text cells become lookups into the plugins sheet; the rest of the sheet never turns strings into formulas
+        df = _Lookup_Formulas(df)
+        formula_cols = {list(df.columns).index(c) for c in PLUGIN_TEXT_COLUMNS}
+    for col in range(len(df.columns)):
+        ws.write(0, col, df.columns[col], formats[(None, aligns[col])])
+    r = 1
+    for row in df.itertuples(index=False, name=None):
+        if settings.STYLE_MODE == 'conditional':
+            for col in range(len(row)):
+                if col in formula_cols:
+                    ws.write_formula(r, col, row[col])
+                elif row[col] is not None and not _Stream_Date(ws, r, col, row[col], formats, (None, aligns[col])):
+                    ws.write(r, col, row[col])
+        else:
+            band = _Status_Band(row[status_col]) if status_col is not None else None
+            for col in range(len(row)):
+                if col in formula_cols:
+                    ws.write_formula(r, col, row[col], formats[(band, aligns[col])])
+                elif not _Stream_Date(ws, r, col, row[col], formats, (band, aligns[col])):
+                    ws.write(r, col, row[col], formats[(band, aligns[col])])
+        r+=1
+    return ws
+
+# Streams a reference sheet ('statuses' or 'columns'), or any sheet that isn't an analysis sheet, into an xlsxwriter worksheet; the reference sheets' formatting is applied afterward by _Format_Ref_Sheets
+def _Stream_Ref_Sheet (workbook, formats, sheet, df):
+    ws = workbook.add_worksheet(sheet)
+    df = df.astype(object).where(df.notna(), None)
+    for col in range(len(df.columns)):
+        ws.write(0, col, df.columns[col], formats['header'])
+    r = 1
+    for row in df.itertuples(index=False, name=None):
+        for col in range(len(row)):
+            if not _Stream_Date(ws, r, col, row[col], formats, ()):
+                ws.write(r, col, row[col])
+        r+=1
+    return ws
+
+# Streaming output engine: writes every sheet straight to a new xlsx row by row through xlsxwriter's constant_memory mode, then swaps it into place
+# sheet_dfs holds the sheets being rewritten; every other sheet of the source workbook is streamed across from it one at a time, in the original sheet order
+# With a plugins_df the workbook is written in the normalized layout (a hidden plugins sheet plus lookup formulas); without one any plugins sheet in the source is dropped
+def _Stream_WB (spreadsheet, sheet_dfs, source, plugins_df=None):
+    log.info("Streaming changes into "+path.basename(spreadsheet)+"...")
+    stage = _Stage_Start('save') # styling happens row by row as the sheets are written, so streaming is a single stage
+    src = load_workbook(source, read_only=True)
+    tmp = spreadsheet+'.tmp'
+    workbook = xlsxwriter.Workbook(tmp, {'constant_memory': True, # every row is flushed to disk as soon as the next one starts
+                                         'strings_to_formulas': False, # cell text is data; never let it turn into formulas, links or numbers
+                                         'strings_to_urls': False,
+                                         'strings_to_numbers': False})
+    formats = _Stream_Formats(workbook)
+    order = [s for s in src.sheetnames if s != PLUGINS_SHEET] + [s for s in sheet_dfs if s not in src.sheetnames]
+    ref_sheets = dict()
+    for sheet in order:
+        if sheet in sheet_dfs:
+            df = sheet_dfs[sheet]
+        else:
+            df = _Sheet_DF(src[sheet])
+        if sheet == 'statuses' or sheet == 'columns':
+            ref_sheets[sheet] = _Stream_Ref_Sheet(workbook, formats, sheet, df)
+        elif sheet in sheet_dfs or _Is_Analysis_DF(df):
+            _Stream_Analysis_Sheet(workbook, formats, sheet, df, plugins_df is not None)
+        else: # any other sheet is copied across as it is, without the analysis sheets' widths, status dropdown or colour bands
+            _Stream_Ref_Sheet(workbook, formats, sheet, df)
+        del df
+    if plugins_df is not None:
+        _Stream_Ref_Sheet(workbook, formats, PLUGINS_SHEET, plugins_df).hide()
+    if 'statuses' in ref_sheets and 'columns' in ref_sheets:
+        _Format_Ref_Sheets(workbook, ref_sheets['statuses'], ref_sheets['columns'])
+    src.close()
+    log.info("Saving and closing "+path.basename(spreadsheet)+".")
+    workbook.close()
+    replace(tmp, spreadsheet)
+    _Stage_End(stage, sheets=len(sheet_dfs), rows=sum(len(df) for df in sheet_dfs.values()))
+
+# Normalized layout: a hidden 'plugins' sheet holds each plugin's Synopsis and Solution once, keyed by Plugin ID, and the finding sheets look the text up with a formula instead of repeating it on every row
+# A workbook is in the normalized layout when it has a 'plugins' sheet; writers are handed its plugins_df, and a None plugins_df means the flat layout
+def _Load_Plugins (spreadsheet):
+    if PLUGINS_SHEET not in _Workbook_Sheets(spreadsheet):
+        return None
+    wb = load_workbook(spreadsheet, read_only=True)
+    plugins_df = _Sheet_DF(wb[PLUGINS_SHEET]) if wb[PLUGINS_SHEET].max_row else pd.DataFrame()
+    wb.close()
+    plugins_df = plugins_df.reindex(columns=['Plugin ID'] + PLUGIN_TEXT_COLUMNS)
+    plugins_df['Plugin ID'] = plugins_df['Plugin ID'].astype(str) # the sheet gives back numbers; rows are matched on the text form
+    return plugins_df
+
+# True for cells that hold real plugin text rather than a lookup formula or nothing
+def _Is_Plugin_Text (col):
+    return col.map(lambda v: isinstance(v, str) and not v.startswith('='))
+
+# Adds the plugin text carried by a dataframe's rows to plugins_df; the newest text for a plugin wins
+def _Plugins_Merge (plugins_df, df):
+    has_text = _Is_Plugin_Text(df['Synopsis'].astype(object)) | _Is_Plugin_Text(df['Solution'].astype(object))
+    new_df = df.loc[has_text, ['Plugin ID'] + PLUGIN_TEXT_COLUMNS].astype(object)
+    new_df['Plugin ID'] = new_df['Plugin ID'].astype(str)
+    plugins_df = pd.concat([plugins_df, new_df], ignore_index=True, sort=False)
+    return plugins_df.drop_duplicates('Plugin ID', keep='last').reset_index(drop=True)
+
+# Puts the plugin text back into rows that only reference it, for reports and for converting to the flat layout
+def _Plugins_Fill (df, plugins_df):
+    df = df.astype({c: object for c in PLUGIN_TEXT_COLUMNS})
+    lookup = plugins_df.astype(object).assign(**{'Plugin ID': plugins_df['Plugin ID'].astype(str)}).set_index('Plugin ID')
+    ids = df['Plugin ID'].astype(str)
+    for col in PLUGIN_TEXT_COLUMNS:
+        missing = ~_Is_Plugin_Text(df[col])
+        df.loc[missing, col] = ids[missing].map(lookup[col])
+    return df
+
+# The lookup formula for one plugin text cell; row is the Excel row number
+def _Lookup_Formula (df, col, row):
+    return '=IFERROR(VLOOKUP($%s%d,%s!$A:$C,%d,FALSE),"")' % (get_column_letter(list(df.columns).index('Plugin ID')+1), row, PLUGINS_SHEET, PLUGIN_TEXT_COLUMNS.index(col)+2)
+
+# Replaces a sheet's plugin text with lookup formulas for the rows as they'll be written
+def _Lookup_Formulas (df):
+    df = df.astype({c: object for c in PLUGIN_TEXT_COLUMNS})
+    for col in PLUGIN_TEXT_COLUMNS:
+        df[col] = [_Lookup_Formula(df, col, r) for r in range(2, len(df)+2)]
+    return df
+
+# Reads a worksheet into a dataframe, using its first row as the column names
+def _Sheet_DF (ws):
+    return _Rows_DF(ws.values)
+
+# Builds a sheet's dataframe from its rows of cell values, header row first; a worker handed a sheet's rows builds its dataframe with this
+def _Rows_DF (rows):
+    data = iter(rows) # for defining dataframe contents
+    columns = next(data)[0:] # for defining dataframe column names
+    df = pd.DataFrame(data, columns=columns)
+    df.dropna(axis=0, how='all', inplace=True) # drop null rows and clear the index away totally
+    return df
@@ -0,0 +1,48 @@
+# Shared fixtures: the package is imported from the checkout, and small .nessus exports are written on the fly
+import sys
+from os import path
+from xml.sax.saxutils import escape
+import pandas as pd
+import pytest
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+SHEET_COLUMNS = ['Vulnerability Name', 'Plugin ID', 'Target', 'Device Name', 'MAC(s)', 'OS', 'Port', 'Service', 'Synopsis', 'Output',
+                 'Last Scanned', 'Analysis Date', 'Analyst', 'Severity', 'Risk', 'Tier', 'Solution', 'Notes', 'Ticket #', 'Status',
+                 'Vulnerability Details', 'Scanner Config?', 'Robot Note'] # an analysis sheet's columns, as a fresh workbook lays them out
+
+# Builds the XML of a .nessus export; reports is a list of (scan name, hosts) and each host a dict with name, macs, start, and items as (pluginID, severity) pairs
+def _Nessus_XML (reports):
+    out = ['<?xml version="1.0" ?>', '<NessusClientData_v2>']
+    for scan_name, hosts in reports:
+        out.append('<Report name="%s">' % escape(scan_name))
+        for host in hosts:
+            out.append('<ReportHost name="%s"><HostProperties>' % escape(host['name']))
+            if host.get('macs'):
+                out.append('<tag name="mac-address">%s</tag>' % '\n'.join(host['macs']))
+            out.append('<tag name="host-ip">%s</tag>' % escape(host['name']))
+            out.append('<tag name="operating-system">%s</tag>' % host.get('os', 'Linux'))
+            out.append('<tag name="HOST_START">%s</tag>' % host.get('start', 'Tue Jan 05 08:00:00 2021'))
+            out.append('</HostProperties>')
+            for plugin, severity in host.get('items', []):
+                out.append('<ReportItem port="0" svc_name="general" protocol="tcp" severity="%s" pluginID="%s" pluginName="Plugin %s">' % (severity, plugin, plugin))
+                out.append('<synopsis>Synopsis %s</synopsis><solution>Solution %s</solution><plugin_output>Output %s on %s</plugin_output>' % (plugin, plugin, plugin, escape(host['name'])))
+                out.append('</ReportItem>')
+            out.append('</ReportHost>')
+        out.append('</Report>')
+    out.append('</NessusClientData_v2>')
+    return '\n'.join(out)
+
+# Writes .nessus exports into the test's temporary directory: nessus_file('a.nessus', [(scan name, hosts), ...]) returns the file's path
+@pytest.fixture
+def nessus_file (tmp_path):
+    def write (name, reports):
+        p = tmp_path / name
+        p.write_text(_Nessus_XML(reports))
+        return str(p)
+    return write
+
+# An empty analysis sheet's dataframe
+@pytest.fixture
+def empty_sheet ():
+    return pd.DataFrame(columns=SHEET_COLUMNS, dtype=object)
@@ -0,0 +1,17 @@
+# Backups: a hardlinked backup is aged on its stamp file, never by touching the inode it shares with the live workbook
+import os
+from nessus_vuln_analysis import settings
+from nessus_vuln_analysis.backup import _Backup, _Backup_Wait
+
+def test_hardlink_backup_leaves_workbook_mtime_alone (tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'BACKUP_MODE', 'hardlink')
+    monkeypatch.setattr(settings, 'BACKUP_DAYS', 30)
+    workbook = tmp_path / 'wb.xlsx'
+    workbook.write_bytes(b'workbook')
+    os.utime(workbook, (1e9, 1e9)) # last saved long before the retention window
+    for _ in range(2): # the second run finds the identical backup and only marks it as reused
+        _Backup_Wait(_Backup(str(workbook), ask=False))
+    assert os.path.getmtime(workbook) == 1e9
+    backups = [f for f in os.listdir(tmp_path) if f.endswith('.bak')]
+    assert len(backups) == 1 # taken, not pruned as 'older than 30 days' on the workbook's old mtime
+    assert os.path.isfile(tmp_path / (backups[0]+'.seen'))
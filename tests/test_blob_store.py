@@ -0,0 +1,25 @@
+# Blob store: parse workers offloading outputs into one store don't hold its write lock for a whole report
+import sqlite3
+from nessus_vuln_analysis import nessus
+from nessus_vuln_analysis.nessus import _Parse_Reports
+from nessus_vuln_analysis.settings import blob_re
+from nessus_vuln_analysis.store import _Blob_Connect, _Blob_Get
+
+def _Hosts (prefix, count):
+    return [{'name': '10.%d.0.%d' % (prefix, h), 'macs': ['00:50:56:%02x:00:%02x' % (prefix, h)], 'items': [(str(1000 + i), 3) for i in range(40)]} for h in range(count)]
+
+def test_parallel_workers_share_the_blob_store (nessus_file, tmp_path, monkeypatch):
+    store = str(tmp_path / 'wb.blobs.sqlite')
+    def short_timeout (blob_path): # a busy timeout far shorter than any one report takes to parse
+        con = _Blob_Connect(blob_path)
+        con.execute('PRAGMA busy_timeout = 1000')
+        return con
+    monkeypatch.setattr(nessus, '_Blob_Connect', short_timeout)
+    reports = [nessus_file('s%d.nessus' % i, [('ACME Scan', _Hosts(i, 240))]) for i in range(4)]
+    parsed = _Parse_Reports(reports, {'blob_threshold': 5, 'blob_store': store}, 4)
+    outputs = [v['plugin_output'] for p in parsed for h in p[1].values() for v in h['vulns'].values()]
+    assert len(outputs) == 4 * 240 * 40
+    con = sqlite3.connect(store)
+    assert con.execute('SELECT COUNT(*) FROM blobs').fetchone()[0] == len(outputs)
+    key = blob_re.search(outputs[0]).group(1)
+    assert _Blob_Get(con, key).startswith('Output 1000 on 10.0.0.0')
@@ -0,0 +1,23 @@
+# Path and sheet checks raise InputError on the first bad value, with nothing logged for a library caller to see
+import logging
+import pytest
+from nessus_vuln_analysis.checks import _Check_Path, _Check_Sheet
+from nessus_vuln_analysis.errors import InputError
+
+def test_bad_path_raises_once (tmp_path, caplog):
+    with caplog.at_level(logging.DEBUG, logger='nessus_vuln_analysis'):
+        with pytest.raises(InputError, match='not a valid nessus file'):
+            _Check_Path(str(tmp_path / 'missing.nessus'), 'n')
+    assert caplog.records == []
+
+def test_new_spreadsheet_gets_its_extension (tmp_path):
+    assert _Check_Path(str(tmp_path / 'new'), 'v') == str(tmp_path / 'new.xlsx')
+    with pytest.raises(InputError):
+        _Check_Path(str(tmp_path / 'nowhere' / 'new.xlsx'), 'v')
+
+def test_sheet_checks ():
+    assert _Check_Sheet('ACME', ['ACME', 'statuses']) == 'ACME'
+    with pytest.raises(InputError, match='cannot be modified'):
+        _Check_Sheet('statuses', ['ACME', 'statuses'])
+    with pytest.raises(InputError, match='no sheet named BETA'):
+        _Check_Sheet('BETA', ['ACME', 'statuses'])
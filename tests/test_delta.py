@@ -0,0 +1,30 @@
+# Scan-to-scan deltas between two .nessus exports and between a sheet's open rows and a scan
+import nessus_vuln_analysis as nva
+
+OLD = [{'name': '10.0.0.1', 'macs': ['00:50:56:00:00:01'], 'items': [('1001', 3), ('1002', 4)]},
+       {'name': '10.0.0.2', 'macs': ['00:50:56:00:00:02'], 'items': [('1001', 3)]}]
+NEW = [{'name': '10.0.0.1', 'macs': ['00:50:56:00:00:01'], 'items': [('1001', 3), ('1003', 4), ('1004', 2)]},
+       {'name': '10.0.0.2', 'macs': ['00:50:56:00:00:02'], 'items': [('1001', 3), ('1003', 3)]}]
+
+def _Changes (delta_df):
+    return sorted(zip(delta_df['Change'].astype(str), delta_df['Plugin ID'].astype(str), delta_df['MAC(s)']))
+
+def test_delta_between_scans (nessus_file):
+    old = nessus_file('old.nessus', [('ACME Scan', OLD)])
+    new = nessus_file('new.nessus', [('ACME Scan', NEW)])
+    delta_df, host_df, plugin_df = nva.delta(old, new, cache=False)
+    assert _Changes(delta_df) == [('Fixed', '1002', '00:50:56:00:00:01'),
+                                  ('New', '1003', '00:50:56:00:00:01'), ('New', '1003', '00:50:56:00:00:02'), # 1004 is below the default minimum severity
+                                  ('Persisting', '1001', '00:50:56:00:00:01'), ('Persisting', '1001', '00:50:56:00:00:02')]
+    hosts = host_df.set_index('Host')[['New', 'Fixed', 'Persisting', 'Net']]
+    assert hosts.loc['00:50:56:00:00:01'].tolist() == [1, 1, 1, 0]
+    assert hosts.loc['00:50:56:00:00:02'].tolist() == [1, 0, 1, 1]
+    assert plugin_df['Vulnerability Name'].tolist()[0] == 'Plugin 1003' # the busiest plugin comes first
+    assert plugin_df.set_index('Vulnerability Name').loc['Plugin 1003', 'New'] == 2
+
+def test_delta_against_the_open_rows_of_a_sheet (nessus_file, tmp_path):
+    spreadsheet = str(tmp_path / 'acme.xlsx')
+    nva.create(spreadsheet, ['ACME'])
+    nva.import_reports(spreadsheet, [nessus_file('old.nessus', [('ACME Scan', OLD)])], cache=False, history=False)
+    delta_df = nva.delta('ACME', nessus_file('new.nessus', [('ACME Scan', NEW)]), spreadsheet=spreadsheet, cache=False)[0]
+    assert delta_df['Change'].value_counts()[['New', 'Fixed', 'Persisting']].tolist() == [2, 1, 2]
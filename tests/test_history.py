@@ -0,0 +1,36 @@
+# The finding history queries over three monthly imports: one finding is remediated and comes back, the other stays open throughout
+import pytest
+import nessus_vuln_analysis as nva
+
+pytest.importorskip('pyarrow')
+
+MAC = ['00:50:56:00:00:01']
+SCANS = [('jan.nessus', 'Tue Jan 05 08:00:00 2021', [('1001', 3), ('1002', 4)]),
+         ('feb.nessus', 'Thu Feb 04 08:00:00 2021', [('1001', 3)]), # 1002 is gone from a credentialed check, so it's remediated after 30 days
+         ('mar.nessus', 'Sat Mar 06 08:00:00 2021', [('1001', 3), ('1002', 4)])] # ... and comes back
+
+@pytest.fixture
+def history_workbook (nessus_file, tmp_path):
+    spreadsheet = str(tmp_path / 'acme.xlsx')
+    nva.create(spreadsheet, ['ACME'])
+    for name, start, items in SCANS:
+        nva.import_reports(spreadsheet, [nessus_file(name, [('ACME Scan', [{'name': '10.0.0.1', 'macs': MAC, 'start': start, 'items': items}])])], cache=False)
+    return spreadsheet
+
+def test_mttr (history_workbook):
+    mttr = nva.query_history(history_workbook, 'mttr')['mttr']
+    assert mttr[['Sheet', 'Month', 'Severity', 'Remediated', 'Mean_Days', 'Max_Days']].values.tolist() == [['ACME', '2021-02', '4', 1, 30.0, 30.0]]
+
+def test_age (history_workbook):
+    age = nva.query_history(history_workbook, 'age')['age'].set_index('Severity')
+    assert age.loc['3', '31-60'] == 1 # open since January, 60 days by the March scan
+    assert age.loc['4', '0-30'] == 1 # its age starts over when it came back
+    assert age['Total'].sum() == 2
+
+def test_recurrence (history_workbook):
+    recurrence = nva.query_history(history_workbook, 'recurrence')['recurrence']
+    assert recurrence[['Plugin ID', 'Findings', 'Remediations', 'Recurrences', 'Findings_Recurred', 'Recurrence_Rate']].values.tolist() == [['1002', 1, 1, 1, 1, 1.0]]
+
+def test_since_and_until (history_workbook):
+    assert len(nva.query_history(history_workbook, 'mttr', since='2021-03')['mttr']) == 0
+    assert len(nva.query_history(history_workbook, 'mttr', until='2021-02')['mttr']) == 1
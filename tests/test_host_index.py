@@ -0,0 +1,28 @@
+# Host identity: hosts sharing a MAC are merged, and the merged host looks the same whatever order its ReportHosts came in
+from nessus_vuln_analysis.nessus import _Parse_Nessus
+
+HOST_A = {'name': '10.0.0.1', 'macs': ['00:50:56:00:00:01'], 'items': [('1001', 3)]}
+HOST_B = {'name': '10.0.0.2', 'macs': ['00:50:56:00:00:01', '00:50:56:00:00:02'], 'items': [('1002', 4)]}
+HOST_C = {'name': '10.0.0.3', 'macs': ['00:50:56:00:00:02', '00:50:56:00:00:03'], 'items': [('1003', 3)]}
+HOST_D = {'name': '10.0.0.9', 'macs': ['00:50:56:00:00:09'], 'items': [('1001', 3)]}
+
+def _Findings (report_dict):
+    return sorted((report_dict[h]['mac-address'], p) for h in report_dict for p in report_dict[h]['vulns'])
+
+def test_hosts_sharing_a_mac_are_merged (nessus_file):
+    report_dict, client, host_index = _Parse_Nessus(nessus_file('a.nessus', [('ACME Weekly Scan', [HOST_A, HOST_B, HOST_D])]))[0]
+    assert client == 'ACME'
+    assert len(report_dict) == 2
+    assert _Findings(report_dict) == [('00:50:56:00:00:01\n00:50:56:00:00:02', '1001'), ('00:50:56:00:00:01\n00:50:56:00:00:02', '1002'), ('00:50:56:00:00:09', '1001')]
+
+def test_merged_macs_do_not_depend_on_host_order (nessus_file):
+    forward = _Parse_Nessus(nessus_file('a.nessus', [('ACME Scan', [HOST_A, HOST_B, HOST_C])]))[0]
+    backward = _Parse_Nessus(nessus_file('b.nessus', [('ACME Scan', [HOST_C, HOST_B, HOST_A])]))[0]
+    assert _Findings(forward[0]) == _Findings(backward[0])
+    assert list(forward[2]['mac_strings']) == ['00:50:56:00:00:01\n00:50:56:00:00:02\n00:50:56:00:00:03']
+    assert list(backward[2]['mac_strings']) == list(forward[2]['mac_strings'])
+
+def test_each_client_gets_its_own_result (nessus_file):
+    parsed = _Parse_Nessus(nessus_file('m.nessus', [('ACME Scan', [HOST_A]), ('BETA Scan', [HOST_D]), ('ACME Rescan', [HOST_B])]))
+    assert [p[1] for p in parsed] == ['ACME', 'BETA']
+    assert len(parsed[0][0]) == 1 and len(parsed[1][0]) == 1
@@ -0,0 +1,28 @@
+# Run metrics keep the stages that ran in worker processes, not only the parent's
+import json
+import pytest
+import nessus_vuln_analysis as nva
+from nessus_vuln_analysis.metrics import _Metrics_Finish, _Metrics_Start
+
+HOSTS = {'ACME': [{'name': '10.0.0.1', 'macs': ['00:50:56:00:00:01'], 'items': [('1001', 3)]}],
+         'BETA': [{'name': '10.0.1.1', 'macs': ['00:50:56:00:01:01'], 'items': [('2001', 4)]}]}
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_worker_stages_are_recorded (nessus_file, tmp_path, workers):
+    spreadsheet = str(tmp_path / 'multi.xlsx')
+    nva.create(spreadsheet, list(HOSTS))
+    report = nessus_file('multi.nessus', [(client+' Scan', HOSTS[client]) for client in HOSTS])
+    run_opts = {'metrics': str(tmp_path / 'metrics.json'), 'profile': None}
+    _Metrics_Start(2, run_opts)
+    try:
+        nva.import_reports(spreadsheet, [report], workers=workers, cache=False, history=False)
+    finally:
+        _Metrics_Finish(run_opts, None)
+    with open(run_opts['metrics']) as f:
+        metrics = json.load(f)
+    for name in ['build', 'reconcile', 'add-new']: # run once per sheet, in the workers when there are several
+        assert metrics['totals'][name]['calls'] == 2
+        assert all(s.get('worker', False) == (workers > 1) for s in metrics['stages'] if s['stage'] == name)
+    assert metrics['totals']['reconcile']['counts']['rows'] == 0 # both sheets started out empty
+    assert metrics['totals']['add-new']['counts']['rows'] == 2
+    assert all(s['option'] == 2 for s in metrics['stages'])
@@ -0,0 +1,27 @@
+# Migration into a new workbook keeps every sheet's open rows and leaves the remediated ones behind, whether the sheets are filtered here or in worker processes
+import pytest
+from openpyxl import load_workbook
+import nessus_vuln_analysis as nva
+
+HOSTS = {'ACME': [{'name': '10.0.0.1', 'macs': ['00:50:56:00:00:01'], 'items': [('1001', 3), ('1002', 4)]}],
+         'BETA': [{'name': '10.0.1.1', 'macs': ['00:50:56:00:01:01'], 'items': [('2001', 4), ('2002', 3)]}]}
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_remediated_rows_are_left_behind (nessus_file, tmp_path, workers):
+    spreadsheet = str(tmp_path / 'acme.xlsx')
+    nva.create(spreadsheet, list(HOSTS))
+    nva.import_reports(spreadsheet, [nessus_file('jan.nessus', [(client+' Scan', HOSTS[client]) for client in HOSTS])], workers=1, cache=False, history=False)
+    wb = load_workbook(spreadsheet)
+    for client, plugin in [('ACME', '1002'), ('BETA', '2001')]:
+        ws = wb[client]
+        header = [c.value for c in ws[1]]
+        for row in ws.iter_rows(min_row=2):
+            if str(row[header.index('Plugin ID')].value) == plugin:
+                row[header.index('Status')].value = 'Remediated - Jan'
+    wb.save(spreadsheet)
+    new_spreadsheet = str(tmp_path / 'acme 2021.xlsx')
+    nva.migrate(spreadsheet, new_spreadsheet, workers=workers)
+    sheet_dfs = nva.load(new_spreadsheet)
+    assert sorted(sheet_dfs) == ['ACME', 'BETA']
+    assert sheet_dfs['ACME']['Plugin ID'].astype(str).tolist() == ['1001']
+    assert sheet_dfs['BETA']['Plugin ID'].astype(str).tolist() == ['2002']
@@ -0,0 +1,14 @@
+# Command line option checks: bad values raise InputError before any command runs
+import pytest
+from nessus_vuln_analysis.cli import _Cycle_Opts
+from nessus_vuln_analysis.errors import InputError
+from nessus_vuln_analysis.settings import BLOB_PREVIEW
+
+def test_blob_threshold_must_exceed_the_preview ():
+    with pytest.raises(InputError, match='--blob-threshold must be at least'):
+        _Cycle_Opts([('--blob-threshold', str(BLOB_PREVIEW))])
+    assert _Cycle_Opts([('--blob-threshold', str(BLOB_PREVIEW + 1))])[4]['blob_threshold'] == BLOB_PREVIEW + 1
+
+def test_bad_numbers_are_reported ():
+    with pytest.raises(InputError, match='takes a whole number'):
+        _Cycle_Opts([('--workers', 'many')])
@@ -0,0 +1,23 @@
+# Imports spanning several sheets reconcile them in worker processes; their progress messages reach the parent's logging, one sheet at a time
+import logging
+import pytest
+import nessus_vuln_analysis as nva
+
+HOSTS = {'ACME': [{'name': '10.0.0.1', 'macs': ['00:50:56:00:00:01'], 'items': [('1001', 3)]}],
+         'BETA': [{'name': '10.0.1.1', 'macs': ['00:50:56:00:01:01'], 'items': [('2001', 4)]}]}
+
+@pytest.mark.parametrize('engine', ['openpyxl', 'stream'])
+def test_worker_messages_are_grouped_by_sheet (nessus_file, tmp_path, caplog, engine):
+    spreadsheet = str(tmp_path / 'multi.xlsx')
+    nva.create(spreadsheet, list(HOSTS))
+    report = nessus_file('multi.nessus', [(client+' Scan', HOSTS[client]) for client in HOSTS])
+    with caplog.at_level(logging.INFO, logger='nessus_vuln_analysis'):
+        sheet_dfs = nva.import_reports(spreadsheet, [report], workers=2, cache=False, engine=engine)
+    assert sorted(sheet_dfs) == ['ACME', 'BETA']
+    assert [len(sheet_dfs[client]) for client in HOSTS] == [1, 1]
+    messages = [r.getMessage() for r in caplog.records]
+    start = messages.index("Reconciling 2 sheets in parallel...")
+    assert [m for m in messages[:start] if m.startswith("Initializing")] == ["Initializing and preparing vulnerability dataframes for ACME...",
+                                                                             "Initializing and preparing vulnerability dataframes for BETA..."] # the sheets are read once, here, and handed to the workers
+    worker = [m.split()[0] for m in messages[start+1:] if m.startswith(("Initializing", "Building", "Modifying"))]
+    assert worker == ["Building", "Modifying"] * 2 # every message a worker made came back, and each sheet's stay together
@@ -0,0 +1,35 @@
+# The parse cache hands back exactly what the parser produced, from Feather and JSON files alone
+import os
+import pytest
+from nessus_vuln_analysis import settings
+from nessus_vuln_analysis.nessus import _Parse_Reports
+
+pytest.importorskip('pyarrow')
+
+HOSTS = [{'name': '10.0.0.1', 'macs': ['00:50:56:00:00:01', '00:50:56:00:00:02'], 'items': [('1001', 3), ('1002', 4), ('21745', 0)]},
+         {'name': '10.0.0.2', 'macs': ['00:50:56:00:00:02'], 'items': [('1003', 3)]},
+         {'name': '10.0.0.3', 'items': [('1001', 3)]}]
+
+def test_cache_round_trip (nessus_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'CACHE_DIR', str(tmp_path / 'cache'))
+    report = nessus_file('m.nessus', [('ACME Scan', HOSTS), ('BETA Scan', HOSTS[1:]), ('GAMMA Scan', [])])
+    parse_opts = {'min_severity': 0}
+    cache_opts = {'enabled': True, 'max_bytes': 1 << 30}
+    parsed = _Parse_Reports([report], parse_opts, 1, cache_opts)
+    cached = _Parse_Reports([report], parse_opts, 1, cache_opts)
+    assert [p[2] for p in cached] == ['ACME', 'BETA', 'GAMMA']
+    assert cached == parsed
+    entries = os.listdir(settings.CACHE_DIR)
+    assert not any(f.endswith('.pkl') or f.endswith('.tmp') for f in entries)
+    entry = [e for e in entries if e.endswith('.parsed')][0]
+    assert sorted(os.listdir(os.path.join(settings.CACHE_DIR, entry))) == ['0.findings.feather', '0.hosts.feather', '1.findings.feather', '1.hosts.feather', '2.findings.feather', '2.hosts.feather', 'scans.json']
+
+def test_damaged_entry_is_parsed_again (nessus_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'CACHE_DIR', str(tmp_path / 'cache'))
+    report = nessus_file('a.nessus', [('ACME Scan', HOSTS)])
+    cache_opts = {'enabled': True, 'max_bytes': 1 << 30}
+    parsed = _Parse_Reports([report], {}, 1, cache_opts)
+    entry = [e for e in os.listdir(settings.CACHE_DIR) if e.endswith('.parsed')][0]
+    with open(os.path.join(settings.CACHE_DIR, entry, '0.findings.feather'), 'wb') as f:
+        f.write(b'not feather')
+    assert _Parse_Reports([report], {}, 1, cache_opts) == parsed
@@ -0,0 +1,22 @@
+# Reconciling reports against a sheet: rows are matched to their host even when the host's NIC set has changed since the row was written
+from nessus_vuln_analysis.nessus import _Parse_Nessus
+from nessus_vuln_analysis.analysis import _Apply_Reports
+from nessus_vuln_analysis.rules import STATUS_RULES
+
+OLD_NIC = {'name': '10.0.0.1', 'macs': ['00:50:56:00:00:01'], 'items': [('1001', 3), ('1002', 4)], 'start': 'Tue Jan 05 08:00:00 2021'}
+BOTH_NICS = {'name': '10.0.0.1', 'macs': ['00:50:56:00:00:01', '00:50:56:00:00:02'], 'items': [('1001', 3)], 'start': 'Tue Feb 02 08:00:00 2021'}
+
+def _Parses (nessus_file, name, hosts):
+    p = nessus_file(name, [('ACME Scan', hosts)])
+    return [(p,) + tuple(scan) for scan in _Parse_Nessus(p)]
+
+def test_overlapping_mac_cell_resolves_to_its_host (nessus_file, empty_sheet):
+    sheet_df = _Apply_Reports(empty_sheet, _Parses(nessus_file, 'jan.nessus', [OLD_NIC]), None, STATUS_RULES)[0]
+    assert sorted(sheet_df['MAC(s)']) == ['00:50:56:00:00:01', '00:50:56:00:00:01']
+    sheet_df = _Apply_Reports(sheet_df, _Parses(nessus_file, 'jan.nessus', [OLD_NIC]), None, STATUS_RULES)[0] # statuses settle in as Pending Analysis
+    sheet_df = _Apply_Reports(sheet_df, _Parses(nessus_file, 'feb.nessus', [BOTH_NICS]), None, STATUS_RULES)[0]
+    assert len(sheet_df) == 2 # the host's findings weren't added a second time under its new MAC string
+    assert set(sheet_df['MAC(s)']) == {'00:50:56:00:00:01\n00:50:56:00:00:02'}
+    statuses = dict(zip(sheet_df['Plugin ID'], sheet_df['Status']))
+    assert statuses['1001'] == 'Pending Analysis'
+    assert statuses['1002'].startswith('Remediated - ')
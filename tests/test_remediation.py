@@ -0,0 +1,30 @@
+# Remediation reports: detail sheet names that Excel will take, and selections that match nothing
+import zipfile
+import nessus_vuln_analysis as nva
+from nessus_vuln_analysis.checks import _Workbook_Sheets
+from nessus_vuln_analysis.remediation import _Remed_Frames, _Remed_Sheet_Names, _Write_Remed_Report
+
+PLANT = 'Contoso Manufacturing Plant 1' # 29 characters: its detail sheet is cut to '<PLANT> R', which is also the whole name of the second sheet
+SHEETS = [PLANT, PLANT+' R']
+
+def test_truncated_sheet_names_are_made_unique ():
+    names = _Remed_Sheet_Names(SHEETS + ['ACME'])
+    assert list(names.values()) == [PLANT+' R', PLANT+'~2', 'ACME Remed. Report']
+    assert all(len(n) <= 31 for n in names.values())
+
+def test_report_with_colliding_names_is_written (tmp_path):
+    spreadsheet = str(tmp_path / 'wb.xlsx')
+    nva.create(spreadsheet, SHEETS)
+    sheet_dfs, remed_df = _Remed_Frames(spreadsheet, SHEETS, [1])
+    fn = str(tmp_path / 'report.xlsx')
+    _Write_Remed_Report(fn, sheet_dfs, remed_df, 'Jan')
+    assert zipfile.is_zipfile(fn)
+    assert _Workbook_Sheets(fn) == ['Summary', PLANT+' R', PLANT+'~2']
+
+def test_nothing_to_report (tmp_path):
+    spreadsheet = str(tmp_path / 'wb.xlsx')
+    nva.create(spreadsheet, ['ACME'])
+    output = str(tmp_path / 'report.xlsx')
+    assert len(nva.report(spreadsheet, 'all', output=output)) == 0
+    assert not (tmp_path / 'report.xlsx').exists()
+    assert len(_Remed_Frames(spreadsheet, [], [1])[1]) == 0 # no sheets at all
@@ -0,0 +1,24 @@
+# The columnar report dataframe against the per-cell loop it replaced, which the report_df benchmark keeps as its reference
+import sys
+from os import path
+import pandas as pd
+from nessus_vuln_analysis.analysis import _Build_Report_DF
+
+sys.path.insert(0, path.join(path.dirname(path.dirname(path.abspath(__file__))), 'benchmarks'))
+from bench_report_df import _Legacy_Build_Report_DF, _Synthetic_Report
+
+def test_matches_the_legacy_loop (empty_sheet):
+    report_dict = _Synthetic_Report(420) # 21 hosts, so every mix of missing rDNS, NetBIOS name, MAC and OS comes up
+    report_df = _Build_Report_DF(report_dict, empty_sheet.columns)
+    legacy_df = _Legacy_Build_Report_DF(report_dict, empty_sheet)
+    assert len(report_df) == 420
+    pd.testing.assert_frame_equal(report_df.astype(object), legacy_df.astype(object), check_index_type=False)
+
+def test_only_high_and_critical_findings (empty_sheet):
+    report_dict = _Synthetic_Report(40)
+    for host in report_dict:
+        for v, vuln in enumerate(report_dict[host]['vulns'].values()):
+            vuln['severity'] = str(v % 5) # 0-4, so two in five are kept
+    report_df = _Build_Report_DF(report_dict, empty_sheet.columns)
+    assert sorted(report_df['Severity'].astype(str).unique()) == ['3', '4']
+    pd.testing.assert_frame_equal(report_df.astype(object), _Legacy_Build_Report_DF(report_dict, empty_sheet).astype(object), check_index_type=False)
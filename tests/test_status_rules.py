@@ -0,0 +1,67 @@
+# The built-in status rules against the status changes the original per-row if/elif chains made, for every status, risk and reconciliation outcome
+import datetime
+import itertools
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from nessus_vuln_analysis import settings
+from nessus_vuln_analysis.analysis import _Apply_Status_Rules
+from nessus_vuln_analysis.rules import STATUS_RULES, _Load_Status_Rules
+from nessus_vuln_analysis.errors import InputError
+from nessus_vuln_analysis.settings import _Today
+
+STATUSES = [None, 'Pending Analysis', 'Pending Remediation', 'Pending Ticket Creation', 'Pending Patch Cycle', 'Pending Reevaluation',
+            'Remediated - Jan', 'Risk Accepted', 'False Positive']
+RISKS = [None, 'Low', 'Med', 'High', 'Crit']
+# (seen, seen_no_mac, rescanned): a '???' MAC never resolves to a host, so a row seen without a MAC is never rescanned
+OUTCOMES = [(False, False, False), (False, False, True), (True, False, False), (True, False, True), (False, True, False)]
+
+# The original chains for one row, returning its new (Status, Robot Note); None for a row they left alone
+def _Baseline_Status (status, risk, seen, seen_no_mac, rescanned):
+    if seen_no_mac:
+        return 'Pending Reevaluation', 'A MAC address could not be detected for this device, but it was in a recent scan - please manually determine the status of this vulnerability (delete this note)'
+    if not rescanned:
+        return None
+    if seen:
+        if status == 'Pending Patch Cycle':
+            return 'Pending Reevaluation', 'was pending patch cycle - re-examine vulnerability.'
+        elif status == 'Pending Ticket Creation':
+            if risk in ['Med', 'Low']:
+                return 'Pending Reevaluation', 'was pending ticket creation and med/low risk - time to process it now?'
+            if risk in ['High', 'Crit']:
+                return 'Pending Reevaluation', 'was pending ticket creation and crit/high risk - HANDLE IT THIS CYCLE.'
+        elif status is not None and status.startswith('Remed'):
+            return 'Pending Reevaluation', 'marked remediated but was picked up in last scan - re-examine host.'
+        return None
+    if status in ['Pending Remediation', 'Pending Ticket Creation', 'Pending Analysis', 'Pending Patch Cycle']:
+        return 'Remediated - '+_Today().strftime('%b'), 'was pending, and was not found in the last credentialed check of the host - marked remediated.'
+    return None
+
+def test_rules_match_the_original_status_chains ():
+    cases = list(itertools.product(STATUSES, RISKS, OUTCOMES))
+    sheet_df = pd.DataFrame({'Status': [c[0] for c in cases], 'Risk': [c[1] for c in cases], 'Robot Note': None}, dtype=object)
+    flags = {name: np.array([c[2][i] for c in cases]) for i, name in enumerate(['seen', 'seen_no_mac', 'rescanned'])}
+    _Apply_Status_Rules(sheet_df, STATUS_RULES, flags)
+    for (status, risk, outcome), new_status, note in zip(cases, sheet_df['Status'], sheet_df['Robot Note']):
+        expected = _Baseline_Status(status, risk, *outcome) or (status, None)
+        assert (new_status, note) == expected, (status, risk, outcome)
+
+def test_site_rules_take_precedence ():
+    sheet_df = pd.DataFrame({'Status': ['Pending Patch Cycle', 'Pending Patch Cycle'], 'Risk': ['Low', 'Low'], 'Robot Note': None}, dtype=object)
+    site_rule = {'when': {'seen': True, 'Risk': 'Low'}, 'status': 'Risk Accepted'}
+    _Apply_Status_Rules(sheet_df, [site_rule] + STATUS_RULES, {'seen': np.array([True, True]), 'seen_no_mac': np.array([False, False]), 'rescanned': np.array([True, False])})
+    assert list(sheet_df['Status']) == ['Risk Accepted', 'Risk Accepted']
+    assert list(sheet_df['Robot Note']) == [None, None] # a rule without a note leaves the note alone
+
+def test_remediated_month_is_read_when_the_rules_run (monkeypatch):
+    sheet_df = pd.DataFrame({'Status': ['Pending Analysis'], 'Risk': ['Low'], 'Robot Note': None}, dtype=object)
+    monkeypatch.setattr(settings, '_Today', lambda: datetime.datetime(2031, 7, 1)) # a long-running watcher or library host, months after it started
+    _Apply_Status_Rules(sheet_df, STATUS_RULES, {'seen': np.array([False]), 'seen_no_mac': np.array([False]), 'rescanned': np.array([True])})
+    assert sheet_df['Status'][0] == 'Remediated - Jul'
+
+def test_site_rules_naming_an_unknown_column_are_rejected (tmp_path):
+    rules_path = tmp_path / 'rules.json'
+    rules_path.write_text(json.dumps([{'when': {'Risk': 'Low'}, 'status': 'Risk Accepted'}, {'when': {'Owner': 'IT'}, 'status': 'Pending Analysis'}]))
+    with pytest.raises(InputError, match="Status rule 2: unknown condition 'Owner'"):
+        _Load_Status_Rules(str(rules_path))
@@ -0,0 +1,50 @@
+# The state store: analyst edits made in the workbook still reach the right rows after an import moves them onto their host's current MAC string
+import os
+from openpyxl import load_workbook
+import nessus_vuln_analysis as nva
+from nessus_vuln_analysis.commands import _Store_Command
+from nessus_vuln_analysis.store import _Store_Connect, _Store_Read
+
+OLD_NIC = {'name': '10.0.0.1', 'macs': ['00:50:56:00:00:01'], 'items': [('1001', 3), ('1002', 4)], 'start': 'Tue Jan 05 08:00:00 2021'}
+BOTH_NICS = {'name': '10.0.0.1', 'macs': ['00:50:56:00:00:01', '00:50:56:00:00:02'], 'items': [('1001', 3), ('1002', 4)], 'start': 'Tue Feb 02 08:00:00 2021'}
+
+# Sets one analyst cell of the workbook row for a plugin, the way an analyst would in Excel
+def _Edit (spreadsheet, plugin, column, value):
+    wb = load_workbook(spreadsheet)
+    ws = wb['ACME']
+    header = [c.value for c in ws[1]]
+    for row in ws.iter_rows(min_row=2):
+        if str(row[header.index('Plugin ID')].value) == plugin:
+            row[header.index(column)].value = value
+    wb.save(spreadsheet)
+    os.utime(spreadsheet, (os.path.getatime(spreadsheet), os.path.getmtime(spreadsheet) + 10)) # a later save, even on a coarse clock
+
+def _Store_Rows (spreadsheet):
+    con = _Store_Connect(spreadsheet)
+    df = _Store_Read(con, 'ACME')
+    con.close()
+    return df
+
+def test_sync_after_a_mac_move_keeps_rows_and_edits (nessus_file, tmp_path):
+    spreadsheet = str(tmp_path / 'acme.xlsx')
+    nva.create(spreadsheet, ['ACME'])
+    nva.import_reports(spreadsheet, [nessus_file('jan.nessus', [('ACME Scan', [OLD_NIC])])], store=True, render=True, cache=False, history=False)
+    _Edit(spreadsheet, '1001', 'Notes', 'checked with the owner')
+    nva.import_reports(spreadsheet, [nessus_file('feb.nessus', [('ACME Scan', [BOTH_NICS])])], store=True, cache=False, history=False) # syncs, then moves both rows onto the new MAC string
+    assert set(_Store_Rows(spreadsheet)['MAC(s)']) == {'00:50:56:00:00:01\n00:50:56:00:00:02'}
+
+    _Edit(spreadsheet, '1001', 'Ticket #', 'INC-42') # the workbook hasn't been rendered since, so its rows still show the old MAC
+    _Store_Command(spreadsheet, False)
+    _Store_Command(spreadsheet, False) # a second sync of the same workbook changes nothing
+    df = _Store_Rows(spreadsheet)
+    assert len(df) == 2
+    row = df[df['Plugin ID'] == '1001'].iloc[0]
+    assert (row['Notes'], row['Ticket #']) == ('checked with the owner', 'INC-42')
+
+    (tmp_path / 'Vulnerability Analysis Backups').mkdir() # so rendering doesn't ask where its backup goes
+    _Store_Command(spreadsheet, True) # once rendered, the workbook shows the new MAC string and syncs by it directly
+    _Edit(spreadsheet, '1002', 'Notes', 'after render')
+    _Store_Command(spreadsheet, False)
+    df = _Store_Rows(spreadsheet)
+    assert len(df) == 2
+    assert df[df['Plugin ID'] == '1002'].iloc[0]['Notes'] == 'after render'
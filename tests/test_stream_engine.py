@@ -0,0 +1,32 @@
+# The streaming engine: dates read back from a sheet stay dates, and only analysis sheets get the analysis sheet formatting
+import datetime
+import pytest
+from openpyxl import load_workbook
+import nessus_vuln_analysis as nva
+
+HOSTS = [{'name': '10.0.0.1', 'macs': ['00:50:56:00:00:01'], 'items': [('1001', 3)]}]
+
+@pytest.mark.parametrize('style', ['cells', 'conditional'])
+def test_dates_and_other_sheets (nessus_file, tmp_path, style):
+    spreadsheet = str(tmp_path / 'acme.xlsx')
+    nva.create(spreadsheet, ['ACME'], style=style)
+    report = nessus_file('acme.nessus', [('ACME Scan', HOSTS)])
+    nva.import_reports(spreadsheet, [report], style=style, engine='stream', cache=False, history=False)
+    wb = load_workbook(spreadsheet)
+    wb['ACME']['L2'] = datetime.datetime(2021, 2, 3) # an analyst's Analysis Date
+    notes = wb.create_sheet('Notes')
+    notes.append(['Topic', 'Due'])
+    notes.append(['Patch window', datetime.datetime(2021, 3, 1, 18, 30)])
+    wb.save(spreadsheet)
+
+    nva.import_reports(spreadsheet, [report], style=style, engine='stream', cache=False, history=False)
+    wb = load_workbook(spreadsheet)
+    assert wb['ACME']['L2'].value == datetime.datetime(2021, 2, 3)
+    assert wb['ACME']['L2'].number_format == 'yyyy-mm-dd'
+    assert wb['ACME']['L2'].alignment.horizontal == 'center'
+    assert wb['Notes']['B2'].value == datetime.datetime(2021, 3, 1, 18, 30)
+    assert wb['Notes']['B2'].number_format == 'yyyy-mm-dd h:mm:ss'
+    assert len(wb['ACME'].data_validations.dataValidation) == 1
+    assert len(wb['Notes'].data_validations.dataValidation) == 0 # not an analysis sheet: no status dropdown, colour bands or widths
+    assert len(wb['Notes'].conditional_formatting) == 0
+    assert wb['Notes'].column_dimensions['A'].width != 40
@@ -0,0 +1,19 @@
+# Sheet styling: a workbook saved in either styling mode reloads with the alignment and wrapping every data cell had before
+import pytest
+from openpyxl import load_workbook
+import nessus_vuln_analysis as nva
+
+HOSTS = [{'name': '10.0.0.1', 'macs': ['00:50:56:00:00:01'], 'items': [('1001', 3), ('1002', 4)]}]
+
+@pytest.mark.parametrize('style', ['cells', 'conditional'])
+def test_data_cells_keep_their_alignment (nessus_file, tmp_path, style):
+    spreadsheet = str(tmp_path / 'acme.xlsx')
+    nva.create(spreadsheet, ['ACME'], style=style)
+    nva.import_reports(spreadsheet, [nessus_file('acme.nessus', [('ACME Scan', HOSTS)])], style=style, engine='openpyxl', cache=False, history=False)
+    ws = load_workbook(spreadsheet)['ACME']
+    assert ws.max_row == 3
+    for row in [2, 3]:
+        assert ws['A%d' % row].alignment.wrap_text and ws['A%d' % row].alignment.horizontal == 'left'
+        assert ws['J%d' % row].alignment.horizontal == 'left'
+        assert ws['B%d' % row].alignment.wrap_text and ws['B%d' % row].alignment.horizontal == 'center'
+        assert ws['B%d' % row].border.left.style == 'thin'